@@ -0,0 +1,76 @@
+"""
+catalog_memory.py
+So sánh bộ nhớ: list[Book] (mỗi sách 1 object) vs BookCatalog (lưu theo cột).
+Đo phần bộ nhớ còn giữ sau khi nạp từ JSON (gồm cả chuỗi).
+
+Chạy (từ thư mục Librarymanagementsystem):
+    python -m benchmarks.catalog_memory --books 100000
+"""
+
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+
+from models.book import Book
+from models.book_catalog import BookCatalog
+
+
+def generate_records(n_books: int) -> list:
+    return [
+        {
+            "book_id": f"BK{i:06d}",
+            "title": f"Sách số {i}",
+            "description": f"Mô tả cho sách số {i}",
+            "publication_year": 1950 + i % 75,
+            "quantity": 5,
+            "available_quantity": 5,
+            "status": "AVAILABLE" if i % 7 else "UNAVAILABLE",
+            "category_id": i % 50,
+        }
+        for i in range(n_books)
+    ]
+
+
+def measure(build, text: str):
+    """Bộ nhớ còn giữ sau khi parse JSON + dựng cấu trúc (đã bỏ list dict trung gian)"""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    records = json.loads(text)
+    result = build(records)
+    del records
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark bộ nhớ danh mục sách")
+    parser.add_argument("--books", type=int, default=100_000)
+    args = parser.parse_args()
+
+    records = generate_records(args.books)
+    text = json.dumps(records, ensure_ascii=False)
+
+    objects, object_bytes, object_time = measure(
+        lambda data: [Book.from_dict(item) for item in data], text
+    )
+    del objects
+    catalog, catalog_bytes, catalog_time = measure(BookCatalog.from_dicts, text)
+
+    # Truy cập qua BookView vẫn cho kết quả như Book
+    assert catalog.get("BK000007").status == "UNAVAILABLE"
+    assert catalog.to_dicts()[:10] == [Book.from_dict(r).to_dict() for r in records[:10]]
+
+    print(f" [Benchmark] {args.books} sách")
+    print(f"   list[Book]  : {object_bytes / 1e6:8.1f} MB  ({object_time * 1000:.0f} ms)")
+    print(f"   BookCatalog : {catalog_bytes / 1e6:8.1f} MB  ({catalog_time * 1000:.0f} ms)")
+    print(f"   Tiết kiệm   : {object_bytes / catalog_bytes:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+fuzzy_search.py
+Độ trễ tìm kiếm gần đúng (fuzzy=True) trên chỉ mục sách, query gõ sai 1 ký tự.
+
+Chạy (từ thư mục Librarymanagementsystem):
+    python -m benchmarks.fuzzy_search --books 200000
+"""
+
+import argparse
+import random
+import string
+import time
+
+from services.search_index import SEARCH_FIELDS
+from utils.text_search import InvertedIndex
+
+
+def random_word(rng) -> str:
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 9)))
+
+
+def misspell(rng, word: str) -> str:
+    i = rng.randrange(len(word))
+    return word[:i] + rng.choice(string.ascii_lowercase) + word[i + 1:]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark tìm kiếm fuzzy")
+    parser.add_argument("--books", type=int, default=200_000)
+    parser.add_argument("--queries", type=int, default=500)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    words = [random_word(rng) for _ in range(args.books // 4)]
+    index = InvertedIndex(SEARCH_FIELDS)
+    start = time.perf_counter()
+    index.build(
+        (f"BK{i:06d}", {
+            "book_id": f"BK{i:06d}",
+            "title": " ".join(rng.choice(words) for _ in range(4)),
+            "author": " ".join(rng.choice(words) for _ in range(2)),
+        })
+        for i in range(args.books)
+    )
+    build_time = time.perf_counter() - start
+    start = time.perf_counter()
+    index.similar_terms("warmup")  # dựng TrigramIndex
+    trigram_time = time.perf_counter() - start
+
+    latencies = []
+    for _ in range(args.queries):
+        query = " ".join(misspell(rng, rng.choice(words)) for _ in range(rng.randint(1, 2)))
+        start = time.perf_counter()
+        index.search(query, fuzzy=True)
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+
+    print(f" [Benchmark] {args.books} sách, {len(index.vocab)} term")
+    print(f"   Dựng chỉ mục    : {build_time:.2f} s (trigram {trigram_time:.2f} s)")
+    print(f"   Fuzzy p50 / p95 : {latencies[len(latencies) // 2]:.2f} / "
+          f"{latencies[int(len(latencies) * 0.95)]:.2f} ms")
+    print(f"   Fuzzy max       : {latencies[-1]:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
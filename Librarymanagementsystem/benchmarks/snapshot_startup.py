@@ -0,0 +1,85 @@
+"""
+snapshot_startup.py
+So sánh thời gian khởi động LibraryController: đọc JSON vs đọc snapshot.
+
+Chạy (từ thư mục Librarymanagementsystem):
+    python -m benchmarks.snapshot_startup --books 100000
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from config import BOOKS_FILE, BOOK_AUTHORS_FILE, SNAPSHOT_FILE, USERS_FILE
+from utils.file_cache import file_cache
+from utils.file_handler import FileHandler
+
+
+def generate_data(n_books: int) -> None:
+    books = [
+        {
+            "book_id": str(i),
+            "title": f"Sách số {i}",
+            "description": f"Mô tả cho sách số {i}",
+            "publication_year": 1950 + i % 75,
+            "quantity": 5,
+            "available_quantity": 5,
+            "status": "AVAILABLE",
+            "category_id": i % 50,
+        }
+        for i in range(n_books)
+    ]
+    book_authors = [{"book_id": str(i), "author_id": i % 5000} for i in range(n_books)]
+    FileHandler.write_json(BOOKS_FILE, books)
+    FileHandler.write_json(BOOK_AUTHORS_FILE, book_authors)
+    FileHandler.write_json(USERS_FILE, [])
+
+
+def start_controller(controller_class) -> float:
+    file_cache.clear()  # không dùng dữ liệu đã parse từ lần trước
+    start = time.perf_counter()
+    controller = controller_class()
+    elapsed = time.perf_counter() - start
+    assert controller.books
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark khởi động LibraryController")
+    parser.add_argument("--books", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="snapshot_bench_")
+    old_cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        from controllers.library_controller import LibraryController
+
+        generate_data(args.books)
+        json_size = os.path.getsize(BOOKS_FILE) + os.path.getsize(BOOK_AUTHORS_FILE)
+
+        json_times = []
+        for _ in range(args.repeat):
+            if os.path.exists(SNAPSHOT_FILE):
+                os.remove(SNAPSHOT_FILE)
+            json_times.append(start_controller(LibraryController))
+
+        snapshot_times = [start_controller(LibraryController) for _ in range(args.repeat)]
+        snapshot_size = os.path.getsize(SNAPSHOT_FILE)
+
+        best_json = min(json_times)
+        best_snapshot = min(snapshot_times)
+        print(f" [Benchmark] {args.books} sách")
+        print(f"   JSON     : {best_json * 1000:8.1f} ms  ({json_size / 1e6:.1f} MB, gồm ghi snapshot)")
+        print(f"   Snapshot : {best_snapshot * 1000:8.1f} ms  ({snapshot_size / 1e6:.1f} MB)")
+        print(f"   Nhanh hơn: {best_json / best_snapshot:.1f}x")
+    finally:
+        os.chdir(old_cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -19,6 +19,37 @@ CATEGORIES_FILE = f"{DATA_DIR}/categories.json"
 FINES_FILE = f"{DATA_DIR}/fines.json"
 NOTIFICATIONS_FILE = f"{DATA_DIR}/notifications.json"
 WAITING_LISTS_FILE = f"{DATA_DIR}/waiting_lists.json"
+BOOK_AUTHORS_FILE = f"{DATA_DIR}/book_authors.json"
+
+# Backend lưu trữ cho các repository: "json" (mặc định) hoặc "sqlite"
+STORAGE_BACKEND = "json"
+SQLITE_DB_FILE = f"{DATA_DIR}/library.db"
+
+# Journal ghi nối cho mượn/trả (thay vì ghi lại toàn bộ file mỗi lần)
+JOURNAL_ENABLED = False
+JOURNAL_COMPACT_THRESHOLD = 200  # số thay đổi trước khi gộp vào file gốc
+JOURNAL_FSYNC = True             # fsync sau mỗi lần ghi nối
+
+# Khóa file giữa các process + gom fsync (group commit) khi ghi
+FILE_LOCK_ENABLED = True
+GROUP_COMMIT_WINDOW = 0.001  # giây chờ để gom các lần ghi đồng thời
+
+# Cache dữ liệu JSON đã parse (dùng chung cho mọi service)
+FILE_CACHE_MAX_BYTES = 64 * 1024 * 1024  # 64 MB
+
+# Snapshot nhị phân (pickle) để LibraryController khởi động nhanh
+SNAPSHOT_ENABLED = True
+SNAPSHOT_FILE = f"{DATA_DIR}/library.snapshot"
+
+# Lưu chỉ mục tìm kiếm sách xuống đĩa (cạnh file dữ liệu)
+SEARCH_INDEX_PERSIST = True
+
+# Cache Book đã dựng sẵn cho get_book_by_id / view_book_details
+BOOK_CACHE_MAX_SIZE = 2048   # số sách tối đa (0 = tắt cache)
+BOOK_CACHE_TTL = 300         # giây; chặn dữ liệu cũ khi process khác sửa file
+
+# Cache kết quả tìm kiếm (chỉ lưu book_id theo thứ tự xếp hạng)
+QUERY_CACHE_MAX_SIZE = 256   # số truy vấn tối đa (0 = tắt cache)
 
 # Trạng thái sách
 BOOK_STATUS = {
@@ -38,6 +69,9 @@ BORROW_STATUS = {
     "LOST": "LOST"
 }
 
+# Đơn còn đang giữ sách (tính vào giới hạn mượn, được phép trả / báo mất)
+ACTIVE_BORROW_STATUSES = ("BORROWED", "OVERDUE")
+
 # Trạng thái user
 USER_STATUS = {
     "ACTIVE": "ACTIVE",
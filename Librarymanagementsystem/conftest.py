@@ -0,0 +1,61 @@
+"""
+conftest.py
+Fixture dùng chung cho các test:
+- paths: đường dẫn các file dữ liệu trong tmp_path của test
+- seed(books=[...], users=[...], ...): ghi dữ liệu mẫu vào các file đó
+- book_service / borrow_service / admin_service: service trỏ vào các file đó
+- Mỗi test có registry repository / chỉ mục dùng chung riêng, nên sửa hay
+  monkeypatch repository trong 1 test không ảnh hưởng test khác.
+"""
+
+import os
+
+import pytest
+
+import repositories
+from repositories import derived
+from services.admin_service import AdminService
+from services.book_service import BookService
+from services.borrow_service import BorrowService
+from utils.file_handler_fix import save_json
+
+DATA_FILES = ("books", "authors", "book_author", "categories", "users", "borrows", "fines")
+
+
+@pytest.fixture(autouse=True)
+def fresh_repositories(monkeypatch):
+    monkeypatch.setattr(repositories, "_repositories", {})
+    monkeypatch.setattr(derived, "_shared", {})
+
+
+@pytest.fixture
+def paths(tmp_path):
+    return {name: str(tmp_path / f"{name}.json") for name in DATA_FILES}
+
+
+@pytest.fixture
+def seed(paths):
+    def write(**collections):
+        for name, records in collections.items():
+            save_json(paths[name], records)
+    return write
+
+
+@pytest.fixture
+def book_service(paths, seed):
+    """BookService(); tác giả / liên kết sách-tác giả chưa seed -> rỗng"""
+    def create():
+        seed(**{name: [] for name in ("authors", "book_author") if not os.path.exists(paths[name])})
+        return BookService(paths["books"], paths["authors"], paths["categories"],
+                           book_author_path=paths["book_author"])
+    return create
+
+
+@pytest.fixture
+def borrow_service(paths):
+    return lambda: BorrowService(paths["borrows"], paths["books"], paths["users"])
+
+
+@pytest.fixture
+def admin_service(paths):
+    return lambda: AdminService(user_path=paths["users"], book_path=paths["books"])
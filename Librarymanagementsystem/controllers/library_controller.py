@@ -1,11 +1,15 @@
+from config import BOOKS_FILE, BOOK_AUTHORS_FILE, SNAPSHOT_ENABLED, SNAPSHOT_FILE, USERS_FILE
 from utils.file_handler import FileHandler
 from utils.session_manager import SessionManager
 from utils.helpers import get_current_date
+from utils.index_manager import IndexManager, attr_getter
+from utils.snapshot import load_snapshot, save_snapshot
 
 from models.user import User
 from models.member import Member
 from models.admin import Admin
 from models.book import Book
+from models.book_catalog import BookCatalog
 from models.borrow_order import BorrowOrder
 from models.waiting_list import WaitingList
 from models.book_author import BookAuthor
@@ -20,17 +24,47 @@ class LibraryController:
         self.file_handler = FileHandler()
         self.session_mgr = SessionManager()
 
-        self.users = self._load_users()
-        self.books = self._load_books()
+        if not self._load_from_snapshot():
+            data = self.file_handler.read_many(self.SNAPSHOT_SOURCES)
+            self.users = self._load_users(data[USERS_FILE])
+            self.books = self._load_books(data[BOOKS_FILE])
+            self.book_authors = self._load_book_authors(data[BOOK_AUTHORS_FILE])
+            # Lần khởi động sau đọc snapshot thay vì parse lại JSON
+            self._save_snapshot()
         self.borrow_orders = self._load_borrow_orders()
         self.waiting_lists = self._load_waiting_lists()
-        self.book_authors = self._load_book_authors()
+        self._build_indexes()
         
         print(" [System] Đã tải dữ liệu thành công.")
 
     # QUẢN LÝ DỮ LIỆU & LOAD FILE
-    def _load_users(self):
-        data = self.file_handler.read_json("data/users.json")
+    SNAPSHOT_SOURCES = (USERS_FILE, BOOKS_FILE, BOOK_AUTHORS_FILE)
+
+    def _load_from_snapshot(self):
+        """Nạp users/books/book_authors từ snapshot nếu còn khớp với file JSON"""
+        if not SNAPSHOT_ENABLED:
+            return False
+        payload = load_snapshot(SNAPSHOT_FILE, self.SNAPSHOT_SOURCES)
+        if payload is None:
+            return False
+        if not isinstance(payload.get("books"), BookCatalog):
+            return False  # snapshot định dạng cũ
+        self.users = payload["users"]
+        self.books = payload["books"]
+        self.book_authors = payload["book_authors"]
+        return True
+
+    def _save_snapshot(self):
+        if not SNAPSHOT_ENABLED:
+            return
+        payload = {
+            "users": self.users,
+            "books": self.books,
+            "book_authors": self.book_authors,
+        }
+        save_snapshot(SNAPSHOT_FILE, payload, self.SNAPSHOT_SOURCES)
+
+    def _load_users(self, data):
         users_list = []
         for item in data:
         
@@ -41,20 +75,26 @@ class LibraryController:
                 users_list.append(Member(**item) if hasattr(Member, 'from_dict') else User.from_dict(item))
         return users_list
 
-    def _load_books(self):
-        data = self.file_handler.read_json("data/books.json")
-        books_list = []
-        for item in data:
-            books_list.append(Book.from_dict(item))
-        return books_list
+    def _load_books(self, data):
+        # Lưu theo cột, Book chỉ được tạo khi truy cập
+        return BookCatalog.from_dicts(data)
 
-    def _load_book_authors(self):
-        data = self.file_handler.read_json("data/book_authors.json")
+    def _load_book_authors(self, data):
         rels = []
         for item in data:
             rels.append(BookAuthor.from_dict(item))
         return rels
 
+    def _build_indexes(self):
+        """Chỉ mục băm để tra user/quan hệ sách-tác giả theo khóa trong O(1)"""
+        self.user_index = IndexManager(["user_id", "username", "email"], getter=attr_getter)
+        self.user_index.build((u, u) for u in self.users)
+        self.book_author_index = IndexManager(["book_id", "author_id"], getter=attr_getter)
+        self.book_author_index.build((ba, ba) for ba in self.book_authors)
+
+    def _find_book(self, book_id):
+        return self.books.get(book_id)  # BookCatalog có sẵn chỉ mục book_id
+
     def _load_borrow_orders(self):
         return []
 
@@ -63,15 +103,18 @@ class LibraryController:
 
     def save_all_data(self):
         """Lưu toàn bộ dữ liệu từ RAM xuống ổ cứng"""
-        self.file_handler.write_json("data/users.json", [u.to_dict() for u in self.users])
-        self.file_handler.write_json("data/books.json", [b.to_dict() for b in self.books])
-        self.file_handler.write_json("data/book_authors.json", [ba.to_dict() for ba in self.book_authors])
+        self.file_handler.write_many({
+            USERS_FILE: [u.to_dict() for u in self.users],
+            BOOKS_FILE: self.books.to_dicts(),
+            BOOK_AUTHORS_FILE: [ba.to_dict() for ba in self.book_authors],
+        })
+        self._save_snapshot()
         print(" [System] Đã lưu dữ liệu.")
 
     # XÁC THỰC (AUTHENTICATION)
     def login(self, username, password):
         """Xử lý đăng nhập"""
-        user = next((u for u in self.users if u.username == username), None)
+        user = self.user_index.get("username", username)
         if not user:
             return False, "Tài khoản không tồn tại."
         if user.password != password:
@@ -95,7 +138,7 @@ class LibraryController:
         return self.books
     
     def view_book_details(self, book_id):
-        book = next((b for b in self.books if b.book_id == book_id), None)
+        book = self._find_book(book_id)
         if book:
             return BookService.viewBookDetails(book)
         return None
@@ -106,7 +149,7 @@ class LibraryController:
         user = self.session_mgr.get_current_user()
         if not user:
             return False, "Vui lòng đăng nhập để mượn sách."
-        book = next((b for b in self.books if b.book_id == book_id), None)
+        book = self._find_book(book_id)
         if not book:
             return False, "Sách không tồn tại."
         if BorrowService.checkBorrowingConditions(user, book):
@@ -119,7 +162,7 @@ class LibraryController:
         """Xử lý trả sách"""
         user = self.session_mgr.get_current_user()
         if not user: return False, "Chưa đăng nhập."
-        book = next((b for b in self.books if b.book_id == book_id), None)
+        book = self._find_book(book_id)
         if not book: return False, "Sách không tồn tại."
         if BorrowService.returnBook(user, book):
             return True, f"Đã trả sách: {book.title}"
@@ -133,7 +176,7 @@ class LibraryController:
             return False, "Truy cập bị từ chối. Cần quyền Admin."
         return True, "Thêm sách thành công."
 
-        if any(int(b.book_id) == str(book_id) for b in self.books):
+        if self._find_book(int(book_id)) is not None:
             return False, "Book ID đã tồn tại."
         
         quantity = int(quantity)
@@ -153,6 +196,7 @@ class LibraryController:
         
         new_rel = BookAuthor(book_id=str(book_id), author_id=int(author_id))
         self.book_authors.append(new_rel)
+        self.book_author_index.add(new_rel, new_rel)
 
         self.save_all_data()
         return True, f"Đã thêm sách: {title}"
@@ -163,8 +207,8 @@ class LibraryController:
         if not user or user.role != 'admin':
             return False, "Cần quyền Admin."
             
-        book = next((b for b in self.books if b.book_id == book_id), None)
+        book = self._find_book(book_id)
         if book:
-            AdminService.deleteBook(self.books, book)
+            self.books.remove(book)
             return True, "Đã xóa sách."
         return False, "Không tìm thấy sách."
\ No newline at end of file
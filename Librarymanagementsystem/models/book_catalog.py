@@ -0,0 +1,313 @@
+"""
+book_catalog.py
+Danh mục sách lưu theo cột (columnar) trong RAM.
+
+Thay vì mỗi cuốn sách là 1 object Book (có __dict__ riêng + 1 Author tạm):
+- các trường số (publication_year, quantity, available_quantity,
+  category_id) nằm trong array.array
+- chuỗi ít giá trị (status) được intern vào bảng chuỗi, cột chỉ lưu số
+  thứ tự (array)
+- chuỗi dài gần như không lặp (title, description) nằm chung 1 buffer
+  UTF-8 (TextColumn), mỗi dòng chỉ tốn vị trí + độ dài thay vì 1 object
+  str; book_id vẫn là list vì đã là khóa của chỉ mục book_id
+- Author dùng chung: mỗi cặp (author_id, author_name) chỉ có 1 object
+- Book chỉ được tạo khi truy cập (BookView), đọc/ghi thẳng vào các cột
+
+Xóa sách chỉ đánh dấu dòng đã xóa (không dời dòng), nên BookView đang
+được giữ ở nơi khác vẫn trỏ đúng sách.
+"""
+
+from array import array
+
+from models.author import Author
+from models.book import Book
+
+NUMERIC_FIELDS = ("publication_year", "quantity", "available_quantity", "category_id")
+TEXT_FIELDS = ("book_id", "title", "description")   # gần như mỗi sách 1 giá trị khác nhau
+BUFFER_FIELDS = ("title", "description")            # trong TEXT_FIELDS, lưu bằng TextColumn
+CODED_FIELDS = ("status",)                          # ít giá trị, lặp lại nhiều
+FIELD_DEFAULTS = {"book_id": None, "title": "", "description": "", "status": "AVAILABLE"}
+
+
+class StringTable:
+    """Bảng intern: mỗi giá trị khác nhau chỉ lưu 1 lần, cột lưu số thứ tự"""
+
+    def __init__(self):
+        self.values = []
+        self._ids = {}
+
+    def intern(self, value) -> int:
+        i = self._ids.get(value)
+        if i is None:
+            i = self._ids[value] = len(self.values)
+            self.values.append(value)
+        return i
+
+    def __getstate__(self):
+        return self.values
+
+    def __setstate__(self, values):
+        self.values = values
+        self._ids = {v: i for i, v in enumerate(values)}
+
+
+class TextColumn:
+    """
+    Cột chuỗi lưu trong 1 buffer UTF-8: dòng i là buffer[starts[i]:
+    starts[i] + lengths[i]], giải mã khi đọc. Giá trị không phải str (None,
+    ...) để riêng trong others. Sửa 1 dòng ghi nối chuỗi mới vào cuối
+    buffer; phần bị bỏ được dọn khi chiếm quá nửa buffer.
+    """
+
+    def __init__(self, values=()):
+        self.buffer = bytearray()
+        self.starts = array("Q")
+        self.lengths = array("I")
+        self.others = {}   # dòng -> giá trị không phải str
+        self.garbage = 0   # số byte không còn dòng nào dùng
+        for value in values:
+            self.append(value)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def append(self, value) -> None:
+        self.starts.append(0)
+        self.lengths.append(0)
+        self._store(len(self.starts) - 1, value)
+
+    def _store(self, row: int, value) -> None:
+        if isinstance(value, str):
+            data = value.encode("utf-8")
+            self.starts[row] = len(self.buffer)
+            self.lengths[row] = len(data)
+            self.buffer += data
+            self.others.pop(row, None)
+        else:
+            self.lengths[row] = 0
+            self.others[row] = value
+
+    def __getitem__(self, row: int):
+        if self.others and row in self.others:
+            return self.others[row]
+        start = self.starts[row]
+        return self.buffer[start:start + self.lengths[row]].decode("utf-8")
+
+    def __setitem__(self, row: int, value) -> None:
+        self.garbage += self.lengths[row]
+        self._store(row, value)
+        if self.garbage * 2 > len(self.buffer):
+            self._compact()
+
+    def _compact(self) -> None:
+        buffer = bytearray()
+        for row, start in enumerate(self.starts):
+            length = self.lengths[row]
+            self.starts[row] = len(buffer)
+            buffer += self.buffer[start:start + length]
+        self.buffer = buffer
+        self.garbage = 0
+
+
+class BookView(Book):
+    """Book không lưu dữ liệu riêng: mọi thuộc tính đọc/ghi vào BookCatalog"""
+
+    __slots__ = ("_catalog", "_row")
+
+    def __init__(self, catalog, row: int):
+        # Không gọi Book.__init__: dữ liệu đã nằm trong catalog
+        self._catalog = catalog
+        self._row = row
+
+    def __eq__(self, other):
+        if isinstance(other, BookView):
+            return self._catalog is other._catalog and self._row == other._row
+        return NotImplemented
+
+    def __hash__(self):
+        return hash((id(self._catalog), self._row))
+
+    def __reduce__(self):
+        # Pickle/copy ra Book độc lập
+        return Book.from_dict, ({**self.to_dict(), "author": self.author},)
+
+    def __repr__(self):
+        return f"BookView(book_id={self.book_id!r}, title={self.title!r})"
+
+
+def _column_property(field):
+    def getter(self):
+        return self._catalog.get_field(self._row, field)
+
+    def setter(self, value):
+        self._catalog.set_field(self._row, field, value)
+
+    return property(getter, setter)
+
+
+for _field in NUMERIC_FIELDS + TEXT_FIELDS + CODED_FIELDS + ("author",):
+    setattr(BookView, _field, _column_property(_field))
+
+
+class BookCatalog:
+    def __init__(self):
+        self.numeric = {field: array("i") for field in NUMERIC_FIELDS}
+        self.text = {field: TextColumn() if field in BUFFER_FIELDS else [] for field in TEXT_FIELDS}
+        self.strings = StringTable()
+        self.codes = {field: array("I") for field in CODED_FIELDS}
+        self.author_refs = array("I")
+        self.authors = []          # Author dùng chung
+        self._author_ids = {}      # (author_id, author_name) -> vị trí trong authors
+        self.alive = bytearray()   # 0 = dòng đã xóa
+        self._rows_by_id = {}      # book_id -> dòng
+        self._size = 0
+
+    @classmethod
+    def from_dicts(cls, records) -> "BookCatalog":
+        """Dựng catalog từ list dict (dữ liệu file JSON), từng cột một"""
+        records = list(records)
+        catalog = cls()
+        for field in NUMERIC_FIELDS:
+            catalog.numeric[field] = array("i", [int(r.get(field, 0) or 0) for r in records])
+        for field in TEXT_FIELDS:
+            default = FIELD_DEFAULTS[field]
+            values = (r.get(field, default) for r in records)
+            catalog.text[field] = TextColumn(values) if field in BUFFER_FIELDS else list(values)
+        for field in CODED_FIELDS:
+            intern, default = catalog.strings.intern, FIELD_DEFAULTS[field]
+            catalog.codes[field] = array("I", [intern(r.get(field, default)) for r in records])
+        catalog.author_refs = array("I", [catalog._author_ref(r.get("author")) for r in records])
+        catalog.alive = bytearray(b"\x01") * len(records)
+        catalog._size = len(records)
+        # Trùng book_id -> giữ dòng đầu tiên (duyệt ngược, dòng đầu ghi sau cùng)
+        book_ids = catalog.text["book_id"]
+        catalog._rows_by_id = {book_ids[row]: row for row in range(len(records) - 1, -1, -1)}
+        return catalog
+
+    # ===== Thêm / xóa =====
+
+    def add_dict(self, data: dict) -> BookView:
+        """Thêm sách từ dict (cùng quy tắc chuyển đổi với Book.from_dict)"""
+        row = len(self.alive)
+        for field in NUMERIC_FIELDS:
+            self.numeric[field].append(int(data.get(field, 0) or 0))
+        for field in TEXT_FIELDS:
+            self.text[field].append(data.get(field, FIELD_DEFAULTS[field]))
+        for field in CODED_FIELDS:
+            self.codes[field].append(self.strings.intern(data.get(field, FIELD_DEFAULTS[field])))
+        self.author_refs.append(self._author_ref(data.get("author")))
+        self.alive.append(1)
+        self._rows_by_id.setdefault(data.get("book_id"), row)
+        self._size += 1
+        return BookView(self, row)
+
+    def append(self, book) -> BookView:
+        """Thêm 1 Book (hoặc dict) vào catalog"""
+        if isinstance(book, dict):
+            return self.add_dict(book)
+        return self.add_dict({**book.to_dict(), "author": book.author})
+
+    def remove(self, book) -> bool:
+        row = self._row_of(book)
+        if row is None or not self.alive[row]:
+            return False
+        self.alive[row] = 0
+        self._size -= 1
+        book_id = self.get_field(row, "book_id")
+        if self._rows_by_id.get(book_id) == row:
+            del self._rows_by_id[book_id]
+        return True
+
+    def _row_of(self, book):
+        if isinstance(book, BookView) and book._catalog is self:
+            return book._row
+        return self._rows_by_id.get(book.book_id if isinstance(book, Book) else book)
+
+    def _author_ref(self, author_data) -> int:
+        """Author dùng chung cho dữ liệu author dạng dict / Author / không có"""
+        if isinstance(author_data, dict):
+            key = (author_data.get("author_id", 0), author_data.get("author_name", ""))
+        elif isinstance(author_data, Author):
+            key = (author_data.author_id, author_data.author_name)
+        else:
+            key = (0, "Unknown")
+        i = self._author_ids.get(key)
+        if i is None:
+            if not isinstance(author_data, Author):
+                author_data = Author(author_id=key[0], author_name=key[1])
+            i = self._author_ids[key] = len(self.authors)
+            self.authors.append(author_data)
+        return i
+
+    # ===== Đọc / ghi theo cột =====
+
+    def get_field(self, row: int, field: str):
+        if field in self.numeric:
+            return self.numeric[field][row]
+        if field in self.text:
+            return self.text[field][row]
+        if field == "author":
+            return self.authors[self.author_refs[row]]
+        return self.strings.values[self.codes[field][row]]
+
+    def set_field(self, row: int, field: str, value) -> None:
+        if field in self.numeric:
+            self.numeric[field][row] = int(value)
+        elif field in self.text:
+            if field == "book_id":
+                old = self.text["book_id"][row]
+                if self._rows_by_id.get(old) == row:
+                    del self._rows_by_id[old]
+                self._rows_by_id.setdefault(value, row)
+            self.text[field][row] = value
+        elif field == "author":
+            self.author_refs[row] = self._author_ref(value)
+        else:
+            self.codes[field][row] = self.strings.intern(value)
+
+    # ===== Truy cập như list[Book] =====
+
+    def get(self, book_id):
+        """Tra sách theo book_id (O(1)), không có -> None"""
+        row = self._rows_by_id.get(book_id)
+        return BookView(self, row) if row is not None else None
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self):
+        alive = self.alive
+        for row in range(len(alive)):
+            if alive[row]:
+                yield BookView(self, row)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return list(self)[i]
+        if self._size == len(self.alive):  # chưa xóa dòng nào -> truy cập thẳng
+            if i < 0:
+                i += self._size
+            if not 0 <= i < self._size:
+                raise IndexError("BookCatalog index out of range")
+            return BookView(self, i)
+        return list(self)[i]
+
+    def to_dicts(self) -> list:
+        """Giống [b.to_dict() for b in books] nhưng không tạo BookView"""
+        values = self.strings.values
+        book_id, title, description = (self.text[f] for f in TEXT_FIELDS)
+        status = self.codes["status"]
+        year, quantity, available, category = (self.numeric[f] for f in NUMERIC_FIELDS)
+        return [
+            {
+                "book_id": book_id[row],
+                "title": title[row],
+                "description": description[row],
+                "publication_year": year[row],
+                "quantity": quantity[row],
+                "available_quantity": available[row],
+                "status": values[status[row]],
+                "category_id": category[row],
+            }
+            for row, alive in enumerate(self.alive) if alive
+        ]
@@ -1,6 +1,6 @@
 import uuid
 from datetime import datetime
-from waiting_list_item import WaitingListItem
+from models.waiting_list_item import WaitingListItem
 
 def generate_id():
     return uuid.uuid4().hex[:8]
@@ -0,0 +1,69 @@
+"""
+repositories package:
+Tầng truy cập dữ liệu. Service lấy repository qua get_repository() và
+không cần biết dữ liệu nằm trong file JSON hay SQLite (config.STORAGE_BACKEND).
+"""
+
+import os
+import threading
+
+from config import STORAGE_BACKEND, SQLITE_DB_FILE, JOURNAL_ENABLED
+
+from .schema import COLLECTIONS, unwrap_records
+from .base import BaseRepository, transactions
+from .json_repository import JsonRepository
+from .sqlite_repository import SqliteRepository
+
+_repositories = {}
+_repositories_lock = threading.Lock()
+
+
+def get_repository(name: str, file_path: str = None, backend: str = None,
+                   db_path: str = None, use_journal: bool = None) -> BaseRepository:
+    """
+    Lấy repository dùng chung (trong process) cho 1 collection.
+    - file_path: file JSON (backend "json"), mặc định theo schema
+    - db_path: file SQLite (backend "sqlite"), mặc định SQLITE_DB_FILE
+    - use_journal: bật/tắt chế độ journal (chỉ backend "json"), mặc định
+      JOURNAL_ENABLED. Cố định khi repository của file được tạo lần đầu;
+      lần gọi sau yêu cầu giá trị khác -> ValueError
+    """
+    spec = COLLECTIONS[name]
+    backend = backend or STORAGE_BACKEND
+
+    if backend == "sqlite":
+        db_path = db_path or SQLITE_DB_FILE
+        key = ("sqlite", name, os.path.abspath(db_path))
+        create = lambda: SqliteRepository(name, spec["key"], spec["indexes"], db_path)
+    elif backend == "json":
+        file_path = file_path or spec["file"]
+        key = ("json", name, os.path.abspath(file_path))
+        create = lambda: JsonRepository(
+            name, file_path, spec["key"],
+            use_journal=JOURNAL_ENABLED if use_journal is None else use_journal,
+            indexes=spec["indexes"]
+        )
+    else:
+        raise ValueError(f"Backend không hợp lệ: {backend}")
+
+    with _repositories_lock:
+        repo = _repositories.get(key)
+        if repo is None:
+            repo = _repositories[key] = create()
+
+    if use_journal is not None and isinstance(repo, JsonRepository) and repo.use_journal != use_journal:
+        raise ValueError(
+            f"{file_path} đã mở với use_journal={repo.use_journal}, không thể đổi thành {use_journal}"
+        )
+    return repo
+
+
+__all__ = [
+    "COLLECTIONS",
+    "BaseRepository",
+    "JsonRepository",
+    "SqliteRepository",
+    "get_repository",
+    "transactions",
+    "unwrap_records",
+]
@@ -0,0 +1,164 @@
+"""
+base.py
+Giao diện chung cho repository: service chỉ làm việc với các hàm ở đây,
+không cần biết dữ liệu nằm trong file JSON hay SQLite.
+"""
+
+import os
+from contextlib import ExitStack, contextmanager
+
+from utils.journal import discard_batch, write_batch
+
+
+def matches(record: dict, criteria: dict) -> bool:
+    """Kiểm tra bản ghi có khớp tất cả điều kiện field == value hay không"""
+    return all(record.get(field) == value for field, value in criteria.items())
+
+
+@contextmanager
+def transactions(*repositories):
+    """
+    Transaction trên nhiều repository: luôn mở theo thứ tự cố định (đường dẫn
+    lưu trữ, giống utils.file_lock.locked) để 2 thread/process cùng ghi vài
+    collection không chờ khóa của nhau vòng tròn.
+
+    Mỗi file JSON được ghi riêng, nên khi có từ 2 file thay đổi, mọi thay
+    đổi của lô được ghi (fsync) vào 1 bản ghi gộp cạnh file đầu tiên trước
+    khi ghi các file, và chỉ xóa khi tất cả đã xuống đĩa. Process bị tắt
+    giữa 2 lần ghi -> lần mở repository sau áp lại bản ghi gộp
+    (utils.journal.recover_batches): không bao giờ có file này đã ghi mà
+    file kia chưa. Không áp dụng cho replace_all() trong lô và cho
+    transaction lồng trong transaction khác (lô ngoài cùng mới ghi file).
+    SQLite: các bảng cùng database đã chung 1 transaction SQLite.
+    """
+    ordered = sorted(set(repositories), key=lambda r: (r.storage_path, r.name))
+    batch_path = None
+    with ExitStack() as stack:
+        for repo in ordered:
+            stack.enter_context(repo.transaction())
+        yield
+        batch = {repo.storage_path: repo.redo_entries() for repo in ordered}
+        changed = {path: entries for path, entries in batch.items() if entries != []}
+        if len(changed) > 1 and None not in changed.values():
+            batch_path = write_batch(os.path.dirname(ordered[0].storage_path), changed)
+    # Các file đã ghi xong (transaction ngoài cùng chờ fsync khi thoát)
+    if batch_path:
+        discard_batch(batch_path)
+
+
+class BaseRepository:
+    """
+    Repository cho 1 collection (books, users, borrow_orders, ...).
+    Mỗi bản ghi là 1 dict, định danh bằng trường khóa `key_field`.
+
+    Các hàm đọc luôn trả về bản sao: muốn thay đổi dữ liệu phải gọi
+    insert() / update() / delete().
+    """
+
+    def __init__(self, name: str, key_field: str):
+        self.name = name
+        self.key_field = key_field
+        self._listeners = []
+
+    # ===== Đọc =====
+
+    def all(self) -> list:
+        raise NotImplementedError
+
+    def get(self, key):
+        """Lấy 1 bản ghi theo khóa chính, không có -> None"""
+        raise NotImplementedError
+
+    def get_many(self, keys) -> list:
+        """Lấy nhiều bản ghi theo khóa chính (giữ thứ tự keys, bỏ khóa không có)"""
+        records = (self.get(key) for key in keys)
+        return [r for r in records if r is not None]
+
+    def find(self, **criteria) -> list:
+        """Lấy các bản ghi có field == value (ví dụ find(user_id=2, status="BORROWED"))"""
+        return [r for r in self.all() if matches(r, criteria)]
+
+    def find_one(self, **criteria):
+        results = self.find(**criteria)
+        return results[0] if results else None
+
+    def iter_all(self):
+        """Duyệt từng bản ghi (generator), không tạo list toàn bộ dữ liệu"""
+        return iter(self.all())
+
+    def iter_find(self, **criteria):
+        return (r for r in self.iter_all() if matches(r, criteria))
+
+    def count(self, **criteria) -> int:
+        return len(self.find(**criteria)) if criteria else len(self.all())
+
+    @property
+    def lock(self):
+        """Khóa (RLock) giữ trong suốt transaction, None nếu repository không có"""
+        return None
+
+    @property
+    def storage_path(self) -> str:
+        """Đường dẫn tuyệt đối của file lưu dữ liệu (thứ tự khóa khi ghi nhiều collection)"""
+        raise NotImplementedError
+
+    def version(self):
+        """
+        Giá trị đổi mỗi khi dữ liệu của collection thay đổi (kể cả do process
+        khác ghi). Dùng để biết khi nào phải dựng lại dữ liệu suy ra từ repository.
+        """
+        raise NotImplementedError
+
+    # ===== Ghi =====
+
+    def insert(self, record: dict) -> dict:
+        """Thêm bản ghi mới. Trùng khóa -> ValueError"""
+        raise NotImplementedError
+
+    def update(self, key, fields: dict) -> bool:
+        """Cập nhật một số trường của bản ghi. Không tìm thấy -> False"""
+        raise NotImplementedError
+
+    def delete(self, key) -> bool:
+        raise NotImplementedError
+
+    def replace_all(self, records: list) -> None:
+        """Thay toàn bộ dữ liệu của collection"""
+        raise NotImplementedError
+
+    # ===== Theo dõi thay đổi =====
+
+    def subscribe(self, callback) -> None:
+        """
+        Nhận các thay đổi đã lưu (sau commit): callback(changes)
+        changes: list (op, key, record), op là "insert" | "update" | "delete"
+        hoặc "reload" (dữ liệu được nạp lại / thay toàn bộ -> tự dựng lại).
+        callback được gọi khi repository còn đang giữ khóa: chỉ nên ghi nhận
+        thay đổi rồi trả về, không gọi ngược lại repository.
+        """
+        self._listeners.append(callback)
+
+    def _emit(self, changes: list) -> None:
+        if not changes:
+            return
+        for callback in list(self._listeners):
+            try:
+                callback(changes)
+            except Exception as e:
+                print(f"[Error] Listener của {self.name}: {e}")
+
+    def redo_entries(self):
+        """
+        Thay đổi chưa lưu của transaction hiện tại dạng entry journal
+        idempotent (xem transactions()). [] = không đổi gì,
+        None = không biểu diễn được (không ghi bản ghi gộp).
+        """
+        return None
+
+    def transaction(self):
+        """
+        Context manager gom các thao tác ghi:
+        - dữ liệu chỉ được lưu 1 lần khi thoát khối with
+        - có lỗi -> bỏ toàn bộ thay đổi
+        """
+        raise NotImplementedError
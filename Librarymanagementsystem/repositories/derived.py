@@ -0,0 +1,187 @@
+"""
+derived.py
+Dữ liệu suy ra từ repository (chỉ mục tìm kiếm, facet, ...), cập nhật
+tăng dần theo thay đổi của repository thay vì dựng lại mỗi lần đọc.
+
+- Nguồn chính (sources[0]) là repository: thay đổi đã commit được xếp
+  hàng qua subscribe() và áp dụng ở lần sync() kế tiếp.
+- Các nguồn phụ (repository khác hoặc đường dẫn file) chỉ được so phiên
+  bản: đổi -> dựng lại toàn bộ.
+- persist_path: lưu trạng thái xuống đĩa (pickle) kèm chữ ký file của các
+  nguồn; lần khởi động sau dùng lại nếu dữ liệu nguồn chưa đổi.
+
+Lớp con cài đặt: rebuild(records), apply(changes), và nếu cần lưu xuống
+đĩa thì get_state() / set_state(state). shared_index() trả về object dùng
+chung trong process cho cùng loại chỉ mục + cùng nguồn.
+"""
+
+import atexit
+import os
+import pickle
+import threading
+from collections import deque
+
+from utils.file_cache import file_signature
+from utils.group_commit import atomic_write_bytes
+
+
+def storage_path(source) -> str:
+    """File lưu dữ liệu của 1 nguồn (repository JSON/SQLite hoặc đường dẫn)"""
+    if isinstance(source, str):
+        return source
+    return getattr(source, "file_path", None) or source.db_path
+
+
+def storage_signature(source):
+    path = storage_path(source)
+    signature = file_signature(path)
+    if not isinstance(source, str) and hasattr(source, "db_path"):
+        signature += file_signature(path + "-wal")  # SQLite WAL: ghi vào -wal trước
+    return signature
+
+
+def source_version(source):
+    if isinstance(source, str):
+        return file_signature(source)
+    return source.version()
+
+
+class DerivedIndex:
+    def __init__(self, sources, persist_path: str = None):
+        self.sources = list(sources)
+        self.repository = self.sources[0]
+        self.persist_path = persist_path
+        # Dùng chung khóa của repository nguồn (nếu có): đọc chỉ mục luôn khóa
+        # repository trước, không khóa chéo với transaction đang đọc chỉ mục
+        self._lock = self.repository.lock or threading.RLock()
+        self._queue = deque()     # thay đổi chờ áp dụng (append/popleft an toàn giữa thread)
+        self._synced = None       # phiên bản các nguồn lúc dữ liệu được cập nhật lần cuối
+        self._dirty = False       # có thay đổi chưa lưu xuống đĩa
+
+        self.repository.subscribe(self._enqueue)
+        if persist_path:
+            self._load()
+            atexit.register(self._save_if_dirty)
+
+    # ===== Lớp con cài đặt =====
+
+    def rebuild(self, records) -> None:
+        raise NotImplementedError
+
+    def apply(self, changes) -> None:
+        """
+        Áp dụng thay đổi (op, key, record). Phải idempotent: cùng 1 thay đổi
+        có thể được áp dụng lại sau khi đã dựng lại toàn bộ.
+        """
+        raise NotImplementedError
+
+    def get_state(self):
+        raise NotImplementedError
+
+    def set_state(self, state) -> None:
+        raise NotImplementedError
+
+    # ===== Đồng bộ =====
+
+    def _enqueue(self, changes) -> None:
+        """Listener của repository (gọi ngay lúc commit, trong thread ghi)"""
+        self._queue.extend(changes)
+
+    def token(self) -> tuple:
+        return tuple(source_version(s) for s in self.sources)
+
+    def _drain(self) -> list:
+        changes = []
+        while self._queue:
+            changes.append(self._queue.popleft())
+        return changes
+
+    def sync(self) -> None:
+        """Đưa dữ liệu suy ra về khớp với nguồn (gọi trước mỗi lần đọc)"""
+        with self._lock:
+            if self._sync() and self.persist_path:
+                self.save()
+
+    def _sync(self) -> bool:
+        """Trả về True nếu đã phải dựng lại toàn bộ"""
+        token = self.token()  # có thể làm repository nạp lại -> xếp hàng "reload"
+        changes = self._drain()
+        synced = self._synced
+        if (synced is None
+                or token[1:] != synced[1:]
+                or any(op == "reload" for op, _, _ in changes)
+                or (not changes and token[0] != synced[0])):
+            self.rebuild(self.repository.all())
+            # Thay đổi đến trong lúc dựng lại đã nằm trong dữ liệu vừa đọc,
+            # áp dụng lại cũng không sao (apply idempotent)
+            self.apply([c for c in self._drain() if c[0] != "reload"])
+            self._synced = token
+            self._dirty = True
+            return True
+        if changes:
+            self.apply(changes)
+            self._synced = token
+            self._dirty = True
+        return False
+
+    # ===== Lưu xuống đĩa =====
+
+    def save(self) -> bool:
+        if not self.persist_path:
+            return False
+        with self._lock:
+            # Lấy chữ ký TRƯỚC khi đồng bộ: nếu có ghi xen giữa thì chữ ký cũ
+            # hơn dữ liệu -> lần sau chỉ dựng lại, không dùng nhầm dữ liệu cũ
+            signatures = [storage_signature(s) for s in self.sources]
+            self._sync()
+            try:
+                data = pickle.dumps(
+                    {"signatures": signatures, "state": self.get_state()}, protocol=5
+                )
+                atomic_write_bytes(self.persist_path, data)
+            except (OSError, pickle.PicklingError) as e:
+                print(f"[Error] Lỗi lưu chỉ mục {self.persist_path}: {e}")
+                return False
+            self._dirty = False
+            return True
+
+    def _save_if_dirty(self) -> None:
+        if self._dirty:
+            self.save()
+
+    def _load(self) -> None:
+        if not os.path.exists(self.persist_path):
+            return
+        try:
+            with open(self.persist_path, "rb") as f:
+                saved = pickle.load(f)
+            if saved["signatures"] != [storage_signature(s) for s in self.sources]:
+                return
+            with self._lock:
+                self.set_state(saved["state"])
+                self._synced = self.token()
+                self._drain()  # reload lúc nạp repository đã được tính trong trạng thái đã lưu
+        except Exception as e:
+            print(f"[Warning] Bỏ qua chỉ mục đã lưu {self.persist_path}: {e}")
+
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def shared_index(cls, sources, *args, persist_suffix: str = None):
+    """
+    Mỗi loại chỉ mục chỉ có 1 object cho cùng nguồn dữ liệu:
+    cls(*sources, *args, persist_path). persist_suffix -> lưu cạnh file của
+    nguồn chính: "<file>.<tên collection>.<suffix>"
+    """
+    key = (cls,) + tuple(os.path.abspath(s) if isinstance(s, str) else id(s) for s in sources)
+    with _shared_lock:
+        index = _shared.get(key)
+        if index is None:
+            persist_path = None
+            if persist_suffix:
+                repository = sources[0]
+                persist_path = f"{storage_path(repository)}.{repository.name}.{persist_suffix}"
+            index = _shared[key] = cls(*sources, *args, persist_path)
+        return index
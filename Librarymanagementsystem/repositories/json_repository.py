@@ -0,0 +1,362 @@
+"""
+json_repository.py
+Repository lưu dữ liệu trong file JSON (backend mặc định).
+
+Dữ liệu được giữ trong RAM và chỉ đọc lại khi file trên đĩa thay đổi
+(so chữ ký mtime/size), kèm chỉ mục băm trên khóa chính và các trường
+trong schema (username, email, user_id, ...) nên get/find là O(1). Thao tác ghi:
+- mặc định: ghi lại toàn bộ file (ghi nguyên tử qua group commit)
+- use_journal=True: chỉ ghi nối các thay đổi vào journal
+
+Mỗi transaction giữ khóa file (liên process) trong suốt chu trình
+đọc-sửa-ghi. Việc chờ fsync diễn ra sau khi đã nhả khóa, nên nhiều thread
+ghi cùng lúc được gộp chung 1 lần fsync.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from repositories.base import BaseRepository, matches
+from repositories.schema import unwrap_records
+from utils.file_cache import file_cache, file_signature
+from utils.file_lock import get_file_lock
+from utils.index_manager import IndexManager
+from utils.group_commit import group_commit
+from utils.journal import get_journal, recover_batches
+from utils.storage import io_stats, read_json
+from utils.json_stream import iter_records
+
+# Biên nhận ghi của transaction ngoài cùng trong thread hiện tại
+_local = threading.local()
+
+
+class JsonRepository(BaseRepository):
+    def __init__(self, name: str, file_path: str, key_field: str,
+                 use_journal: bool = False, indexes=()):
+        super().__init__(name, key_field)
+        self.file_path = file_path
+        self.use_journal = use_journal
+
+        self._lock = threading.RLock()
+        self._rows = {}            # số thứ tự dòng -> bản ghi (giữ thứ tự trong file)
+        self._next_row = 0
+        self._index = IndexManager([key_field, *indexes])
+        self._version = 0          # tăng mỗi lần nạp lại / thay đổi dữ liệu
+        self._wrapper_key = None   # file dạng {"books": [...]} -> "books"
+        self._signature = None     # None = chưa load / cần load lại
+        self._tx_depth = 0
+        self._pending = []         # (op, key, data) chờ lưu
+        self._undo = []            # cách hoàn tác từng thay đổi chưa lưu (xem _rollback)
+        self._full_rewrite = False
+
+        self._file_lock = get_file_lock(file_path)
+        self._state_lock = threading.Lock()
+        self._inflight = 0         # số lần ghi toàn bộ file chưa xong
+        self._loaded = False
+        # Hoàn tất transaction nhiều file bị ngắt giữa chừng (nếu có)
+        recover_batches(os.path.dirname(file_path))
+
+    @property
+    def storage_path(self) -> str:
+        return self._file_lock.file_path
+
+    @property
+    def lock(self):
+        return self._lock
+
+    # ===== Nạp dữ liệu =====
+
+    def _ensure_loaded(self) -> None:
+        """Nạp lại dữ liệu nếu file đã bị thay đổi (gọi khi đang giữ khóa)"""
+        if self._tx_depth and self._signature is not None:
+            return
+        with self._state_lock:
+            if self._inflight:
+                # File trên đĩa còn cũ hơn dữ liệu trong RAM
+                return
+            current = self._signature
+        signature = file_signature(self.file_path)
+        if signature == current:
+            return
+
+        data = read_json(self.file_path)
+        self._wrapper_key = None
+        if isinstance(data, dict) and len(data) == 1:
+            key, value = next(iter(data.items()))
+            if isinstance(value, list):
+                self._wrapper_key = key
+        self._set_records(unwrap_records(data))
+        self._signature = signature
+        if self._loaded:
+            self._emit([("reload", None, None)])
+        self._loaded = True  # lần nạp đầu: chưa có dữ liệu cũ để báo thay đổi
+
+    def _set_records(self, records) -> None:
+        self._rows = dict(enumerate(records))
+        self._next_row = len(self._rows)
+        self._index.build(self._rows.items())
+        self._version += 1
+
+    def _find_row(self, key):
+        """Số dòng của bản ghi có khóa chính = key, không có -> None"""
+        bucket = self._index.lookup(self.key_field, key)
+        if not bucket:
+            return None
+        return min(bucket) if len(bucket) > 1 else next(iter(bucket))
+
+    def _candidates(self, criteria: dict):
+        """
+        Các bản ghi cần kiểm tra cho criteria: dùng bucket nhỏ nhất trong
+        các trường có chỉ mục, không có trường nào có chỉ mục -> toàn bộ.
+        """
+        best = None
+        for field, value in criteria.items():
+            if field in self._index:
+                bucket = self._index.lookup(field, value)
+                if best is None or len(bucket) < len(best):
+                    best = bucket
+                    if not best:
+                        break
+        if best is None:
+            return self._rows.values()
+        if len(best) > 1:
+            return [best[row] for row in sorted(best)]  # giữ thứ tự trong file
+        return best.values()
+
+    # ===== Đọc =====
+
+    def all(self) -> list:
+        with self._lock:
+            self._ensure_loaded()
+            return [dict(r) for r in self._rows.values()]
+
+    def get(self, key):
+        with self._lock:
+            self._ensure_loaded()
+            row = self._find_row(key)
+            return dict(self._rows[row]) if row is not None else None
+
+    def get_many(self, keys) -> list:
+        # 1 lần khóa + kiểm tra file cho cả lô
+        with self._lock:
+            self._ensure_loaded()
+            rows = (self._find_row(key) for key in keys)
+            return [dict(self._rows[row]) for row in rows if row is not None]
+
+    def find(self, **criteria) -> list:
+        with self._lock:
+            self._ensure_loaded()
+            return [dict(r) for r in self._candidates(criteria) if matches(r, criteria)]
+
+    def find_one(self, **criteria):
+        with self._lock:
+            self._ensure_loaded()
+            record = next((r for r in self._candidates(criteria) if matches(r, criteria)), None)
+            return dict(record) if record is not None else None
+
+    def iter_all(self):
+        """
+        Đọc streaming thẳng từ file (kèm journal), bộ nhớ cố định.
+        Trong transaction còn thay đổi chưa lưu -> duyệt dữ liệu trong RAM.
+        """
+        with self._lock:
+            if self._tx_depth and (self._pending or self._full_rewrite):
+                return iter([dict(r) for r in self._rows.values()])
+        return self._iter_file()
+
+    def _iter_file(self):
+        for record in iter_records(self.file_path):
+            if isinstance(record, dict):
+                yield record
+
+    def version(self) -> int:
+        with self._lock:
+            self._ensure_loaded()
+            return self._version
+
+    def count(self, **criteria) -> int:
+        with self._lock:
+            self._ensure_loaded()
+            if not criteria:
+                return len(self._rows)
+            return sum(1 for r in self._candidates(criteria) if matches(r, criteria))
+
+    # ===== Ghi =====
+
+    def insert(self, record: dict) -> dict:
+        with self.transaction():
+            key = record.get(self.key_field)
+            if self._find_row(key) is not None:
+                raise ValueError(f"{self.key_field}={key} đã tồn tại")
+            record = dict(record)
+            row = self._next_row
+            self._next_row += 1
+            self._rows[row] = record
+            self._undo.append(("insert", row, None))
+            self._index.add(row, record)
+            self._version += 1
+            self._pending.append(("insert", key, record))
+            return dict(record)
+
+    def update(self, key, fields: dict) -> bool:
+        with self.transaction():
+            row = self._find_row(key)
+            if row is None:
+                return False
+            record = self._rows[row]
+            old_values = self._index.values_of(record)
+            self._undo.append(("update", row, dict(record)))
+            record.update(fields)
+            self._index.update(row, record, old_values)
+            self._version += 1
+            self._pending.append(("update", key, dict(fields)))
+            return True
+
+    def delete(self, key) -> bool:
+        with self.transaction():
+            row = self._find_row(key)
+            if row is None:
+                return False
+            record = self._rows.pop(row)
+            self._index.remove(row, record)
+            self._undo.append(("delete", row, record))
+            self._version += 1
+            self._pending.append(("delete", key, None))
+            return True
+
+    def replace_all(self, records: list) -> None:
+        with self.transaction():
+            self._undo.append(("replace", self._next_row, self._rows))  # (op, _next_row cũ, dữ liệu cũ)
+            self._set_records([dict(r) for r in records])
+            self._full_rewrite = True
+
+    @contextmanager
+    def transaction(self):
+        tickets = getattr(_local, "tickets", None)
+        outermost = tickets is None
+        if outermost:
+            tickets = _local.tickets = []
+        try:
+            with self._file_lock, self._lock:
+                self._ensure_loaded()
+                self._tx_depth += 1
+                try:
+                    yield self
+                except BaseException:
+                    self._tx_depth -= 1
+                    if self._tx_depth == 0:
+                        self._rollback()
+                    raise
+                self._tx_depth -= 1
+                if self._tx_depth == 0 and (self._pending or self._full_rewrite):
+                    ticket = self._flush()
+                    if ticket is not None:
+                        tickets.append(ticket)
+        finally:
+            if outermost:
+                _local.tickets = None
+
+        # Chờ dữ liệu xuống đĩa sau khi đã nhả mọi khóa
+        if outermost:
+            for ticket in tickets:
+                ticket.wait()
+
+    def redo_entries(self):
+        # Bản ghi đầy đủ hiện tại -> áp lại bao nhiêu lần cũng cùng kết quả
+        if self._tx_depth != 1 or self._full_rewrite or self._wrapper_key is not None:
+            return None
+        if not self._pending:
+            return []
+        return [
+            {"op": "delete" if op == "delete" else "insert", "key_field": self.key_field,
+             "key": key, "data": record or {}}
+            for op, key, record in self._changes()
+        ]
+
+    # ===== Lưu xuống đĩa =====
+
+    def _flush(self):
+        """Gửi thay đổi đi ghi, trả về CommitTicket (hoặc None) để chờ fsync"""
+        try:
+            if self.use_journal and not self._full_rewrite and self._wrapper_key is None:
+                journal = get_journal(self.file_path)
+                for op, key, data in self._pending:
+                    journal.append(op, self.key_field, key, data, sync=False)
+                ticket = journal.sync()
+                with self._state_lock:
+                    self._signature = file_signature(self.file_path)
+            else:
+                data = list(self._rows.values())
+                if self._wrapper_key is not None:
+                    data = {self._wrapper_key: data}
+                start = time.perf_counter()
+                text = json.dumps(data, indent=4, ensure_ascii=False)
+                io_stats.record(
+                    "write", self.file_path,
+                    bytes_written=len(text.encode("utf-8")),
+                    serialize_ms=(time.perf_counter() - start) * 1000,
+                )
+                # Giữ khóa liên process tới khi file đã ghi xong
+                self._file_lock.retain()
+                with self._state_lock:
+                    self._inflight += 1
+                ticket = group_commit.submit(self.file_path, text, on_done=self._write_done)
+        except BaseException:
+            self._rollback()
+            raise
+        self._emit(self._changes())
+        self._pending = []
+        self._undo = []
+        self._full_rewrite = False
+        return ticket
+
+    def _changes(self) -> list:
+        """Thay đổi vừa lưu, dạng gửi cho listener (bản ghi đầy đủ hiện tại)"""
+        if self._full_rewrite:
+            return [("reload", None, None)]
+        changes = []
+        for op, key, _ in self._pending:
+            if op == "delete":
+                changes.append((op, key, None))
+                continue
+            row = self._find_row(key)
+            if row is not None:
+                changes.append((op, key, dict(self._rows[row])))
+        return changes
+
+    def _write_done(self, error, signature) -> None:
+        """Gọi từ thread ghi khi file đã fsync (hoặc lỗi)"""
+        with self._state_lock:
+            self._inflight -= 1
+            # Lỗi -> lần đọc sau nạp lại từ đĩa
+            self._signature = None if error is not None else signature
+        file_cache.invalidate(self.file_path)
+        self._file_lock.release()
+
+    def _rollback(self) -> None:
+        """
+        Bỏ các thay đổi chưa lưu: hoàn tác ngược từng thay đổi trong RAM về
+        đúng trạng thái trước transaction. Không chỉ dựa vào nạp lại từ đĩa,
+        vì khi còn lần ghi trước chưa xong (_inflight) file trên đĩa cũ hơn
+        RAM và _ensure_loaded sẽ không nạp lại.
+        """
+        if self._undo:
+            for op, row, saved in reversed(self._undo):
+                if op == "insert":
+                    self._rows.pop(row, None)
+                    self._next_row = row
+                elif op == "replace":
+                    self._next_row, self._rows = row, saved
+                else:  # update / delete: đặt lại bản ghi cũ
+                    self._rows[row] = saved
+            self._rows = dict(sorted(self._rows.items()))  # giữ thứ tự trong file
+            self._index.build(self._rows.items())
+            self._version += 1
+        self._undo = []
+        self._pending = []
+        self._full_rewrite = False
+        with self._state_lock:
+            self._signature = None
@@ -0,0 +1,68 @@
+"""
+migrate.py
+Nhập dữ liệu hiện có trong data/*.json vào database SQLite.
+
+Cách dùng (chạy trong thư mục Librarymanagementsystem):
+    python -m repositories.migrate
+    python -m repositories.migrate --db data/library.db
+"""
+
+import argparse
+import os
+
+from config import SQLITE_DB_FILE
+from repositories.schema import COLLECTIONS, unwrap_records
+from repositories.sqlite_repository import SqliteRepository
+from utils.storage import read_json
+
+
+def _source_file(spec: dict):
+    """File JSON đầu tiên tồn tại trong các tên file của collection"""
+    for path in [spec["file"]] + spec["legacy_files"]:
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def migrate_json_to_sqlite(db_path: str = SQLITE_DB_FILE) -> dict:
+    """
+    Nhập toàn bộ collection vào SQLite (ghi đè dữ liệu cũ trong bảng).
+    Trả về: {collection: {"file", "imported", "skipped"}}
+    """
+    report = {}
+    for name, spec in COLLECTIONS.items():
+        path = _source_file(spec)
+        if path is None:
+            report[name] = {"file": None, "imported": 0, "skipped": 0}
+            continue
+
+        records = [r for r in unwrap_records(read_json(path)) if isinstance(r, dict)]
+        valid = [r for r in records if r.get(spec["key"]) is not None]
+
+        repo = SqliteRepository(name, spec["key"], spec["indexes"], db_path)
+        repo.replace_all(valid)
+        report[name] = {
+            "file": path,
+            "imported": repo.count(),
+            "skipped": len(records) - len(valid),
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate data/*.json sang SQLite")
+    parser.add_argument("--db", default=SQLITE_DB_FILE, help="đường dẫn file SQLite")
+    args = parser.parse_args()
+
+    report = migrate_json_to_sqlite(args.db)
+    for name, info in report.items():
+        if info["file"] is None:
+            print(f" [Migrate] {name}: không có file dữ liệu")
+        else:
+            print(f" [Migrate] {name}: {info['imported']} bản ghi từ {info['file']}"
+                  f" (bỏ qua {info['skipped']} bản ghi thiếu khóa)")
+    print(f" [Migrate] Hoàn tất -> {args.db}")
+
+
+if __name__ == "__main__":
+    main()
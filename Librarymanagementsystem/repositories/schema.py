@@ -0,0 +1,88 @@
+"""
+schema.py
+Mô tả các tập dữ liệu (collection) mà repository quản lý:
+khóa chính, các trường cần đánh chỉ mục và file JSON tương ứng.
+"""
+
+from config import (
+    BOOKS_FILE,
+    AUTHORS_FILE,
+    USERS_FILE,
+    BORROW_ORDERS_FILE,
+    BORROW_REQUESTS_FILE,
+    FINES_FILE,
+    NOTIFICATIONS_FILE,
+    WAITING_LISTS_FILE,
+    DATA_DIR,
+)
+
+# name -> {key, indexes, file, legacy_files}
+# legacy_files: tên file cũ đang có trong data/ (dùng khi migrate)
+COLLECTIONS = {
+    "books": {
+        "key": "book_id",
+        "indexes": ["status", "category_id"],
+        "file": BOOKS_FILE,
+        "legacy_files": [f"{DATA_DIR}/book.json"],
+    },
+    "authors": {
+        "key": "author_id",
+        "indexes": [],
+        "file": AUTHORS_FILE,
+        "legacy_files": [],
+    },
+    "users": {
+        "key": "user_id",
+        "indexes": ["username", "email", "status"],
+        "file": USERS_FILE,
+        "legacy_files": [f"{DATA_DIR}/user.json"],
+    },
+    "borrow_orders": {
+        "key": "borrow_id",
+        "indexes": ["user_id", "book_id", "status"],
+        "file": BORROW_ORDERS_FILE,
+        "legacy_files": [],
+    },
+    "borrow_requests": {
+        "key": "request_id",
+        "indexes": ["user_id", "status"],
+        "file": BORROW_REQUESTS_FILE,
+        "legacy_files": [],
+    },
+    "fines": {
+        "key": "fine_id",
+        "indexes": ["user_id", "status"],
+        "file": FINES_FILE,
+        "legacy_files": [f"{DATA_DIR}/fine.json"],
+    },
+    "notifications": {
+        "key": "notification_id",
+        "indexes": ["user_id", "status"],
+        "file": NOTIFICATIONS_FILE,
+        "legacy_files": [f"{DATA_DIR}/notification.json"],
+    },
+    "waiting_lists": {
+        "key": "waiting_list_id",
+        "indexes": ["user_id"],
+        "file": WAITING_LISTS_FILE,
+        "legacy_files": [f"{DATA_DIR}/waiting_list.json"],
+    },
+}
+
+
+def unwrap_records(data):
+    """
+    Chuẩn hóa dữ liệu đọc từ file về list[dict].
+    - list -> giữ nguyên
+    - {"books": [...]} (dict bọc 1 list) -> list bên trong
+    - 1 bản ghi dạng dict -> [dict]
+    """
+    if isinstance(data, list):
+        return data
+    if isinstance(data, dict):
+        lists = [v for v in data.values() if isinstance(v, list)]
+        if len(data) == 1 and lists:
+            return lists[0]
+        if data:
+            return [data]
+    return []
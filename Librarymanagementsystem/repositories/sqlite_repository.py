@@ -0,0 +1,253 @@
+"""
+sqlite_repository.py
+Repository lưu dữ liệu trong SQLite (thư viện chuẩn sqlite3).
+
+Mỗi collection là 1 bảng:
+- cột khóa chính + các cột được đánh chỉ mục (username, email, status, ...)
+- cột `data` chứa toàn bộ bản ghi dạng JSON
+Database chạy ở chế độ WAL để nhiều process đọc/ghi cùng lúc.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from repositories.base import BaseRepository, matches
+
+# Mỗi thread dùng 1 connection cho mỗi file database, để transaction
+# trên nhiều bảng (books + borrow_orders) nằm chung 1 transaction SQLite.
+_local = threading.local()
+
+# Số tham số tối đa trong 1 câu SQL (giới hạn mặc định của SQLite cũ là 999)
+_MAX_PARAMS = 500
+
+
+class _ConnectionState:
+    def __init__(self, conn):
+        self.conn = conn
+        self.depth = 0
+        self.changes = []  # (repository, (op, key, record)) chờ COMMIT
+
+
+def _connection_state(db_path: str) -> _ConnectionState:
+    states = getattr(_local, "states", None)
+    if states is None:
+        states = _local.states = {}
+
+    key = os.path.abspath(db_path)
+    state = states.get(key)
+    if state is None:
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # isolation_level=None: tự quản lý BEGIN/COMMIT
+        conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        state = states[key] = _ConnectionState(conn)
+    return state
+
+
+def _column_value(value):
+    """Giá trị lưu vào cột chỉ mục (list/dict -> chuỗi JSON)"""
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+class SqliteRepository(BaseRepository):
+    def __init__(self, name: str, key_field: str, indexes: list, db_path: str):
+        super().__init__(name, key_field)
+        self.db_path = db_path
+        self.indexes = list(indexes)
+        self.columns = [key_field] + self.indexes
+        self._writes = 0  # số lần ghi từ process này (data_version không tính)
+        self._ensure_schema()
+
+    @property
+    def storage_path(self) -> str:
+        return os.path.abspath(self.db_path)
+
+    @property
+    def _state(self) -> _ConnectionState:
+        return _connection_state(self.db_path)
+
+    def _ensure_schema(self) -> None:
+        conn = self._state.conn
+        columns = ", ".join(f'"{c}"' for c in self.indexes)
+        conn.execute(
+            f'CREATE TABLE IF NOT EXISTS "{self.name}" '
+            f'("{self.key_field}" PRIMARY KEY, {columns + ", " if columns else ""}data TEXT NOT NULL)'
+        )
+        for column in self.indexes:
+            conn.execute(
+                f'CREATE INDEX IF NOT EXISTS "idx_{self.name}_{column}" '
+                f'ON "{self.name}" ("{column}")'
+            )
+
+    def _changed(self, op, key, record) -> None:
+        """Ghi nhận thay đổi (luôn trong transaction); listener chỉ nhận sau khi COMMIT"""
+        self._state.changes.append((self, (op, key, record)))
+
+    def _row_values(self, record: dict) -> list:
+        values = [_column_value(record.get(c)) for c in self.columns]
+        values.append(json.dumps(record, ensure_ascii=False))
+        return values
+
+    # ===== Đọc =====
+
+    def all(self) -> list:
+        rows = self._state.conn.execute(f'SELECT data FROM "{self.name}" ORDER BY rowid')
+        return [json.loads(data) for (data,) in rows]
+
+    def get(self, key):
+        row = self._state.conn.execute(
+            f'SELECT data FROM "{self.name}" WHERE "{self.key_field}" IS ?', (key,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_many(self, keys) -> list:
+        keys = list(keys)
+        found = {}
+        for start in range(0, len(keys), _MAX_PARAMS):
+            chunk = keys[start:start + _MAX_PARAMS]
+            rows = self._state.conn.execute(
+                f'SELECT "{self.key_field}", data FROM "{self.name}" '
+                f'WHERE "{self.key_field}" IN ({", ".join("?" * len(chunk))})', chunk
+            )
+            found.update(rows)
+        return [json.loads(found[key]) for key in keys if key in found]
+
+    def _select(self, criteria: dict, columns: str = "data"):
+        """
+        Điều kiện trên cột có chỉ mục -> WHERE trong SQL,
+        điều kiện còn lại -> lọc lại bằng Python.
+        """
+        indexed = {f: v for f, v in criteria.items() if f in self.columns}
+        rest = {f: v for f, v in criteria.items() if f not in self.columns}
+        sql = f'SELECT {columns} FROM "{self.name}"'
+        if indexed:
+            sql += " WHERE " + " AND ".join(f'"{f}" IS ?' for f in indexed)
+        sql += " ORDER BY rowid"
+        params = [_column_value(v) for v in indexed.values()]
+        return self._state.conn.execute(sql, params), rest
+
+    def find(self, **criteria) -> list:
+        rows, rest = self._select(criteria)
+        records = (json.loads(data) for (data,) in rows)
+        return [r for r in records if matches(r, rest)]
+
+    def iter_all(self):
+        # Cursor của sqlite3 trả từng dòng, không nạp cả bảng vào RAM
+        rows = self._state.conn.execute(f'SELECT data FROM "{self.name}" ORDER BY rowid')
+        return (json.loads(data) for (data,) in rows)
+
+    def iter_find(self, **criteria):
+        rows, rest = self._select(criteria)
+        records = (json.loads(data) for (data,) in rows)
+        return (r for r in records if matches(r, rest))
+
+    def find_one(self, **criteria):
+        rows, rest = self._select(criteria)
+        for (data,) in rows:
+            record = json.loads(data)
+            if matches(record, rest):
+                return record
+        return None
+
+    def version(self):
+        # data_version đổi khi connection KHÁC commit; lần ghi của chính
+        # process này được đếm bằng _writes
+        (data_version,) = self._state.conn.execute("PRAGMA data_version").fetchone()
+        return data_version, self._writes
+
+    def count(self, **criteria) -> int:
+        if all(f in self.columns for f in criteria):
+            rows, _ = self._select(criteria, columns="COUNT(*)")
+            return rows.fetchone()[0]
+        return len(self.find(**criteria))
+
+    # ===== Ghi =====
+
+    # Mọi thao tác ghi đều đi qua transaction(): gọi riêng lẻ thì tự COMMIT,
+    # nằm trong transactions(...) thì COMMIT / ROLLBACK cùng cả lô
+
+    def insert(self, record: dict) -> dict:
+        placeholders = ", ".join("?" for _ in range(len(self.columns) + 1))
+        names = ", ".join(f'"{c}"' for c in self.columns)
+        with self.transaction():
+            self._writes += 1
+            try:
+                self._state.conn.execute(
+                    f'INSERT INTO "{self.name}" ({names}, data) VALUES ({placeholders})',
+                    self._row_values(record),
+                )
+            except sqlite3.IntegrityError:
+                raise ValueError(f"{self.key_field}={record.get(self.key_field)} đã tồn tại")
+            self._changed("insert", record.get(self.key_field), dict(record))
+        return dict(record)
+
+    def update(self, key, fields: dict) -> bool:
+        with self.transaction():
+            record = self.get(key)
+            if record is None:
+                return False
+            record.update(fields)
+            self._writes += 1
+            assignments = ", ".join(f'"{c}" = ?' for c in self.columns)
+            self._state.conn.execute(
+                f'UPDATE "{self.name}" SET {assignments}, data = ? WHERE "{self.key_field}" IS ?',
+                self._row_values(record) + [key],
+            )
+            self._changed("update", key, dict(record))
+            return True
+
+    def delete(self, key) -> bool:
+        with self.transaction():
+            self._writes += 1
+            cursor = self._state.conn.execute(
+                f'DELETE FROM "{self.name}" WHERE "{self.key_field}" IS ?', (key,)
+            )
+            if cursor.rowcount > 0:
+                self._changed("delete", key, None)
+            return cursor.rowcount > 0
+
+    def replace_all(self, records: list) -> None:
+        placeholders = ", ".join("?" for _ in range(len(self.columns) + 1))
+        names = ", ".join(f'"{c}"' for c in self.columns)
+        with self.transaction():
+            self._writes += 1
+            conn = self._state.conn
+            conn.execute(f'DELETE FROM "{self.name}"')
+            conn.executemany(
+                f'INSERT OR REPLACE INTO "{self.name}" ({names}, data) VALUES ({placeholders})',
+                (self._row_values(r) for r in records),
+            )
+            self._changed("reload", None, None)
+
+    @contextmanager
+    def transaction(self):
+        state = self._state
+        if state.depth == 0:
+            # IMMEDIATE: giữ khóa ghi ngay từ đầu -> read-modify-write an toàn
+            state.conn.execute("BEGIN IMMEDIATE")
+        state.depth += 1
+        try:
+            yield self
+        except BaseException:
+            state.depth -= 1
+            if state.depth == 0:
+                state.changes = []
+                state.conn.execute("ROLLBACK")
+            raise
+        state.depth -= 1
+        if state.depth == 0:
+            state.conn.execute("COMMIT")
+            changes, state.changes = state.changes, []
+            by_repo = {}
+            for repo, change in changes:
+                by_repo.setdefault(repo, []).append(change)
+            for repo, repo_changes in by_repo.items():
+                repo._emit(repo_changes)
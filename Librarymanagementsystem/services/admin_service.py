@@ -1,12 +1,12 @@
-from utils.file_handler import read_json, write_json
+from repositories import get_repository
 from services.borrow_service import BorrowService
 
 
 class AdminService:
 
-    def __init__(self):
-        self.users = read_json("data/user.json")
-        self.books = read_json("data/book.json")
+    def __init__(self, user_path="data/user.json", book_path="data/book.json"):
+        self.users = get_repository("users", user_path)
+        self.books = get_repository("books", book_path)
         self.borrow_service = BorrowService()
 
     # ==================================================
@@ -14,30 +14,26 @@ class AdminService:
     # ==================================================
 
     def get_all_members(self):
-        return [u for u in self.users if u.get("role") == "MEMBER"]
+        return self.users.find(role="MEMBER")
 
     def add_member(self, user_data):
-        new_id = max(u["user_id"] for u in self.users) + 1
+        new_id = max((u["user_id"] for u in self.users.all()), default=0) + 1
 
         user_data["user_id"] = new_id
         user_data["role"] = "MEMBER"
         user_data["status"] = "ACTIVE"
 
-        self.users.append(user_data)
-        write_json("data/user.json", self.users)
+        self.users.insert(user_data)
         return True
 
     def update_member(self, user_id, new_data):
-        for u in self.users:
-            if u["user_id"] == user_id and u["role"] == "MEMBER":
-                u.update(new_data)
-                write_json("data/user.json", self.users)
-                return True
+        user = self.users.get(user_id)
+        if user and user["role"] == "MEMBER":
+            return self.users.update(user_id, new_data)
         return False
 
     def delete_member(self, user_id):
-        self.users = [u for u in self.users if u["user_id"] != user_id]
-        write_json("data/user.json", self.users)
+        self.users.delete(user_id)
         return True
 
     # ==================================================
@@ -45,26 +41,19 @@ class AdminService:
     # ==================================================
 
     def get_all_books(self):
-        return self.books
+        return self.books.all()
 
     def add_book(self, book_data):
-        new_id = max(b["book_id"] for b in self.books) + 1
+        new_id = max((b["book_id"] for b in self.books.all()), default=0) + 1
         book_data["book_id"] = new_id
-        self.books.append(book_data)
-        write_json("data/book.json", self.books)
+        self.books.insert(book_data)
         return True
 
     def update_book(self, book_id, new_data):
-        for b in self.books:
-            if b["book_id"] == book_id:
-                b.update(new_data)
-                write_json("data/book.json", self.books)
-                return True
-        return False
+        return self.books.update(book_id, new_data)
 
     def delete_book(self, book_id):
-        self.books = [b for b in self.books if b["book_id"] != book_id]
-        write_json("data/book.json", self.books)
+        self.books.delete(book_id)
         return True
 
     # ==================================================
@@ -1,130 +1,296 @@
 # services/book_service.py
 from models.book import Book
 from models.author import Author
-from utils.file_handler_fix import load_json, save_json
+from config import BOOK_CACHE_MAX_SIZE, BOOK_CACHE_TTL
+from repositories import get_repository
+from services.search_index import (
+    StaleCursorError, get_book_autocomplete, get_book_bitmap_index, get_book_category_index,
+    get_book_filter_index, get_book_order_index, get_book_search_index
+)
+from utils.query_engine import Predicate
+from utils.text_search import fold
+from utils.file_cache import file_signature
+from utils.lru_cache import LRUCache
+from utils.pagination import sort_value
+from utils.storage import read_json
+import copy
+import os
+import threading
 import uuid
 
+_book_caches = {}
+_book_caches_lock = threading.Lock()
+
+
+def get_book_cache(books_repo, authors_repo, book_author_path: str) -> LRUCache:
+    """
+    Cache Book đã hydrate dùng chung cho mọi BookService cùng nguồn dữ liệu.
+    Mọi thay đổi sách (BorrowService đổi số lượng, AdminService sửa/xóa, ...)
+    đều ghi qua repository books -> change feed xóa đúng book_id đó;
+    tác giả đổi -> xóa hết.
+    """
+    key = (id(books_repo), id(authors_repo), os.path.abspath(book_author_path))
+    with _book_caches_lock:
+        cache = _book_caches.get(key)
+        if cache is None:
+            cache = _book_caches[key] = LRUCache(BOOK_CACHE_MAX_SIZE, BOOK_CACHE_TTL)
+
+            def on_books_changed(changes):
+                for op, book_id, _ in changes:
+                    if op == "reload":
+                        cache.clear()
+                    else:
+                        cache.invalidate(book_id)
+
+            books_repo.subscribe(on_books_changed)
+            authors_repo.subscribe(lambda changes: cache.clear())
+        return cache
+
+
 class BookService:
     def __init__(self, book_path="data/books.json", author_path="data/authors.json", 
-                 categories_file="data/categories.json"):
+                 categories_file="data/categories.json", book_author_path="data/book_author.json"):
         self.book_path = book_path
         self.author_path = author_path
         self.categories_file = categories_file
+        self.book_author_path = book_author_path
+        self.books = get_repository("books", book_path)
+        self.authors = get_repository("authors", author_path)
+        # (dấu phiên bản dữ liệu, {author_id: Author}, {book_id: author_id})
+        self._join = (None, {}, {})
+        self.search_index = get_book_search_index(
+            self.books, self.authors, book_author_path, self._search_describer
+        )
+        self.autocomplete = get_book_autocomplete(
+            self.books, self.authors, book_author_path, self._search_describer
+        )
+        self.category_index = get_book_category_index(self.books)
+        self.filter_index = get_book_filter_index(
+            self.books, self.authors, book_author_path, self._filter_describer
+        )
+        self.bitmap_index = get_book_bitmap_index(self.books)
+        self.order_index = get_book_order_index(self.books)
+        self.book_cache = get_book_cache(self.books, self.authors, book_author_path)
 
-    def search_books(self, keyword: str) -> list[Book]:
-        """Tìm kiếm sách theo từ khóa"""
-        try:
-            books_data = load_json(self.book_path)
-            authors_data = load_json(self.author_path)
-            
-            results = []
-            for book_data in books_data:
-                # Kiểm tra keyword trong title, description
-                title = book_data.get("title", "").lower()
-                description = book_data.get("description", "").lower()
-                keyword_lower = keyword.lower()
-                
-                if (keyword_lower in title or 
-                    keyword_lower in description or
-                    keyword_lower in str(book_data.get("book_id", "")).lower()):
-                    
-                    # Tìm tác giả
-                    author = None
-                    author_id = book_data.get("author_id")
-                    if author_id:
-                        author_data = next((a for a in authors_data if a.get("author_id") == author_id), None)
-                        if author_data:
-                            author = Author(
-                                author_id=author_data.get("author_id", 0),
-                                author_name=author_data.get("author_name", "Unknown")
-                            )
-                    
-                    book = Book(
-                        book_id=book_data.get("book_id"),
-                        title=book_data.get("title", ""),
-                        description=book_data.get("description", ""),
-                        publication_year=book_data.get("publication_year", 0),
-                        quantity=book_data.get("quantity", 0),
-                        available_quantity=book_data.get("available_quantity", 0),
-                        status=book_data.get("status", "AVAILABLE"),
-                        author=author,
-                        category_id=book_data.get("category_id", 0)
+    def _author_join(self):
+        """
+        Bảng tác giả dựng sẵn: {author_id: Author} (mỗi tác giả 1 object dùng
+        chung) + quan hệ book_id -> author_id từ book_author.json.
+        Chỉ dựng lại khi authors hoặc book_author.json thay đổi.
+        """
+        token = (self.authors.version(), file_signature(self.book_author_path))
+        if token != self._join[0]:
+            authors = {}
+            for data in self.authors.all():
+                author_id = data.get("author_id")
+                if author_id is not None:
+                    authors[str(author_id)] = Author(
+                        author_id=author_id,
+                        author_name=data.get("author_name", "Unknown")
                     )
-                    results.append(book)
-            
-            return results
+            book_authors = {}
+            for rel in read_json(self.book_author_path):
+                if isinstance(rel, dict):
+                    book_authors.setdefault(str(rel.get("book_id")), rel.get("author_id"))
+            self._join = (token, authors, book_authors)
+        return self._join
+
+    @staticmethod
+    def _author_of(book_data: dict, join):
+        _, authors, book_authors = join
+        author_id = book_data.get("author_id")
+        if not author_id:
+            author_id = book_authors.get(str(book_data.get("book_id")))
+        return authors.get(str(author_id)) if author_id else None
+
+    def _search_describer(self):
+        """Hàm dựng tài liệu tìm kiếm cho 1 lô sách, dùng chung 1 bảng join tác giả"""
+        join = self._author_join()
+        return lambda book_data: self._search_document(book_data, join)
+
+    def _filter_describer(self):
+        """Hàm dựng facts lọc cho 1 lô sách, dùng chung 1 bảng join tác giả"""
+        join = self._author_join()
+        return lambda book_data: self._filter_facts(book_data, join)
+
+    def _search_document(self, book_data: dict, join) -> dict:
+        """Các trường được đưa vào chỉ mục tìm kiếm"""
+        author = self._author_of(book_data, join)
+        return {
+            "book_id": book_data.get("book_id"),
+            "title": book_data.get("title"),
+            "description": book_data.get("description"),
+            "author": author.getAuthorName() if author else None,
+        }
+
+    def _filter_facts(self, book_data: dict, join) -> dict:
+        """Các trường dùng để lọc (query_books)"""
+        author = self._author_of(book_data, join)
+        return {
+            "category_id": str(book_data.get("category_id")),
+            "author_id": str(author.author_id) if author else None,
+            "status": book_data.get("status", "AVAILABLE"),
+            "available": int(book_data.get("available_quantity", 0) or 0) > 0,
+            "publication_year": int(book_data.get("publication_year", 0) or 0),
+        }
+
+    def _hydrate(self, book_data: dict, join) -> Book:
+        """Dựng Book từ dict, tác giả lấy từ bảng dựng sẵn (không tạo Author mới)"""
+        author = self._author_of(book_data, join)
+
+        return Book(
+            book_id=book_data.get("book_id"),
+            title=book_data.get("title", ""),
+            description=book_data.get("description", ""),
+            publication_year=book_data.get("publication_year", 0),
+            quantity=book_data.get("quantity", 0),
+            available_quantity=book_data.get("available_quantity", 0),
+            status=book_data.get("status", "AVAILABLE"),
+            author=author,
+            category_id=book_data.get("category_id", 0)
+        )
+
+    def search_books(self, keyword: str, fuzzy: bool = False) -> list[Book]:
+        """
+        Tìm kiếm sách theo từ khóa (title, description, tác giả, book_id).
+        Không phân biệt hoa thường/dấu ("de men" khớp "Dế Mèn"), từ cuối
+        được hiểu là tiền tố; kết quả xếp theo độ liên quan (BM25).
+        fuzzy=True: chấp nhận gõ sai chính tả ("de mem phieu luu" vẫn khớp)
+        """
+        try:
+            if not keyword or not keyword.strip():
+                return self.get_all_books()
+
+            hits = self.search_index.search(keyword, fuzzy=fuzzy)
+            return self._books_of(hits)
         except Exception as e:
             print(f"Error searching books: {e}")
             return []
 
+    def suggest(self, prefix: str, limit: int = 10) -> list[str]:
+        """Gợi ý khi gõ: tiêu đề / tên tác giả bắt đầu bằng prefix, phổ biến trước"""
+        try:
+            return [text for text, _ in self.autocomplete.complete(prefix, limit)]
+        except Exception as e:
+            print(f"Error suggesting books: {e}")
+            return []
+
+    def search_books_page(self, keyword: str, limit: int = 20, cursor=None,
+                          fuzzy: bool = False):
+        """
+        Giống search_books nhưng theo trang: chỉ giữ `limit` kết quả tốt nhất
+        (heap giới hạn) và chỉ dựng Book cho các dòng trong trang.
+        Trả về (list[Book], next_cursor); truyền next_cursor để lấy trang sau,
+        None = hết kết quả. Các trang sau giữ thứ hạng lúc lấy trang đầu (sách
+        thêm sau đó không xuất hiện); nếu thứ hạng đó không còn giữ được thì
+        ném StaleCursorError -> gọi lại không có cursor.
+        """
+        try:
+            if not keyword or not keyword.strip():
+                return self.get_books_page(limit, cursor)
+
+            hits, next_cursor = self.search_index.search_page(keyword, limit, cursor, fuzzy=fuzzy)
+            return self._books_of(hits, cache=True), next_cursor
+        except StaleCursorError:
+            raise
+        except Exception as e:
+            print(f"Error searching books: {e}")
+            return [], None
+
+    def get_books_page(self, limit: int = 20, cursor=None, sort_by: str = "book_id"):
+        """
+        Danh sách sách theo trang, sắp xếp theo trường sort_by (bằng nhau thì
+        theo book_id). Trả về (list[Book], next_cursor).
+        Thứ tự lấy từ chỉ mục sắp xếp dựng sẵn: mỗi trang chỉ đọc và dựng
+        Book cho các sách trong trang.
+        """
+        try:
+            book_ids, next_cursor = self.order_index.page(sort_by, limit, cursor)
+            join = self._author_join()
+
+            books = []
+            for book_id in book_ids:
+                book_data = self.books.get(book_id)
+                if book_data:
+                    books.append(self._hydrate(book_data, join))
+            return books, next_cursor
+        except Exception as e:
+            print(f"Error getting books: {e}")
+            return [], None
+
+    def _load_book(self, book_id):
+        """(chữ ký book_author.json, Book) để lưu vào cache"""
+        signature = file_signature(self.book_author_path)
+        book_data = self.books.get(book_id)
+        if not book_data:
+            return None
+        return signature, self._hydrate(book_data, self._author_join())
+
     def get_book_by_id(self, book_id: str):
-        """Lấy thông tin chi tiết sách"""
+        """
+        Lấy thông tin chi tiết sách (qua cache Book đã hydrate).
+        Trả về bản sao của Book trong cache: người gọi sửa Book không làm đổi
+        cache; muốn đổi dữ liệu sách hãy ghi qua service. Tác giả vẫn là
+        Author dùng chung của bảng join (chỉ đọc).
+        """
         try:
-            books_data = load_json(self.book_path)
-            authors_data = load_json(self.author_path)
-            
-            book_data = next((b for b in books_data if b.get("book_id") == book_id), None)
-            if not book_data:
-                return None
-            
-            # Tìm tác giả
-            author = None
-            author_id = book_data.get("author_id")
-            if author_id:
-                author_data = next((a for a in authors_data if a.get("author_id") == author_id), None)
-                if author_data:
-                    author = Author(
-                        author_id=author_data.get("author_id", 0),
-                        author_name=author_data.get("author_name", "Unknown")
-                    )
-            
-            book = Book(
-                book_id=book_data.get("book_id"),
-                title=book_data.get("title", ""),
-                description=book_data.get("description", ""),
-                publication_year=book_data.get("publication_year", 0),
-                quantity=book_data.get("quantity", 0),
-                available_quantity=book_data.get("available_quantity", 0),
-                status=book_data.get("status", "AVAILABLE"),
-                author=author,
-                category_id=book_data.get("category_id", 0)
-            )
-            
-            return book
+            entry = self.book_cache.get_or_load(book_id, self._load_book)
+            if entry is not None and entry[0] != file_signature(self.book_author_path):
+                # book_author.json đổi (không có change feed) -> tác giả có thể đã khác
+                self.book_cache.invalidate(book_id)
+                entry = self.book_cache.get_or_load(book_id, self._load_book)
+            return copy.copy(entry[1]) if entry is not None else None
         except Exception as e:
             print(f"Error getting book: {e}")
             return None
 
+    def _books_of(self, hits, cache: bool = False) -> list[Book]:
+        """
+        Dựng Book cho các kết quả tìm kiếm [(book_id, điểm), ...]: cache kết
+        quả tìm kiếm chỉ giữ book_id, số lượng còn lại luôn lấy mới.
+        Chữ ký book_author.json và bảng join chỉ kiểm tra 1 lần cho cả lô;
+        Book đã có trong cache được dùng lại, phần còn lại đọc 1 lần từ
+        repository. cache=True (1 trang kết quả) -> lưu Book vừa dựng vào
+        cache; cả danh sách kết quả thì không, để khỏi đẩy các sách khác ra.
+        """
+        signature = file_signature(self.book_author_path)
+        books, missing = {}, []
+        for book_id, _score in hits:
+            entry = self.book_cache.get(book_id)
+            if entry is not None and entry[0] == signature:
+                books[book_id] = copy.copy(entry[1])
+            else:
+                missing.append(book_id)
+
+        if missing:
+            generation = self.book_cache.generation
+            join = self._author_join()
+            key_field = self.books.key_field
+            for book_data in self.books.get_many(missing):
+                book = self._hydrate(book_data, join)
+                if cache:
+                    self.book_cache.put(book_data[key_field], (signature, book), generation)
+                    book = copy.copy(book)
+                books[book_data[key_field]] = book
+        return [books[book_id] for book_id, _score in hits if book_id in books]
+
+    def cache_stats(self) -> dict:
+        """Số liệu cache Book: hits, misses, hit_rate, size, max_size, ..."""
+        return self.book_cache.stats()
+
+    def query_cache_stats(self) -> dict:
+        """Số liệu cache kết quả tìm kiếm (khóa = từ khóa đã chuẩn hóa + fuzzy)"""
+        return self.search_index.results.stats()
+
     def get_all_books(self):
         """Lấy tất cả sách"""
         try:
-            books_data = load_json(self.book_path)
-            authors_data = load_json(self.author_path)
+            books_data = self.books.all()
+            join = self._author_join()
             
             books = []
             for book_data in books_data:
-                # Tìm tác giả
-                author = None
-                author_id = book_data.get("author_id")
-                if author_id:
-                    author_data = next((a for a in authors_data if a.get("author_id") == author_id), None)
-                    if author_data:
-                        author = Author(
-                            author_id=author_data.get("author_id", 0),
-                            author_name=author_data.get("author_name", "Unknown")
-                        )
-                
-                book = Book(
-                    book_id=book_data.get("book_id"),
-                    title=book_data.get("title", ""),
-                    description=book_data.get("description", ""),
-                    publication_year=book_data.get("publication_year", 0),
-                    quantity=book_data.get("quantity", 0),
-                    available_quantity=book_data.get("available_quantity", 0),
-                    status=book_data.get("status", "AVAILABLE"),
-                    author=author,
-                    category_id=book_data.get("category_id", 0)
-                )
+                book = self._hydrate(book_data, join)
                 books.append(book)
             
             return books
@@ -133,43 +299,128 @@ class BookService:
             return []
 
     def view_books_by_category(self, category_id: str) -> list[Book]:
-        """Xem sách theo thể loại"""
+        """Xem sách theo thể loại (tra chỉ mục thể loại, không duyệt cả danh mục)"""
         try:
-            books_data = load_json(self.book_path)
-            authors_data = load_json(self.author_path)
+            join = self._author_join()
             
             results = []
-            for book_data in books_data:
-                if str(book_data.get("category_id")) == str(category_id):
-                    # Tìm tác giả
-                    author = None
-                    author_id = book_data.get("author_id")
-                    if author_id:
-                        author_data = next((a for a in authors_data if str(a.get("author_id")) == str(author_id)), None)
-                        if author_data:
-                            author = Author(
-                                author_id=author_data.get("author_id", 0),
-                                author_name=author_data.get("author_name", "Unknown")
-                            )
-                    
-                    book = Book(
-                        book_id=book_data.get("book_id"),
-                        title=book_data.get("title", ""),
-                        description=book_data.get("description", ""),
-                        publication_year=book_data.get("publication_year", 0),
-                        quantity=book_data.get("quantity", 0),
-                        available_quantity=book_data.get("available_quantity", 0),
-                        status=book_data.get("status", "AVAILABLE"),
-                        author=author,
-                        category_id=book_data.get("category_id", 0)
-                    )
-                    results.append(book)
+            for book_id in self.category_index.book_ids(category_id):
+                book_data = self.books.get(book_id)
+                if book_data:
+                    results.append(self._hydrate(book_data, join))
             
             return results
         except Exception as e:
             print(f"Error getting books by category: {e}")
             return []
 
+    def _query_predicates(self, category=None, author=None, year_from=None, year_to=None,
+                          status=None, available=None) -> list:
+        predicates = []
+        if category is not None:
+            predicates.append(Predicate("category_id", [str(category)]))
+        if author is not None:
+            # author: author_id hoặc tên tác giả (không phân biệt hoa thường/dấu)
+            _, authors, _ = self._author_join()
+            wanted = fold(author).strip()
+            ids = [a_id for a_id, a in authors.items()
+                   if a_id == str(author) or fold(a.getAuthorName()).strip() == wanted]
+            predicates.append(Predicate("author_id", ids or [str(author)]))
+        if status is not None:
+            predicates.append(Predicate("status", [status]))
+        if available is not None:
+            predicates.append(Predicate("available", [bool(available)]))
+        if year_from is not None or year_to is not None:
+            predicates.append(Predicate(
+                "publication_year",
+                low=int(year_from) if year_from is not None else None,
+                high=int(year_to) if year_to is not None else None,
+            ))
+        return predicates
+
+    def query_books(self, category=None, author=None, year_from=None, year_to=None,
+                    status=None, available=None) -> list[Book]:
+        """
+        Lọc sách theo nhiều điều kiện cùng lúc (AND), ví dụ:
+        query_books(category=1, author="Tô Hoài", year_from=1990, year_to=2005, available=True)
+        Kết quả sắp theo book_id.
+        """
+        try:
+            hits, _ = self.filter_index.execute(self._query_predicates(
+                category, author, year_from, year_to, status, available
+            ))
+            join = self._author_join()
+
+            results = []
+            for book_id in sorted((h for h, _ in hits), key=sort_value):
+                book_data = self.books.get(book_id)
+                if book_data:
+                    results.append(self._hydrate(book_data, join))
+            return results
+        except Exception as e:
+            print(f"Error querying books: {e}")
+            return []
+
+    def explain_query(self, category=None, author=None, year_from=None, year_to=None,
+                      status=None, available=None) -> dict:
+        """
+        Kế hoạch thực thi của query_books với cùng điều kiện:
+        {"strategy", "indexes": [{"field", "estimated_rows"}], "filters",
+         "rows_scanned", "rows_returned"}
+        """
+        _, explain = self.filter_index.execute(self._query_predicates(
+            category, author, year_from, year_to, status, available
+        ))
+        return explain
+
+    def _bitmap_filter(self, status=None, category=None, available=None,
+                       year_from=None, year_to=None, exclude_status=None):
+        """Bitmap các sách thỏa điều kiện; mỗi điều kiện nhận 1 giá trị hoặc list (OR)"""
+        def as_list(value, convert=lambda v: v):
+            values = value if isinstance(value, (list, tuple, set)) else [value]
+            return [convert(v) for v in values]
+
+        where = {}
+        if status is not None:
+            where["status"] = as_list(status)
+        if category is not None:
+            where["category_id"] = as_list(category, str)
+        if available is not None:
+            where["available"] = [bool(available)]
+        exclude = {"status": as_list(exclude_status)} if exclude_status is not None else None
+        return self.bitmap_index.select(where, exclude, year_from, year_to)
+
+    def count_books(self, **filters) -> int:
+        """
+        Đếm sách thỏa điều kiện lọc (cho thanh lọc / bộ đếm), chỉ dùng bitmap.
+        filters: status, category, available, year_from, year_to, exclude_status
+        """
+        try:
+            return len(self._bitmap_filter(**filters))
+        except Exception as e:
+            print(f"Error counting books: {e}")
+            return 0
+
+    def filter_books(self, limit: int = None, **filters) -> list[Book]:
+        """
+        Lọc sách bằng phép toán bitmap, ví dụ:
+        filter_books(category=[1, 2], available=True, year_from=1990, exclude_status="LOST")
+        Chỉ dựng Book cho tối đa `limit` sách đầu tiên.
+        """
+        try:
+            bitmap = self._bitmap_filter(**filters)
+            join = self._author_join()
+
+            results = []
+            for book_id in self.bitmap_index.book_ids(bitmap, limit):
+                book_data = self.books.get(book_id)
+                if book_data:
+                    results.append(self._hydrate(book_data, join))
+            return results
+        except Exception as e:
+            print(f"Error filtering books: {e}")
+            return []
+
     def view_book_details(self, book_id: str):
         """Xem chi tiết sách"""
         book = self.get_book_by_id(book_id)
@@ -177,10 +428,36 @@ class BookService:
             return book.getDetails()
         return None
 
+    def get_category_facets(self) -> dict:
+        """
+        Số liệu dựng sẵn theo thể loại:
+        {str(category_id): {"books", "total", "available", "borrowed"}}
+        """
+        try:
+            return self.category_index.get_facets()
+        except Exception as e:
+            print(f"Error getting category facets: {e}")
+            return {}
+
     def get_categories(self):
-        """Lấy danh sách thể loại"""
+        """Lấy danh sách thể loại, mỗi thể loại kèm số liệu facet"""
         try:
-            categories = load_json(self.categories_file)
+            categories = read_json(self.categories_file)
+            facets = self.get_category_facets()
+            empty = {"books": 0, "total": 0, "available": 0, "borrowed": 0}
+
+            def with_counts(items):
+                return [
+                    {**c, **facets.get(str(c.get("category_id")), empty)}
+                    if isinstance(c, dict) else c
+                    for c in items
+                ]
+
+            # Không sửa object trong cache của read_json
+            if isinstance(categories, dict) and isinstance(categories.get("categories"), list):
+                return {**categories, "categories": with_counts(categories["categories"])}
+            if isinstance(categories, list):
+                return with_counts(categories)
             return categories
         except Exception as e:
             print(f"Error getting categories: {e}")
@@ -0,0 +1,216 @@
+"""
+borrow_index.py
+Chỉ mục suy ra từ repository borrow_orders:
+- DueDateIndex: hạn trả (due_date) của các đơn đang mượn, lưu dạng epoch
+  trong RangeIndex để tra "đơn đến hạn trước thời điểm X" bằng bisect thay
+  vì parse due_date của mọi đơn mỗi lần gọi.
+- ActiveLoanIndex: các đơn đang mượn của từng user, để kiểm tra giới hạn
+  mượn mà không phải lọc toàn bộ lịch sử mượn của user.
+- OverdueScanner: min-heap (hạn trả, borrow_id) của các đơn BORROWED chưa
+  bị đánh dấu quá hạn; mỗi lần quét chỉ lấy ra các đơn vừa quá hạn.
+
+"Đang mượn" gồm cả đơn đã bị đánh dấu OVERDUE (config.ACTIVE_BORROW_STATUSES).
+"""
+
+import heapq
+
+from config import ACTIVE_BORROW_STATUSES
+from repositories.derived import DerivedIndex, shared_index
+from utils.helpers import to_epoch
+from utils.range_index import RangeIndex
+
+
+class DueDateIndex(DerivedIndex):
+    """borrow_id -> epoch(due_date), chỉ gồm đơn đang mượn"""
+
+    def __init__(self, borrows_repo, persist_path: str = None):
+        self.due = RangeIndex()
+        super().__init__([borrows_repo], persist_path)
+
+    @staticmethod
+    def due_epoch(record):
+        if record.get("status") not in ACTIVE_BORROW_STATUSES:
+            return None
+        return to_epoch(record.get("due_date"))
+
+    def rebuild(self, records) -> None:
+        key_field = self.repository.key_field
+        self.due.build((r.get(key_field), self.due_epoch(r)) for r in records)
+
+    def apply(self, changes) -> None:
+        for op, key, record in changes:
+            if op == "delete":
+                self.due.remove(key)
+            else:
+                self.due.add(key, self.due_epoch(record))  # None -> bỏ khỏi chỉ mục
+
+    def get_state(self):
+        return self.due
+
+    def set_state(self, state) -> None:
+        self.due = state
+
+    def due_between(self, start=None, end=None, include_end: bool = False) -> list:
+        """borrow_id của đơn đang mượn có start <= hạn trả < end, sớm nhất trước"""
+        with self._lock:
+            self.sync()
+            return self.due.range(
+                to_epoch(start) if start is not None else None,
+                to_epoch(end) if end is not None else None,
+                include_high=include_end,
+            )
+
+
+class ActiveLoanIndex(DerivedIndex):
+    """user_id -> {borrow_id} của các đơn đang mượn (trả / mất -> bỏ ra)"""
+
+    def __init__(self, borrows_repo, persist_path: str = None):
+        self.loans = {}   # user_id -> set(borrow_id)
+        self.owner = {}   # borrow_id -> user_id (để bỏ đơn khi bị xóa / đổi trạng thái)
+        super().__init__([borrows_repo], persist_path)
+
+    def _remove(self, borrow_id) -> None:
+        user_id = self.owner.pop(borrow_id, None)
+        if user_id is None:
+            return
+        loans = self.loans[user_id]
+        loans.discard(borrow_id)
+        if not loans:
+            del self.loans[user_id]
+
+    def _set(self, borrow_id, record) -> None:
+        self._remove(borrow_id)
+        if record is not None and record.get("status") in ACTIVE_BORROW_STATUSES:
+            user_id = record.get("user_id")
+            self.owner[borrow_id] = user_id
+            self.loans.setdefault(user_id, set()).add(borrow_id)
+
+    def rebuild(self, records) -> None:
+        key_field = self.repository.key_field
+        self.loans, self.owner = {}, {}
+        for record in records:
+            self._set(record.get(key_field), record)
+
+    def apply(self, changes) -> None:
+        for _op, key, record in changes:
+            self._set(key, record)  # delete -> record None
+
+    def get_state(self):
+        return self.loans, self.owner
+
+    def set_state(self, state) -> None:
+        self.loans, self.owner = state
+
+    def count(self, user_id) -> int:
+        with self._lock:
+            self.sync()
+            return len(self.loans.get(user_id, ()))
+
+    def borrow_ids(self, user_id) -> set:
+        with self._lock:
+            self.sync()
+            return set(self.loans.get(user_id, ()))
+
+
+class OverdueScanner(DerivedIndex):
+    """
+    Hàng đợi ưu tiên theo hạn trả của các đơn BORROWED. Sửa / trả / đánh
+    dấu quá hạn không xóa phần tử trong heap: phần tử cũ bị bỏ qua khi lấy
+    ra (so với due hiện tại), heap được dựng lại khi phần tử cũ chiếm đa số.
+    """
+
+    def __init__(self, borrows_repo, persist_path: str = None):
+        self.heap = []         # (epoch hạn trả, borrow_id)
+        self.due = {}          # borrow_id -> epoch hạn trả hiện tại (chỉ đơn BORROWED)
+        self._listeners = []
+        super().__init__([borrows_repo], persist_path)
+
+    @staticmethod
+    def due_epoch(record):
+        if record is None or record.get("status") != "BORROWED":
+            return None
+        return to_epoch(record.get("due_date"))
+
+    def rebuild(self, records) -> None:
+        key_field = self.repository.key_field
+        self.due = {}
+        for record in records:
+            epoch = self.due_epoch(record)
+            if epoch is not None:
+                self.due[record.get(key_field)] = epoch
+        self._compact()
+
+    def apply(self, changes) -> None:
+        for _op, key, record in changes:
+            epoch = self.due_epoch(record)  # delete -> record None
+            if epoch is None:
+                self.due.pop(key, None)
+            elif self.due.get(key) != epoch:
+                self.due[key] = epoch
+                heapq.heappush(self.heap, (epoch, key))
+        if len(self.heap) > 2 * len(self.due) + 64:
+            self._compact()
+
+    def _compact(self) -> None:
+        self.heap = [(epoch, key) for key, epoch in self.due.items()]
+        heapq.heapify(self.heap)
+
+    def get_state(self):
+        return self.due
+
+    def set_state(self, state) -> None:
+        self.due = state
+        self._compact()
+
+    # ===== Quét quá hạn =====
+
+    def pop_due(self, now) -> list:
+        """
+        Lấy ra (và bỏ khỏi hàng đợi) các đơn có hạn trả < now:
+        [(epoch, borrow_id), ...] sớm nhất trước. O(số đơn vừa quá hạn · log N)
+        """
+        cutoff = to_epoch(now)
+        popped = []
+        with self._lock:
+            self.sync()
+            while self.heap and self.heap[0][0] < cutoff:
+                epoch, key = heapq.heappop(self.heap)
+                if self.due.get(key) == epoch:
+                    del self.due[key]
+                    popped.append((epoch, key))
+        return popped
+
+    def restore(self, popped) -> None:
+        """Đưa lại các đơn đã lấy ra (ghi trạng thái OVERDUE bị lỗi)"""
+        with self._lock:
+            for epoch, key in popped:
+                self.due[key] = epoch
+                heapq.heappush(self.heap, (epoch, key))
+
+    def subscribe(self, callback) -> None:
+        """Nhận các đơn vừa bị đánh dấu quá hạn: callback(list bản ghi đơn mượn)"""
+        self._listeners.append(callback)
+
+    def publish(self, borrows: list) -> None:
+        if not borrows:
+            return
+        for callback in list(self._listeners):
+            try:
+                callback(borrows)
+            except Exception as e:
+                print(f"[Error] Listener quá hạn: {e}")
+
+
+def get_overdue_scanner(borrows_repo) -> OverdueScanner:
+    """Hàng đợi quá hạn dùng chung (cả danh sách subscriber) cho mọi BorrowService"""
+    return shared_index(OverdueScanner, [borrows_repo])
+
+
+def get_active_loan_index(borrows_repo) -> ActiveLoanIndex:
+    """Chỉ mục đơn đang mượn theo user dùng chung cho mọi BorrowService"""
+    return shared_index(ActiveLoanIndex, [borrows_repo])
+
+
+def get_due_date_index(borrows_repo) -> DueDateIndex:
+    """Chỉ mục hạn trả dùng chung cho mọi BorrowService cùng repository"""
+    return shared_index(DueDateIndex, [borrows_repo])
@@ -1,7 +1,11 @@
 # services/borrow_service.py
-from utils.file_handler_fix import load_json, save_json
+from repositories import get_repository, transactions
+from services.borrow_index import get_active_loan_index, get_due_date_index, get_overdue_scanner
+from services.inventory import available_of, get_inventory
+from utils.journal import get_journal
+from collections import Counter
 from datetime import datetime, timedelta
-from config import MAX_BORROW_DAYS
+from config import ACTIVE_BORROW_STATUSES, MAX_BORROW_DAYS
 import uuid
 
 
@@ -10,163 +14,314 @@ class BorrowService:
         self,
         borrow_path="data/borrow_orders.json",
         book_path="data/books.json",
-        user_path="data/users.json"
+        user_path="data/users.json",
+        use_journal=None
     ):
         self.borrow_path = borrow_path
         self.book_path = book_path
         self.user_path = user_path
 
+        # Chế độ journal: chỉ ghi nối thay đổi thay vì ghi lại toàn bộ file
+        self.borrows = get_repository("borrow_orders", borrow_path, use_journal=use_journal)
+        self.books = get_repository("books", book_path, use_journal=use_journal)
+        self.users = get_repository("users", user_path)
+        self.due_index = get_due_date_index(self.borrows)
+        self.active_loans = get_active_loan_index(self.borrows)
+        self.overdue = get_overdue_scanner(self.borrows)
+        self.inventory = get_inventory(self.books)
+
+        if getattr(self.borrows, "use_journal", False):
+            # Hoàn tất lần compact dang dở (nếu lần chạy trước bị tắt giữa chừng)
+            get_journal(self.borrow_path).recover()
+            get_journal(self.book_path).recover()
+
     def borrow_book(self, user_id: int, book_id: str) -> dict:
         """
         Mượn sách
         Trả về: {"success": bool, "message": str, "borrow_id": str}
         """
-        try:
-            borrows = load_json(self.borrow_path)
-            books = load_json(self.book_path)
-            users = load_json(self.user_path)
-
-            # 1. Kiểm tra user
-            user = next((u for u in users if u.get("user_id") == user_id), None)
-            if not user:
-                return {"success": False, "message": "User không tồn tại"}
-            
-            if user.get("status") != "ACTIVE":
-                return {"success": False, "message": "Tài khoản không hoạt động"}
-
-            # 2. Kiểm tra giới hạn mượn
-            current_borrows = [
-                b for b in borrows
-                if b.get("user_id") == user_id and b.get("status") == "BORROWED"
-            ]
-            
-            borrowing_limit = user.get("borrowing_limit", 5)
-            if len(current_borrows) >= borrowing_limit:
-                return {"success": False, "message": f"Đã đạt giới hạn mượn ({borrowing_limit} sách)"}
-
-            # 3. Kiểm tra sách
-            book = next((b for b in books if b.get("book_id") == book_id), None)
-            if not book:
-                return {"success": False, "message": "Sách không tồn tại"}
-            
-            available_copies = book.get("available_quantity", book.get("available_copies", 0))
-            if available_copies <= 0:
-                return {"success": False, "message": "Sách đã hết"}
-
-            # 4. Cập nhật số lượng sách
-            book["available_quantity"] = available_copies - 1
-            book["available_copies"] = available_copies - 1
-
-            # 5. Tạo đơn mượn
-            borrow_id = str(uuid.uuid4())
-            borrow_data = {
-                "borrow_id": borrow_id,
-                "user_id": user_id,
-                "book_id": book_id,
-                "books": [book_id],
-                "borrow_date": datetime.now().isoformat(),
-                "due_date": (datetime.now() + timedelta(days=MAX_BORROW_DAYS)).isoformat(),
-                "return_date": None,
-                "status": "BORROWED"
+        result = self.borrow_books(user_id, [book_id])
+        if result["success"]:
+            return {
+                "success": True,
+                "message": "Mượn sách thành công",
+                "borrow_id": result["borrow_ids"][0]
             }
-            
-            borrows.append(borrow_data)
+        return result
+
+    def borrow_books(self, user_id: int, book_ids: list) -> dict:
+        """
+        Mượn nhiều sách 1 lần (ví dụ từ WaitingList.create_borrow_request):
+        kiểm tra giới hạn mượn và số lượng cho cả lô, mượn tất cả hoặc không
+        cuốn nào. Mỗi cuốn 1 đơn mượn, cả lô chỉ ghi 1 lần (1 transaction).
+        Trả về: {"success": bool, "message": str, "borrow_ids": list}
+        """
+        book_ids = list(book_ids or [])
+        if not book_ids:
+            return {"success": False, "message": "Chưa chọn sách"}
+        quantities = Counter(book_ids)
+
+        def books_message(message, ids):
+            return message if len(quantities) == 1 else f"{message}: {', '.join(map(str, ids))}"
+
+        # User / giới hạn mượn trước, rồi mới giữ chỗ trong RAM: sách hết bị
+        # từ chối ngay, không khóa file
+        error = self._check_borrower(user_id, len(book_ids))
+        if error:
+            return error
+        missing = self.inventory.reserve_all(quantities)
+        if missing:
+            unknown = [b for b in missing if self.inventory.available(b) is None]
+            if unknown:
+                return {"success": False, "message": books_message("Sách không tồn tại", unknown)}
+            return {"success": False, "message": books_message("Sách đã hết", missing)}
+
+        try:
+            with transactions(self.borrows, self.books):
+                # 1-2. Kiểm tra lại user và giới hạn mượn trong transaction
+                # (process khác có thể vừa mượn / khóa tài khoản)
+                error = self._check_borrower(user_id, len(book_ids))
+                if error:
+                    return error
+
+                # 3. Kiểm tra lại số lượng đã lưu (process khác có thể vừa mượn)
+                stock = {}
+                for book_id, quantity in quantities.items():
+                    book = self.books.get(book_id)
+                    if not book:
+                        return {"success": False, "message": books_message("Sách không tồn tại", [book_id])}
+                    stock[book_id] = available_of(book)
+                sold_out = [b for b, quantity in quantities.items() if stock[b] < quantity]
+                if sold_out:
+                    return {"success": False, "message": books_message("Sách đã hết", sold_out)}
 
-            # 6. Lưu dữ liệu
-            save_json(self.book_path, books)
-            save_json(self.borrow_path, borrows)
+                # 4. Cập nhật số lượng sách
+                for book_id, quantity in quantities.items():
+                    self.books.update(book_id, {
+                        "available_quantity": stock[book_id] - quantity,
+                        "available_copies": stock[book_id] - quantity
+                    })
+
+                # 5. Tạo đơn mượn (mỗi cuốn 1 đơn để trả riêng từng cuốn)
+                now = datetime.now()
+                borrow_ids = []
+                for book_id in book_ids:
+                    borrow_id = str(uuid.uuid4())
+                    self.borrows.insert({
+                        "borrow_id": borrow_id,
+                        "user_id": user_id,
+                        "book_id": book_id,
+                        "books": [book_id],
+                        "borrow_date": now.isoformat(),
+                        "due_date": (now + timedelta(days=MAX_BORROW_DAYS)).isoformat(),
+                        "return_date": None,
+                        "status": "BORROWED"
+                    })
+                    borrow_ids.append(borrow_id)
+                
+                # 6. Lưu dữ liệu (khi thoát transaction)
             
             return {
                 "success": True, 
-                "message": "Mượn sách thành công", 
-                "borrow_id": borrow_id
+                "message": f"Mượn thành công {len(borrow_ids)} sách", 
+                "borrow_ids": borrow_ids
             }
             
         except Exception as e:
-            print(f"Error borrowing book: {e}")
+            print(f"Error borrowing books: {e}")
             return {"success": False, "message": f"Lỗi hệ thống: {str(e)}"}
+        finally:
+            for book_id in quantities:
+                self.inventory.release(book_id)
+
+    def _check_borrower(self, user_id: int, count: int):
+        """User tồn tại, đang hoạt động và còn mượn được thêm count cuốn -> None, ngược lại dict lỗi"""
+        user = self.users.get(user_id)
+        if not user:
+            return {"success": False, "message": "User không tồn tại"}
+
+        if user.get("status") != "ACTIVE":
+            return {"success": False, "message": "Tài khoản không hoạt động"}
+
+        # Giới hạn mượn tính cả lô
+        current_borrows = self.active_loans.count(user_id)
+        borrowing_limit = user.get("borrowing_limit", 5)
+        if current_borrows + count > borrowing_limit:
+            return {"success": False, "message": f"Đã đạt giới hạn mượn ({borrowing_limit} sách)"}
+        return None
 
     def return_book(self, borrow_id: str) -> dict:
         """
         Trả sách
         Trả về: {"success": bool, "message": str}
         """
+        result = self.return_books([borrow_id])
+        if result["success"]:
+            return {"success": True, "message": "Trả sách thành công"}
+        return result
+
+    def return_books(self, borrow_ids: list) -> dict:
+        """
+        Trả nhiều đơn mượn 1 lần: tất cả đơn phải đang mượn (kể cả quá hạn), nếu không thì
+        không trả đơn nào. Số lượng mỗi sách được cộng 1 lần cho cả lô và
+        toàn bộ chỉ ghi 1 lần (1 transaction).
+        Trả về: {"success": bool, "message": str}
+        """
+        borrow_ids = list(dict.fromkeys(borrow_ids or []))
+        if not borrow_ids:
+            return {"success": False, "message": "Chưa chọn đơn mượn"}
+
+        def borrows_message(message, ids):
+            return message if len(borrow_ids) == 1 else f"{message}: {', '.join(map(str, ids))}"
+
         try:
-            borrows = load_json(self.borrow_path)
-            books = load_json(self.book_path)
+            with transactions(self.borrows, self.books):
+                # Tìm và kiểm tra toàn bộ đơn mượn trước khi sửa
+                borrows = {borrow_id: self.borrows.get(borrow_id) for borrow_id in borrow_ids}
+                not_found = [b for b, borrow in borrows.items() if not borrow]
+                if not_found:
+                    return {"success": False, "message": borrows_message("Không tìm thấy đơn mượn", not_found)}
+                
+                returned = [b for b, borrow in borrows.items()
+                            if borrow.get("status") not in ACTIVE_BORROW_STATUSES]
+                if returned:
+                    return {"success": False, "message": borrows_message("Sách đã được trả trước đó", returned)}
 
-            # Tìm đơn mượn
-            borrow = next((b for b in borrows if b.get("borrow_id") == borrow_id), None)
-            if not borrow:
-                return {"success": False, "message": "Không tìm thấy đơn mượn"}
-            
-            if borrow.get("status") != "BORROWED":
-                return {"success": False, "message": "Sách đã được trả trước đó"}
-
-            # Cập nhật đơn mượn
-            borrow["status"] = "RETURNED"
-            borrow["return_date"] = datetime.now().isoformat()
-
-            # Cập nhật số lượng sách
-            book_id = borrow.get("book_id")
-            if book_id:
-                book = next((b for b in books if b.get("book_id") == book_id), None)
-                if book:
-                    available_copies = book.get("available_quantity", book.get("available_copies", 0))
-                    book["available_quantity"] = available_copies + 1
-                    book["available_copies"] = available_copies + 1
-            else:
-                # Nếu borrow có field books (list)
-                books_list = borrow.get("books", [])
-                for book_id in books_list:
-                    book = next((b for b in books if b.get("book_id") == book_id), None)
+                # Cập nhật đơn mượn
+                now = datetime.now().isoformat()
+                quantities = Counter()
+                for borrow_id, borrow in borrows.items():
+                    self.borrows.update(borrow_id, {
+                        "status": "RETURNED",
+                        "return_date": now
+                    })
+                    # (đơn cũ có thể chỉ có field books dạng list)
+                    book_id = borrow.get("book_id")
+                    quantities.update([book_id] if book_id else borrow.get("books", []))
+
+                # Cập nhật số lượng sách (mỗi sách 1 lần cho cả lô)
+                for book_id, quantity in quantities.items():
+                    book = self.books.get(book_id)
                     if book:
-                        available_copies = book.get("available_quantity", book.get("available_copies", 0))
-                        book["available_quantity"] = available_copies + 1
-                        book["available_copies"] = available_copies + 1
+                        available_copies = available_of(book)
+                        self.books.update(book_id, {
+                            "available_quantity": available_copies + quantity,
+                            "available_copies": available_copies + quantity
+                        })
 
-            # Lưu dữ liệu
-            save_json(self.borrow_path, borrows)
-            save_json(self.book_path, books)
-            
-            return {"success": True, "message": "Trả sách thành công"}
+            return {"success": True, "message": f"Trả thành công {len(borrow_ids)} đơn mượn"}
             
         except Exception as e:
-            print(f"Error returning book: {e}")
+            print(f"Error returning books: {e}")
+            return {"success": False, "message": f"Lỗi hệ thống: {str(e)}"}
+
+    def report_lost(self, borrow_id: str) -> dict:
+        """
+        Báo mất sách đang mượn: đơn chuyển sang LOST (không còn tính vào giới
+        hạn mượn), tổng số lượng của sách giảm 1, số còn lại giữ nguyên
+        Trả về: {"success": bool, "message": str}
+        """
+        try:
+            with transactions(self.borrows, self.books):
+                borrow = self.borrows.get(borrow_id)
+                if not borrow:
+                    return {"success": False, "message": "Không tìm thấy đơn mượn"}
+
+                if borrow.get("status") not in ACTIVE_BORROW_STATUSES:
+                    return {"success": False, "message": "Đơn mượn không còn ở trạng thái đang mượn"}
+
+                self.borrows.update(borrow_id, {
+                    "status": "LOST",
+                    "lost_date": datetime.now().isoformat()
+                })
+
+                book_id = borrow.get("book_id")
+                for book_id in [book_id] if book_id else borrow.get("books", []):
+                    book = self.books.get(book_id)
+                    if book:
+                        self.books.update(book_id, {"quantity": max(0, book.get("quantity", 0) - 1)})
+
+            return {"success": True, "message": "Đã ghi nhận mất sách"}
+
+        except Exception as e:
+            print(f"Error reporting lost book: {e}")
             return {"success": False, "message": f"Lỗi hệ thống: {str(e)}"}
 
-    def get_user_borrows(self, user_id: int):
-        """Lấy danh sách đơn mượn của user"""
+    def get_user_borrows(self, user_id: int, active_only: bool = False):
+        """
+        Lấy danh sách đơn mượn của user.
+        active_only=True: chỉ các đơn đang mượn (tra chỉ mục theo user,
+        không phụ thuộc độ dài lịch sử mượn)
+        """
         try:
-            borrows = load_json(self.borrow_path)
+            if active_only:
+                borrows = [self.borrows.get(b) for b in self.active_loans.borrow_ids(user_id)]
+                return sorted((b for b in borrows if b), key=lambda b: b.get("borrow_date") or "")
             # Special case: if user_id is 0 or None, return all borrows for admin
             if user_id == 0 or user_id is None:
-                return borrows
-            user_borrows = [b for b in borrows if b.get("user_id") == user_id]
+                return self.borrows.all()
+            user_borrows = self.borrows.find(user_id=user_id)
             return user_borrows
         except Exception as e:
             print(f"Error getting user borrows: {e}")
             return []
 
+    def iter_user_borrows(self, user_id: int):
+        """
+        Generator: duyệt đơn mượn của user mà không nạp toàn bộ lịch sử vào RAM.
+        user_id = 0 hoặc None -> tất cả đơn (admin).
+        """
+        if user_id == 0 or user_id is None:
+            return self.borrows.iter_all()
+        return self.borrows.iter_find(user_id=user_id)
+
+    def iter_borrows_due_before(self, when: datetime):
+        """
+        Generator: các đơn đang mượn có hạn trả trước thời điểm when, hạn sớm
+        nhất trước (tra chỉ mục hạn trả, không duyệt toàn bộ đơn)
+        """
+        for borrow_id in self.due_index.due_between(end=when):
+            borrow = self.borrows.get(borrow_id)
+            if borrow and borrow.get("status") in ACTIVE_BORROW_STATUSES:
+                yield borrow
+
+    def iter_overdue_borrows(self, now: datetime = None):
+        """Generator: duyệt các đơn đang mượn đã quá hạn"""
+        return self.iter_borrows_due_before(now or datetime.now())
+
+    def scan_overdue(self, now: datetime = None) -> list:
+        """
+        Đánh dấu OVERDUE các đơn vừa quá hạn kể từ lần quét trước (lấy từ
+        min-heap hạn trả, không duyệt các đơn khác), ghi trong 1 transaction
+        rồi báo cho các subscriber. Trả về list đơn vừa bị đánh dấu.
+        """
+        popped = []
+        overdue = []
+        try:
+            with self.borrows.transaction():
+                popped = self.overdue.pop_due(now or datetime.now())
+                for _epoch, borrow_id in popped:
+                    borrow = self.borrows.get(borrow_id)
+                    if borrow and borrow.get("status") == "BORROWED":
+                        self.borrows.update(borrow_id, {"status": "OVERDUE"})
+                        borrow["status"] = "OVERDUE"
+                        overdue.append(borrow)
+        except Exception as e:
+            self.overdue.restore(popped)
+            print(f"Error scanning overdue borrows: {e}")
+            return []
+
+        self.overdue.publish(overdue)
+        return overdue
+
+    def subscribe_overdue(self, callback) -> None:
+        """callback(list đơn mượn) được gọi mỗi khi scan_overdue đánh dấu đơn quá hạn"""
+        self.overdue.subscribe(callback)
+
     def get_overdue_borrows(self):
         """Lấy danh sách đơn mượn quá hạn"""
         try:
-            borrows = load_json(self.borrow_path)
-            now = datetime.now()
-            
-            overdue = []
-            for borrow in borrows:
-                if borrow.get("status") == "BORROWED":
-                    due_date_str = borrow.get("due_date")
-                    if due_date_str:
-                        try:
-                            due_date = datetime.fromisoformat(due_date_str)
-                            if due_date < now:
-                                overdue.append(borrow)
-                        except:
-                            pass
-            
-            return overdue
+            return list(self.iter_overdue_borrows())
         except Exception as e:
             print(f"Error getting overdue borrows: {e}")
-            return []
\ No newline at end of file
+            return []
@@ -1,12 +1,39 @@
-from utils.file_handler import load_json, save_json
+from repositories import get_repository
+from services.borrow_index import get_due_date_index
+from utils.group_commit import atomic_write_text
 from config import FINE_PER_DAY
-from datetime import datetime
+from array import array
+from bisect import bisect_right
+from datetime import datetime, date, time as dt_time
+import json
+import time
 import uuid
 
+try:
+    import numpy as np
+except ImportError:  # NumPy không bắt buộc: dùng array của thư viện chuẩn
+    np = None
+
+
+def overdue_amounts(due_days: array, today: int, rate: int = FINE_PER_DAY):
+    """
+    Tính cả lô: số ngày trễ và tiền phạt cho từng hạn trả (số thứ tự ngày,
+    date.toordinal()). Dùng NumPy nếu có, không thì duyệt array 1 lượt.
+    Trả về (list số ngày trễ, list tiền phạt)
+    """
+    if np is not None and len(due_days):
+        days = np.maximum(today - np.frombuffer(due_days, dtype=np.int64), 0)
+        return days.tolist(), (days * rate).tolist()
+    days = array("q", [today - d if d < today else 0 for d in due_days])
+    return days.tolist(), [d * rate for d in days]
+
 
 class FineService:
-    def __init__(self, path="data/fines.json"):
+    def __init__(self, path="data/fines.json", borrow_path="data/borrow_orders.json"):
         self.path = path
+        self.fines = get_repository("fines", path)
+        self.borrows = get_repository("borrow_orders", borrow_path)
+        self.checkpoint_path = f"{path}.accrual"
 
     def calculate_fine(self, overdue_days: int) -> int:
         if overdue_days <= 0:
@@ -14,15 +41,140 @@ class FineService:
         return overdue_days * FINE_PER_DAY
 
     def add_fine(self, user_id: int, amount: int) -> bool:
-        fines = load_json(self.path)
-
-        fines.append({
+        self.fines.insert({
             "fine_id": str(uuid.uuid4()),
             "user_id": user_id,
             "amount": amount,
             "status": "UNPAID",
             "created_date": datetime.now().isoformat()
         })
-
-        save_json(self.path, fines)
         return True
+
+    # ===== Tính phạt quá hạn hàng đêm =====
+
+    def _overdue_details(self, day: date) -> list:
+        """
+        Các cuốn sách (hạn trả, borrow_id, book_id, user_id) của đơn đang mượn
+        có hạn trả trước ngày `day` (tra chỉ mục hạn trả), sắp xếp cố định để
+        checkpoint dùng được giữa các lần chạy.
+        Đơn cũ có thể gồm nhiều sách (field books) -> mỗi sách 1 chi tiết.
+        """
+        details = []
+        due_index = get_due_date_index(self.borrows)
+        for borrow_id in due_index.due_between(end=datetime.combine(day, dt_time.min)):
+            borrow = self.borrows.get(borrow_id)
+            if not borrow:
+                continue
+            due = datetime.fromisoformat(borrow["due_date"]).date()
+            book_id = borrow.get("book_id")
+            for book_id in [book_id] if book_id else borrow.get("books", []):
+                details.append((due.toordinal(), str(borrow_id), str(book_id), borrow.get("user_id")))
+        details.sort(key=lambda detail: detail[:3])
+        return details
+
+    def _load_checkpoint(self, day: date):
+        """Chi tiết cuối đã ghi xong của lần chạy cùng ngày, None = chạy từ đầu"""
+        try:
+            with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+                checkpoint = json.load(f)
+            if checkpoint.get("day") == day.isoformat():
+                return tuple(checkpoint["last"])
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        return None
+
+    def _save_checkpoint(self, day: date, last: tuple) -> None:
+        atomic_write_text(self.checkpoint_path, json.dumps({"day": day.isoformat(), "last": list(last)}))
+
+    @staticmethod
+    def _is_settled(fine, day: date) -> bool:
+        """Khoản phạt đã tính cho ngày `day` hoặc không còn được sửa (đã trả, ...)"""
+        return bool(fine) and (fine.get("accrued_through") == day.isoformat()
+                               or fine.get("status") != "UNPAID")
+
+    def accrue_overdue_fines(self, day: date = None, batch_size: int = None) -> dict:
+        """
+        Tính phạt cho mọi sách đang mượn quá hạn tính tới ngày `day`
+        (mặc định hôm nay): số ngày trễ và tiền phạt tính cả lô 1 lượt.
+
+        - Mỗi chi tiết (borrow_id, book_id) có 1 khoản phạt "OVERDUE-..." được
+          cập nhật theo ngày; chạy lại cùng ngày không đổi gì (idempotent theo
+          chi tiết + ngày). Khoản phạt đã thanh toán không bị sửa.
+        - Ghi 1 lần cho cả lô (batch_size=None) hoặc mỗi batch_size chi tiết
+          1 lần, kèm checkpoint: bị dừng giữa chừng (lỗi ghi -> ném ngoại lệ,
+          batch đang ghi bị hủy) thì lần chạy sau cùng ngày tiếp tục từ batch
+          chưa ghi.
+        - Checkpoint chỉ để bỏ bớt việc: chi tiết xếp trước checkpoint vẫn được
+          kiểm tra lại (chỉ đọc khoản phạt), vì đơn có thể mới quá hạn sau khi
+          checkpoint được ghi (thêm đơn, đổi hạn trả) -> thiếu phạt thì tính.
+
+        Trả về số liệu: details, accrued, skipped, amount, batches,
+        resumed_from, late (chi tiết trước checkpoint còn thiếu phạt),
+        elapsed_ms, details_per_sec, backend
+        """
+        day = day or date.today()
+        start = time.perf_counter()
+        details = self._overdue_details(day)
+        last = self._load_checkpoint(day)
+        resumed_from = bisect_right(details, last, key=lambda d: d[:3]) if last else 0
+
+        late = [
+            detail for detail in details[:resumed_from]
+            if not self._is_settled(self.fines.get(f"OVERDUE-{detail[1]}-{detail[2]}"), day)
+        ]
+        pending = late + details[resumed_from:]
+        due_days = array("q", [due for due, _, _, _ in pending])
+        days, amounts = overdue_amounts(due_days, day.toordinal())
+
+        batch_size = batch_size or len(pending) or 1
+        accrued = skipped = total = batches = 0
+        now = datetime.now().isoformat()
+        for begin in range(0, len(pending), batch_size):
+            with self.fines.transaction():
+                for i in range(begin, min(begin + batch_size, len(pending))):
+                    _due, borrow_id, book_id, user_id = pending[i]
+                    fine_id = f"OVERDUE-{borrow_id}-{book_id}"
+                    fine = self.fines.get(fine_id)
+                    if self._is_settled(fine, day):
+                        skipped += 1
+                        continue
+                    fields = {
+                        "overdue_days": days[i],
+                        "amount": amounts[i],
+                        "reason": f"Trả trễ {days[i]} ngày: {amounts[i]:,.0f} VND",
+                        "accrued_through": day.isoformat(),
+                    }
+                    if fine:
+                        self.fines.update(fine_id, fields)
+                    else:
+                        self.fines.insert({
+                            "fine_id": fine_id,
+                            "borrow_order_detail_id": f"{borrow_id}:{book_id}",
+                            "borrow_id": borrow_id,
+                            "book_id": book_id,
+                            "user_id": user_id,
+                            "status": "UNPAID",
+                            "created_date": now,
+                            **fields,
+                        })
+                    accrued += 1
+                    total += amounts[i]
+            batches += 1
+            done = pending[min(begin + batch_size, len(pending)) - 1][:3]
+            last = max(last, done) if last else done  # chi tiết kiểm tra lại không lùi checkpoint
+            self._save_checkpoint(day, last)
+
+        elapsed = time.perf_counter() - start
+        return {
+            "day": day.isoformat(),
+            "details": len(details),
+            "accrued": accrued,
+            "skipped": skipped,
+            "amount": total,
+            "batches": batches,
+            "resumed_from": resumed_from,
+            "late": len(late),
+            "elapsed_ms": elapsed * 1000,
+            "details_per_sec": len(pending) / elapsed if elapsed > 0 else 0.0,
+            "backend": "numpy" if np is not None else "array",
+        }
@@ -0,0 +1,152 @@
+"""
+inventory.py
+Số lượng sách còn lại giữ trong RAM để giữ chỗ (reserve) khi mượn.
+
+- stock: available_quantity đã lưu của từng sách, cập nhật theo change feed
+  của repository books (kể cả admin sửa số lượng, process khác ghi file)
+- reserved: số bản đang được giữ chỗ bởi các lượt mượn chưa commit
+- Còn lại = stock - reserved. Giữ chỗ là thao tác kiểm tra-rồi-trừ dưới
+  khóa của riêng sách đó (khóa phân dải theo book_id): các quầy mượn sách
+  khác nhau không chờ nhau, sách đã hết bị từ chối ngay mà không cần khóa
+  file hay mở transaction.
+
+Quy trình mượn: reserve() -> transaction ghi số lượng mới (kiểm tra lại
+giá trị đã lưu, chặn trường hợp process khác vừa mượn bản cuối) -> release().
+Lúc transaction commit, thay đổi của sách được áp dụng vào stock và phần
+giữ chỗ của chính thread đó được trừ đi trong cùng 1 bước (dưới khóa của
+sách): "còn lại" không bao giờ bị tính dư (không thể cho mượn quá số lượng)
+cũng không bị tính thiếu (không từ chối nhầm khi vẫn còn sách).
+"""
+
+import threading
+
+from repositories.derived import DerivedIndex, shared_index
+
+LOCK_STRIPES = 64  # số khóa dùng chung cho mọi book_id (băm theo book_id)
+
+
+def available_of(record) -> int:
+    """Số bản còn lại đã lưu của 1 bản ghi sách"""
+    return record.get("available_quantity", record.get("available_copies", 0)) or 0
+
+
+class InventoryEngine(DerivedIndex):
+    def __init__(self, books_repo, persist_path: str = None):
+        self.stock = {}      # book_id -> available_quantity đã lưu
+        self.reserved = {}   # book_id -> số bản đang giữ chỗ (chỉ lưu khi > 0)
+        self._stripes = [threading.Lock() for _ in range(LOCK_STRIPES)]
+        self._claims = threading.local()  # phần giữ chỗ của thread hiện tại
+        self._rebuilt = False
+        super().__init__([books_repo], persist_path)
+
+    def rebuild(self, records) -> None:
+        key_field = self.repository.key_field
+        self.stock = {r.get(key_field): available_of(r) for r in records}
+        self._rebuilt = True
+
+    def apply(self, changes) -> None:
+        # Thay đổi đã được áp dụng ngay lúc commit (_enqueue); chỉ cần áp
+        # dụng lại các thay đổi đến trong lúc dựng lại (có thể rơi vào dict cũ)
+        if not self._rebuilt:
+            return
+        self._rebuilt = False
+        for op, key, record in changes:
+            with self._stripe(key):
+                self._set_stock(op, key, record)
+
+    def get_state(self):
+        return self.stock
+
+    def set_state(self, state) -> None:
+        self.stock = state
+
+    def _enqueue(self, changes) -> None:
+        claims = self._own_claims()
+        for op, key, record in changes:
+            if op == "reload":
+                continue
+            with self._stripe(key):
+                self._set_stock(op, key, record)
+                # Bản ghi vừa commit đã trừ số lượng -> bỏ phần giữ chỗ tương ứng
+                held = claims.pop(key, 0)
+                if held:
+                    self._unreserve(key, held)
+        super()._enqueue(changes)
+
+    def _set_stock(self, op, key, record) -> None:
+        if op == "delete":
+            self.stock.pop(key, None)
+        else:
+            self.stock[key] = available_of(record)
+
+    # ===== Giữ chỗ =====
+
+    def _stripe(self, book_id) -> threading.Lock:
+        return self._stripes[hash(book_id) % LOCK_STRIPES]
+
+    def _own_claims(self) -> dict:
+        claims = getattr(self._claims, "books", None)
+        if claims is None:
+            claims = self._claims.books = {}
+        return claims
+
+    def _unreserve(self, book_id, quantity: int) -> None:
+        held = self.reserved.get(book_id, 0) - quantity
+        if held > 0:
+            self.reserved[book_id] = held
+        else:
+            self.reserved.pop(book_id, None)
+
+    def available(self, book_id):
+        """Số bản có thể mượn ngay (trừ phần đang giữ chỗ), sách không tồn tại -> None"""
+        self.sync()
+        with self._stripe(book_id):
+            stock = self.stock.get(book_id)
+            if stock is None:
+                return None
+            return stock - self.reserved.get(book_id, 0)
+
+    def reserve(self, book_id, quantity: int = 1) -> bool:
+        """
+        Giữ chỗ quantity bản nếu còn đủ (kiểm tra và trừ nguyên tử theo từng
+        sách). Phần giữ chỗ thuộc về thread gọi: được trừ khi thread này
+        commit thay đổi của sách, hoặc bỏ bằng release().
+        """
+        self.sync()
+        with self._stripe(book_id):
+            held = self.reserved.get(book_id, 0)
+            if self.stock.get(book_id, 0) - held < quantity:
+                return False
+            self.reserved[book_id] = held + quantity
+            claims = self._own_claims()
+            claims[book_id] = claims.get(book_id, 0) + quantity
+            return True
+
+    def reserve_all(self, quantities: dict) -> list:
+        """
+        Giữ chỗ cả lô {book_id: số bản}, tất cả hoặc không gì cả.
+        Trả về các book_id không đủ sách ([] = đã giữ chỗ toàn bộ lô).
+        Mỗi lần chỉ giữ khóa của 1 sách nên không thể deadlock giữa các lô.
+        """
+        held, missing = [], []
+        for book_id, quantity in quantities.items():
+            if self.reserve(book_id, quantity):
+                held.append(book_id)
+            else:
+                missing.append(book_id)
+        if missing:
+            for book_id in held:
+                self.release(book_id)
+        return missing
+
+    def release(self, book_id) -> None:
+        """Bỏ phần giữ chỗ chưa dùng của thread này (transaction bị hủy / không ghi)"""
+        with self._stripe(book_id):
+            held = self._own_claims().pop(book_id, 0)
+            if held:
+                self._unreserve(book_id, held)
+
+
+def get_inventory(books_repo) -> InventoryEngine:
+    """Bộ đếm tồn kho dùng chung cho mọi service cùng repository books"""
+    return shared_index(InventoryEngine, [books_repo])
@@ -1,4 +1,4 @@
-from utils.file_handler import load_json, save_json
+from repositories import get_repository
 from datetime import datetime
 import uuid
 
@@ -6,17 +6,14 @@ import uuid
 class NotificationService:
     def __init__(self, path="data/notifications.json"):
         self.path = path
+        self.notifications = get_repository("notifications", path)
 
     def send_notification(self, user_id: int, content: str) -> bool:
-        notifications = load_json(self.path)
-
-        notifications.append({
+        self.notifications.insert({
             "notification_id": str(uuid.uuid4()),
             "user_id": user_id,
             "content": content,
             "created_date": datetime.now().isoformat(),
             "status": "SENT"
         })
-
-        save_json(self.path, notifications)
         return True
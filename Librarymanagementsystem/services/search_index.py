@@ -0,0 +1,623 @@
+"""
+search_index.py
+Chỉ mục suy ra từ repository books: tìm kiếm (title, description, tên tác
+giả, book_id), gợi ý khi gõ (tiêu đề, tên tác giả), thể loại + facet,
+truy vấn lọc nhiều điều kiện, bitmap lọc nhanh, thứ tự sắp xếp cho danh
+sách theo trang.
+Cập nhật tăng dần theo thay đổi của repository books và lưu xuống đĩa
+(cạnh file dữ liệu) để lần khởi động sau không phải dựng lại.
+"""
+
+import heapq
+from bisect import bisect_left, bisect_right
+
+from config import QUERY_CACHE_MAX_SIZE, SEARCH_INDEX_PERSIST
+from repositories.derived import DerivedIndex, shared_index
+from utils.bitmap import Bitmap
+from utils.index_manager import IndexManager
+from utils.lru_cache import LRUCache
+from utils.pagination import sort_value
+from utils.query_engine import QueryEngine
+from utils.range_index import RangeIndex
+from utils.text_search import InvertedIndex, PrefixIndex, relevance_key, tokenize
+
+# Trọng số theo trường: khớp ở tiêu đề / tác giả quan trọng hơn mô tả
+SEARCH_FIELDS = {"book_id": 3, "title": 3, "author": 2, "description": 1}
+
+# Trường lọc có chỉ mục băm (điều kiện bằng); trường khác lọc từng dòng
+FILTER_INDEX_FIELDS = ["category_id", "author_id", "status", "available"]
+# Trường có chỉ mục khoảng (RangeIndex, tra bằng bisect)
+FILTER_RANGE_FIELDS = ["publication_year"]
+
+# Trường có bitmap theo từng giá trị (BookBitmapIndex), đúng thứ tự facts_of()
+BITMAP_FIELDS = ("status", "category_id", "available", "publication_year")
+
+
+class StaleCursorError(ValueError):
+    """Con trỏ trang tìm kiếm thuộc bảng xếp hạng không còn giữ (xem search_page)"""
+
+
+class BookSearchIndex(DerivedIndex):
+    """
+    describer() -> hàm record -> {"title", "description", "author", "book_id"}
+    (BookService cung cấp, vì tên tác giả cần join với authors). describer()
+    được gọi 1 lần cho mỗi lần dựng lại / mỗi lô thay đổi, hàm trả về dùng
+    cho mọi sách trong lô (bảng join chỉ lấy 1 lần).
+    """
+
+    def __init__(self, books_repo, authors_repo, book_author_path: str, describer,
+                 persist_path: str = None):
+        self.describer = describer
+        self.index = InvertedIndex(SEARCH_FIELDS)
+        # (query đã chuẩn hóa, fuzzy, phiên bản chỉ mục) -> [(book_id, điểm), ...]
+        self.results = LRUCache(QUERY_CACHE_MAX_SIZE)
+        super().__init__([books_repo, authors_repo, book_author_path], persist_path)
+
+    def rebuild(self, records) -> None:
+        key_field = self.repository.key_field
+        describe = self.describer()
+        self.index.build(
+            (record[key_field], describe(record))
+            for record in records if record.get(key_field) is not None
+        )
+
+    def apply(self, changes) -> None:
+        describe = self.describer()
+        for op, key, record in changes:
+            if op == "delete":
+                self.index.remove(key)
+            else:
+                self._add(record, describe)  # insert/update: thay tài liệu cũ
+
+    def _add(self, record, describe) -> None:
+        key = record.get(self.repository.key_field)
+        if key is not None:
+            self.index.add(key, describe(record))
+
+    def get_state(self):
+        return self.index
+
+    def set_state(self, state) -> None:
+        self.index = state
+
+    def ranked(self, query: str, fuzzy: bool = False) -> list:
+        """
+        Toàn bộ kết quả [(book_id, điểm BM25), ...] đã xếp hạng, qua cache.
+        Khóa cache gồm phiên bản chỉ mục (index.version): chỉ tăng khi nội
+        dung tìm kiếm đổi (thêm/xóa sách, sửa tiêu đề/mô tả/tác giả), mượn
+        trả chỉ đổi số lượng nên không làm mất cache.
+        """
+        return self._ranked(query, fuzzy)[1]
+
+    def _ranked(self, query: str, fuzzy: bool):
+        """(index.version, kết quả đã xếp hạng của phiên bản đó)"""
+        with self._lock:
+            self.sync()
+            version = self.index.version
+            key = (" ".join(tokenize(query)), fuzzy, version)
+            hits = self.results.get(key)
+            if hits is None:
+                hits = self.index.search(query, fuzzy=fuzzy)
+                self.results.put(key, hits)
+            return version, hits
+
+    def search(self, query: str, limit: int = None, fuzzy: bool = False) -> list:
+        """[(book_id, điểm BM25), ...] giảm dần theo điểm"""
+        hits = self.ranked(query, fuzzy)
+        return hits[:limit] if limit is not None else list(hits)
+
+    def search_page(self, query: str, limit: int, cursor=None, fuzzy: bool = False):
+        """
+        Trang kết quả ([(book_id, điểm), ...], next_cursor).
+        Điểm BM25 phụ thuộc cả tập sách (IDF, độ dài trung bình) nên đổi sau
+        mỗi lần thêm/xóa/sửa: khóa (-điểm, id) của trang trước không còn dùng
+        được trên bảng xếp hạng mới. Vì vậy con trỏ = (index.version, khóa
+        dòng cuối) và mọi trang của 1 lượt tìm đọc trên đúng bảng xếp hạng
+        của phiên bản lúc lấy trang đầu (giữ trong cache kết quả):
+        - sách thêm sau trang đầu không xuất hiện, sách đã xóa bị BookService
+          bỏ qua khi dựng Book -> không lặp, không sót
+        - bảng xếp hạng cũ đã bị đẩy khỏi cache -> StaleCursorError, cần tìm
+          lại từ trang đầu
+        """
+        if cursor is None:
+            version, hits = self._ranked(query, fuzzy)
+            start = 0
+        else:
+            version, after = cursor
+            hits = self._snapshot(query, fuzzy, version)
+            start = bisect_right(hits, after, key=relevance_key)
+        page = hits[start:start + limit]
+        next_cursor = (version, relevance_key(page[-1])) if start + limit < len(hits) else None
+        return page, next_cursor
+
+    def _snapshot(self, query: str, fuzzy: bool, version: int) -> list:
+        """Bảng xếp hạng của phiên bản `version` (phiên bản hiện tại thì tính lại được)"""
+        with self._lock:
+            self.sync()
+            if self.index.version == version:
+                return self._ranked(query, fuzzy)[1]
+            hits = self.results.get((" ".join(tokenize(query)), fuzzy, version))
+            if hits is None:
+                raise StaleCursorError("Kết quả tìm kiếm đã thay đổi, hãy tìm lại từ trang đầu")
+            return hits
+
+
+class BookAutocompleteIndex(DerivedIndex):
+    """
+    Gợi ý khi gõ trên tiêu đề và tên tác giả, xếp theo độ phổ biến
+    (số bản đang được mượn). describer như BookSearchIndex.
+    """
+
+    def __init__(self, books_repo, authors_repo, book_author_path: str, describer,
+                 persist_path: str = None):
+        self.describer = describer
+        self.index = PrefixIndex()
+        super().__init__([books_repo, authors_repo, book_author_path], persist_path)
+
+    @staticmethod
+    def popularity(record) -> int:
+        return max(int(record.get("quantity", 0) or 0)
+                   - int(record.get("available_quantity", 0) or 0), 0)
+
+    def rebuild(self, records) -> None:
+        self.index.clear()
+        describe = self.describer()
+        for record in records:
+            self._set(record, describe)
+
+    def apply(self, changes) -> None:
+        describe = self.describer()
+        for op, key, record in changes:
+            if op == "delete":
+                self.index.remove(key)
+            else:
+                self._set(record, describe)
+
+    def _set(self, record, describe) -> None:
+        key = record.get(self.repository.key_field)
+        if key is not None:
+            document = describe(record)
+            texts = [document.get("title"), document.get("author")]
+            self.index.set(key, [t for t in texts if t], self.popularity(record))
+
+    def get_state(self):
+        return self.index
+
+    def set_state(self, state) -> None:
+        self.index = state
+
+    def complete(self, prefix: str, limit: int = 10) -> list:
+        """[(gợi ý, độ phổ biến), ...]"""
+        with self._lock:
+            self.sync()
+            return self.index.complete(prefix, limit)
+
+
+class BookCategoryIndex(DerivedIndex):
+    """
+    category_id -> các book_id (theo thứ tự trong repository) và số liệu
+    facet dựng sẵn cho mỗi thể loại: số đầu sách, tổng số bản, số bản còn,
+    số bản đang mượn. Mượn/trả và admin sửa sách đều ghi vào repository
+    books nên được cập nhật tăng dần qua change feed.
+    """
+
+    def __init__(self, books_repo, persist_path: str = None):
+        self.postings = {}   # str(category_id) -> {book_id: None} (dict giữ thứ tự)
+        self.facets = {}     # str(category_id) -> {"books", "total", "available", "borrowed"}
+        self.book_rows = {}  # book_id -> (category, quantity, available) đã cộng vào facet
+        super().__init__([books_repo], persist_path)
+
+    @staticmethod
+    def category_key(category_id) -> str:
+        return str(category_id)
+
+    def rebuild(self, records) -> None:
+        self.postings, self.facets, self.book_rows = {}, {}, {}
+        for record in records:
+            self._set(record)
+
+    def apply(self, changes) -> None:
+        for op, key, record in changes:
+            if op == "delete":
+                self._remove(key)
+            else:
+                self._set(record)
+
+    def _set(self, record) -> None:
+        book_id = record.get(self.repository.key_field)
+        if book_id is None:
+            return
+        category = self.category_key(record.get("category_id"))
+        quantity = int(record.get("quantity", 0) or 0)
+        available = int(record.get("available_quantity", 0) or 0)
+        old = self.book_rows.get(book_id)
+        if old is not None and old[0] != category:
+            self._remove(book_id)
+            old = None
+        if old is None:
+            self.postings.setdefault(category, {})[book_id] = None
+            self._add_counts(category, 1, quantity, available)
+        else:
+            self._add_counts(category, 0, quantity - old[1], available - old[2])
+        self.book_rows[book_id] = (category, quantity, available)
+
+    def _remove(self, book_id) -> None:
+        old = self.book_rows.pop(book_id, None)
+        if old is None:
+            return
+        category, quantity, available = old
+        posting = self.postings[category]
+        del posting[book_id]
+        if not posting:
+            del self.postings[category]
+            del self.facets[category]
+        else:
+            self._add_counts(category, -1, -quantity, -available)
+
+    def _add_counts(self, category, books, total, available) -> None:
+        facet = self.facets.setdefault(
+            category, {"books": 0, "total": 0, "available": 0, "borrowed": 0}
+        )
+        facet["books"] += books
+        facet["total"] += total
+        facet["available"] += available
+        facet["borrowed"] = facet["total"] - facet["available"]
+
+    def get_state(self):
+        return (self.postings, self.facets, self.book_rows)
+
+    def set_state(self, state) -> None:
+        self.postings, self.facets, self.book_rows = state
+
+    def book_ids(self, category_id) -> list:
+        with self._lock:
+            self.sync()
+            return list(self.postings.get(self.category_key(category_id), ()))
+
+    def get_facets(self) -> dict:
+        """{str(category_id): {"books", "total", "available", "borrowed"}} (bản sao)"""
+        with self._lock:
+            self.sync()
+            return {category: dict(facet) for category, facet in self.facets.items()}
+
+
+class BookOrderIndex(DerivedIndex):
+    """
+    Thứ tự sắp xếp dựng sẵn cho danh sách sách theo trang: với mỗi trường
+    sort_by đã dùng, giữ các khóa (sort_value(trường), sort_value(book_id))
+    đã sắp xếp + book_id song song. 1 trang = bisect theo con trỏ rồi cắt K
+    phần tử, không duyệt/sao chép cả danh mục. Trường mới được dựng lần đầu
+    khi dùng; thay đổi sách cập nhật tăng dần (bisect + insert).
+    """
+
+    def __init__(self, books_repo, persist_path: str = None):
+        self.orders = {}  # sort_by -> ([khóa đã sắp xếp], [book_id song song])
+        self.keys = {}    # sort_by -> {book_id: khóa hiện tại}
+        super().__init__([books_repo], persist_path)
+
+    def sort_key(self, record, sort_by):
+        key_field = self.repository.key_field
+        return (sort_value(record.get(sort_by)), sort_value(record.get(key_field)))
+
+    def rebuild(self, records) -> None:
+        records = list(records)
+        for sort_by in list(self.orders):
+            self._build(sort_by, records)
+
+    def _build(self, sort_by, records) -> None:
+        key_field = self.repository.key_field
+        pairs = sorted(
+            (self.sort_key(record, sort_by), record.get(key_field))
+            for record in records if record.get(key_field) is not None
+        )
+        self.orders[sort_by] = ([key for key, _ in pairs], [book_id for _, book_id in pairs])
+        self.keys[sort_by] = {book_id: key for key, book_id in pairs}
+
+    def apply(self, changes) -> None:
+        for op, book_id, record in changes:
+            for sort_by in self.orders:
+                self._remove(sort_by, book_id)
+                if op != "delete":
+                    self._insert(sort_by, book_id, self.sort_key(record, sort_by))
+
+    def _insert(self, sort_by, book_id, key) -> None:
+        keys, ids = self.orders[sort_by]
+        position = bisect_right(keys, key)
+        keys.insert(position, key)
+        ids.insert(position, book_id)
+        self.keys[sort_by][book_id] = key
+
+    def _remove(self, sort_by, book_id) -> None:
+        key = self.keys[sort_by].pop(book_id, None)
+        if key is None:
+            return
+        keys, ids = self.orders[sort_by]
+        position = bisect_left(keys, key)
+        # Khóa có thể trùng (book_id khác nhau nhưng giống nhau sau khi bỏ dấu)
+        while ids[position] != book_id:
+            position += 1
+        del keys[position]
+        del ids[position]
+
+    def get_state(self):
+        return (self.orders, self.keys)
+
+    def set_state(self, state) -> None:
+        self.orders, self.keys = state
+
+    def page(self, sort_by, limit: int, after=None):
+        """
+        (book_id trong trang, next_cursor) theo sort_by, sau con trỏ `after`
+        (cùng dạng khóa với utils.pagination.top_k). limit=None -> lấy hết.
+        """
+        if limit is not None and limit <= 0:
+            raise ValueError("limit phải > 0")
+        with self._lock:
+            self.sync()
+            if sort_by not in self.orders:
+                self._build(sort_by, self.repository.all())
+                self._dirty = True
+            keys, ids = self.orders[sort_by]
+            start = bisect_right(keys, after) if after is not None else 0
+            end = len(keys) if limit is None else min(start + limit, len(keys))
+            next_cursor = keys[end - 1] if end < len(keys) else None
+            return ids[start:end], next_cursor
+
+
+class BookFilterIndex(DerivedIndex):
+    """
+    Chỉ mục cho truy vấn lọc sách (BookService.query_books): mỗi sách được
+    rút gọn thành các trường lọc (facts) do describer() cung cấp
+    (như BookSearchIndex).
+    IndexManager giữ bucket cho các trường trong FILTER_INDEX_FIELDS,
+    RangeIndex giữ mảng đã sắp xếp cho FILTER_RANGE_FIELDS.
+    """
+
+    def __init__(self, books_repo, authors_repo, book_author_path: str, describer,
+                 persist_path: str = None):
+        self.describer = describer
+        self.index = IndexManager(FILTER_INDEX_FIELDS)
+        self.ranges = {field: RangeIndex() for field in FILTER_RANGE_FIELDS}
+        self.facts = {}  # book_id -> facts đang nằm trong chỉ mục
+        super().__init__([books_repo, authors_repo, book_author_path], persist_path)
+
+    def rebuild(self, records) -> None:
+        key_field = self.repository.key_field
+        describe = self.describer()
+        self.facts = {
+            record[key_field]: describe(record)
+            for record in records if record.get(key_field) is not None
+        }
+        self._build()
+
+    def _build(self) -> None:
+        self.index.build(self.facts.items())
+        for field, ranges in self.ranges.items():
+            ranges.build((book_id, facts.get(field)) for book_id, facts in self.facts.items())
+
+    def apply(self, changes) -> None:
+        describe = self.describer()
+        for op, key, record in changes:
+            old = self.facts.pop(key, None)
+            if old is not None:
+                self.index.remove(key, old)
+                for ranges in self.ranges.values():
+                    ranges.remove(key)
+            if op != "delete":
+                facts = self.facts[key] = describe(record)
+                self.index.add(key, facts)
+                for field, ranges in self.ranges.items():
+                    ranges.add(key, facts.get(field))
+
+    def get_state(self):
+        return self.facts
+
+    def set_state(self, state) -> None:
+        self.facts = state
+        self._build()
+
+    def execute(self, predicates):
+        """([(book_id, facts), ...], explain), xem utils.query_engine"""
+        with self._lock:
+            self.sync()
+            engine = QueryEngine(self.index, lambda: list(self.facts.items()),
+                                 ranges=self.ranges, get_item=self.facts.get)
+            return engine.execute(predicates)
+
+
+class BookBitmapIndex(DerivedIndex):
+    """
+    Bitmap (utils.bitmap) theo từng giá trị của các trường BITMAP_FIELDS,
+    trên số thứ tự dày đặc của sách (ordinal). Lọc kết hợp = AND/OR/NOT
+    giữa các bitmap, không chạm tới bản ghi.
+
+    Cập nhật tăng dần: chỉ trường đổi giá trị mới chuyển bitmap, ví dụ mượn
+    / trả sách chỉ đổi bitmap "available" khi available_quantity qua mốc 0.
+    Ordinal của sách đã xóa được dùng lại cho sách thêm sau (nhỏ nhất
+    trước), nên ids / bitmap không phình theo số lần thêm-xóa.
+    """
+
+    def __init__(self, books_repo, persist_path: str = None):
+        self._reset()
+        super().__init__([books_repo], persist_path)
+
+    def _reset(self) -> None:
+        self.ids = []            # ordinal -> book_id (None = đã xóa)
+        self.ordinals = {}       # book_id -> ordinal
+        self.free = []           # min-heap các ordinal đã xóa, chờ dùng lại
+        self.facts = {}          # book_id -> (giá trị từng trường trong BITMAP_FIELDS)
+        self.bitmaps = {field: {} for field in BITMAP_FIELDS}   # field -> {giá trị: Bitmap}
+        self.universe = Bitmap() # mọi ordinal còn dùng
+
+    @staticmethod
+    def facts_of(record) -> tuple:
+        return (
+            record.get("status", "AVAILABLE"),
+            str(record.get("category_id")),
+            int(record.get("available_quantity", 0) or 0) > 0,
+            int(record.get("publication_year", 0) or 0),
+        )
+
+    def rebuild(self, records) -> None:
+        self._reset()
+        key_field = self.repository.key_field
+        members = {field: {} for field in BITMAP_FIELDS}  # gom rồi dựng mỗi bitmap 1 lần
+        for record in records:
+            book_id = record.get(key_field)
+            if book_id is None or book_id in self.ordinals:
+                continue
+            ordinal = self.ordinals[book_id] = len(self.ids)
+            self.ids.append(book_id)
+            facts = self.facts[book_id] = self.facts_of(record)
+            for field, value in zip(BITMAP_FIELDS, facts):
+                members[field].setdefault(value, []).append(ordinal)
+        for field, groups in members.items():
+            self.bitmaps[field] = {value: Bitmap(ords) for value, ords in groups.items()}
+        self.universe = Bitmap.full(len(self.ids))
+
+    def apply(self, changes) -> None:
+        for op, key, record in changes:
+            if op == "delete":
+                self._remove(key)
+            else:
+                self._set(key, record)
+
+    def _set(self, book_id, record) -> None:
+        facts = self.facts_of(record)
+        old = self.facts.get(book_id)
+        if old is None:
+            if self.free:
+                ordinal = heapq.heappop(self.free)
+                self.ids[ordinal] = book_id
+            else:
+                ordinal = len(self.ids)
+                self.ids.append(book_id)
+            self.ordinals[book_id] = ordinal
+            self.universe.add(ordinal)
+        else:
+            ordinal = self.ordinals[book_id]
+        for field, old_value, value in zip(BITMAP_FIELDS, old or (None,) * len(facts), facts):
+            if old is not None and old_value == value:
+                continue
+            if old is not None:
+                self._discard(field, old_value, ordinal)
+            self.bitmaps[field].setdefault(value, Bitmap()).add(ordinal)
+        self.facts[book_id] = facts
+
+    def _remove(self, book_id) -> None:
+        old = self.facts.pop(book_id, None)
+        if old is None:
+            return
+        ordinal = self.ordinals.pop(book_id)
+        self.ids[ordinal] = None
+        heapq.heappush(self.free, ordinal)
+        self.universe.discard(ordinal)
+        for field, value in zip(BITMAP_FIELDS, old):
+            self._discard(field, value, ordinal)
+
+    def _discard(self, field, value, ordinal) -> None:
+        bitmap = self.bitmaps[field].get(value)
+        if bitmap is not None:
+            bitmap.discard(ordinal)
+            if not bitmap:
+                del self.bitmaps[field][value]
+
+    def get_state(self):
+        # Bitmap ghi dạng nén (khối mảng / khối bitmap như roaring)
+        return {
+            "ids": self.ids,
+            "facts": self.facts,
+            "universe": self.universe.to_bytes(),
+            "bitmaps": {
+                field: {value: bitmap.to_bytes() for value, bitmap in values.items()}
+                for field, values in self.bitmaps.items()
+            },
+        }
+
+    def set_state(self, state) -> None:
+        self.ids = state["ids"]
+        self.facts = state["facts"]
+        self.ordinals = {book_id: i for i, book_id in enumerate(self.ids) if book_id is not None}
+        self.free = [i for i, book_id in enumerate(self.ids) if book_id is None]  # đã sắp xếp = heap
+        self.universe = Bitmap.from_bytes(state["universe"])
+        self.bitmaps = {
+            field: {value: Bitmap.from_bytes(data) for value, data in values.items()}
+            for field, values in state["bitmaps"].items()
+        }
+
+    # ===== Lọc =====
+
+    def _any_of(self, field, values) -> Bitmap:
+        index = self.bitmaps[field]
+        return Bitmap.union(index[v] for v in values if v in index)
+
+    def select(self, where: dict = None, exclude: dict = None,
+               year_from: int = None, year_to: int = None) -> Bitmap:
+        """
+        where  : {trường: [giá trị, ...]} -> OR trong 1 trường, AND giữa các trường
+        exclude: {trường: [giá trị, ...]} -> NOT
+        year_from / year_to: OR các bitmap năm trong khoảng
+        """
+        with self._lock:
+            self.sync()
+            result = self.universe
+            for field, values in (where or {}).items():
+                result = result & self._any_of(field, values)
+            if year_from is not None or year_to is not None:
+                low = year_from if year_from is not None else float("-inf")
+                high = year_to if year_to is not None else float("inf")
+                years = [y for y in self.bitmaps["publication_year"] if low <= y <= high]
+                result = result & self._any_of("publication_year", years)
+            for field, values in (exclude or {}).items():
+                result = result - self._any_of(field, values)
+            return result if result is not self.universe else result.copy()
+
+    def book_ids(self, bitmap: Bitmap, limit: int = None) -> list:
+        """book_id theo thứ tự ordinal (thứ tự thêm vào, sách mới có thể nằm ở ô của sách đã xóa)"""
+        ids = []
+        with self._lock:
+            for ordinal in bitmap:
+                if limit is not None and len(ids) >= limit:
+                    break
+                book_id = self.ids[ordinal]
+                if book_id is not None:
+                    ids.append(book_id)
+        return ids
+
+
+def _shared_index(cls, suffix: str, sources, *args):
+    return shared_index(cls, sources, *args,
+                        persist_suffix=suffix if SEARCH_INDEX_PERSIST else None)
+
+
+def get_book_search_index(books_repo, authors_repo, book_author_path: str, describer):
+    """Chỉ mục tìm kiếm dùng chung cho mọi BookService cùng nguồn dữ liệu"""
+    return _shared_index(BookSearchIndex, "search",
+                         [books_repo, authors_repo, book_author_path], describer)
+
+
+def get_book_autocomplete(books_repo, authors_repo, book_author_path: str, describer):
+    """Chỉ mục gợi ý dùng chung cho mọi BookService cùng nguồn dữ liệu"""
+    return _shared_index(BookAutocompleteIndex, "suggest",
+                         [books_repo, authors_repo, book_author_path], describer)
+
+
+def get_book_category_index(books_repo):
+    """Chỉ mục thể loại + facet dùng chung cho mọi service cùng repository books"""
+    return _shared_index(BookCategoryIndex, "categories", [books_repo])
+
+
+def get_book_order_index(books_repo):
+    """Thứ tự sắp xếp dùng chung cho mọi service cùng repository books"""
+    return _shared_index(BookOrderIndex, "order", [books_repo])
+
+
+def get_book_filter_index(books_repo, authors_repo, book_author_path: str, describer):
+    """Chỉ mục lọc dùng chung cho mọi BookService cùng nguồn dữ liệu"""
+    return _shared_index(BookFilterIndex, "filters",
+                         [books_repo, authors_repo, book_author_path], describer)
+
+
+def get_book_bitmap_index(books_repo):
+    """Bitmap lọc sách dùng chung cho mọi service cùng repository books"""
+    return _shared_index(BookBitmapIndex, "bitmaps", [books_repo])
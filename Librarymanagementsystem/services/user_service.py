@@ -1,7 +1,7 @@
 # services/user_service.py
 from models.user import User, AccountStatus, Role
 from models.member import Member
-from utils.file_handler_fix import load_json, save_json
+from repositories import get_repository
 from datetime import datetime
 import re
 
@@ -9,27 +9,20 @@ import re
 class UserService:
     def __init__(self, user_path="data/users.json"):
         self.user_path = user_path
+        self.users = get_repository("users", user_path)
 
     # ... phần còn lại của code ...
 
     def register(self, user_data: dict) -> dict:
         """Đăng ký tài khoản mới"""
         try:
-            users = load_json(self.user_path)
-            
             # Kiểm tra username tồn tại
-            existing_user = next(
-                (u for u in users if u.get("username") == user_data.get("username")), 
-                None
-            )
+            existing_user = self.users.find_one(username=user_data.get("username"))
             if existing_user:
                 return {"success": False, "message": "Username đã tồn tại"}
             
             # Kiểm tra email tồn tại
-            existing_email = next(
-                (u for u in users if u.get("email") == user_data.get("email")), 
-                None
-            )
+            existing_email = self.users.find_one(email=user_data.get("email"))
             if existing_email:
                 return {"success": False, "message": "Email đã được sử dụng"}
             
@@ -43,26 +36,27 @@ class UserService:
             if len(user_data.get("username", "")) < 3:
                 return {"success": False, "message": "Username phải có ít nhất 3 ký tự"}
             
-            # Tạo user_id mới
-            user_id = len(users) + 1 if users else 1
-            
-            # Tạo user object
-            new_user = {
-                "user_id": user_id,
-                "username": user_data.get("username"),
-                "password": user_data.get("password"),
-                "email": user_data.get("email"),
-                "full_name": user_data.get("full_name", ""),
-                "phone_number": user_data.get("phone_number", ""),
-                "role": "MEMBER",
-                "status": "ACTIVE",
-                "borrowing_limit": 5,
-                "penalty_status": False,
-                "created_at": datetime.now().isoformat()
-            }
-            
-            users.append(new_user)
-            save_json(self.user_path, users)
+            # Tạo user_id mới = id lớn nhất + 1 (đếm số user sẽ trùng id sau khi
+            # có user bị xóa); trong transaction để 2 lần đăng ký không lấy cùng id
+            with self.users.transaction():
+                user_id = max((u["user_id"] for u in self.users.all()), default=0) + 1
+            
+                # Tạo user object
+                new_user = {
+                    "user_id": user_id,
+                    "username": user_data.get("username"),
+                    "password": user_data.get("password"),
+                    "email": user_data.get("email"),
+                    "full_name": user_data.get("full_name", ""),
+                    "phone_number": user_data.get("phone_number", ""),
+                    "role": "MEMBER",
+                    "status": "ACTIVE",
+                    "borrowing_limit": 5,
+                    "penalty_status": False,
+                    "created_at": datetime.now().isoformat()
+                }
+            
+                self.users.insert(new_user)
             
             return {
                 "success": True, 
@@ -77,12 +71,7 @@ class UserService:
     def login(self, username: str, password: str) -> dict:
         """Đăng nhập"""
         try:
-            users = load_json(self.user_path)
-            
-            user_data = next(
-                (u for u in users if u.get("username") == username), 
-                None
-            )
+            user_data = self.users.find_one(username=username)
             
             if not user_data:
                 return {"success": False, "message": "Username không tồn tại"}
@@ -133,39 +122,37 @@ class UserService:
     def update_profile(self, user_id: int, update_data: dict) -> dict:
         """Cập nhật thông tin cá nhân"""
         try:
-            users = load_json(self.user_path)
-            
-            for i, user in enumerate(users):
-                if user.get("user_id") == user_id:
-                    # Validate email nếu có
-                    if "email" in update_data:
-                        if not re.match(r'^[\w\.-]+@[\w\.-]+\.\w+$', update_data["email"]):
-                            return {"success": False, "message": "Email không hợp lệ"}
-                        
-                        # Kiểm tra email trùng
-                        existing_email = next(
-                            (u for u in users 
-                             if u.get("email") == update_data["email"] and u.get("user_id") != user_id), 
-                            None
-                        )
-                        if existing_email:
-                            return {"success": False, "message": "Email đã được sử dụng"}
-                    
-                    # Validate phone nếu có
-                    if "phone_number" in update_data:
-                        if not re.match(r'^\d{9,11}$', update_data["phone_number"]):
-                            return {"success": False, "message": "Số điện thoại không hợp lệ"}
-                    
-                    # Cập nhật thông tin
-                    for key, value in update_data.items():
-                        if key in ["email", "full_name", "phone_number"]:
-                            users[i][key] = value
-                    
-                    save_json(self.user_path, users)
-                    
-                    return {"success": True, "message": "Cập nhật thành công"}
+            user = self.users.get(user_id)
+            if not user:
+                return {"success": False, "message": "Không tìm thấy user"}
+
+            # Validate email nếu có
+            if "email" in update_data:
+                if not re.match(r'^[\w\.-]+@[\w\.-]+\.\w+$', update_data["email"]):
+                    return {"success": False, "message": "Email không hợp lệ"}
+                
+                # Kiểm tra email trùng
+                existing_email = next(
+                    (u for u in self.users.find(email=update_data["email"])
+                     if u.get("user_id") != user_id), 
+                    None
+                )
+                if existing_email:
+                    return {"success": False, "message": "Email đã được sử dụng"}
+            
+            # Validate phone nếu có
+            if "phone_number" in update_data:
+                if not re.match(r'^\d{9,11}$', update_data["phone_number"]):
+                    return {"success": False, "message": "Số điện thoại không hợp lệ"}
+            
+            # Cập nhật thông tin
+            changes = {
+                key: value for key, value in update_data.items()
+                if key in ["email", "full_name", "phone_number"]
+            }
+            self.users.update(user_id, changes)
             
-            return {"success": False, "message": "Không tìm thấy user"}
+            return {"success": True, "message": "Cập nhật thành công"}
             
         except Exception as e:
             print(f"Error updating profile: {e}")
@@ -177,19 +164,16 @@ class UserService:
             if len(new_password) < 8:
                 return {"success": False, "message": "Mật khẩu mới phải có ít nhất 8 ký tự"}
             
-            users = load_json(self.user_path)
+            user = self.users.get(user_id)
+            if not user:
+                return {"success": False, "message": "Không tìm thấy user"}
+
+            if user.get("password") != old_password:
+                return {"success": False, "message": "Mật khẩu cũ không đúng"}
             
-            for i, user in enumerate(users):
-                if user.get("user_id") == user_id:
-                    if user.get("password") != old_password:
-                        return {"success": False, "message": "Mật khẩu cũ không đúng"}
-                    
-                    users[i]["password"] = new_password
-                    save_json(self.user_path, users)
-                    
-                    return {"success": True, "message": "Đổi mật khẩu thành công"}
+            self.users.update(user_id, {"password": new_password})
             
-            return {"success": False, "message": "Không tìm thấy user"}
+            return {"success": True, "message": "Đổi mật khẩu thành công"}
             
         except Exception as e:
             print(f"Error resetting password: {e}")
@@ -198,9 +182,7 @@ class UserService:
     def get_user_by_id(self, user_id: int):
         """Lấy thông tin user theo ID"""
         try:
-            users = load_json(self.user_path)
-            
-            user_data = next((u for u in users if u.get("user_id") == user_id), None)
+            user_data = self.users.get(user_id)
             if not user_data:
                 return None
             
@@ -236,7 +218,7 @@ class UserService:
     def search_users(self, keyword: str):
         """Tìm kiếm user"""
         try:
-            users = load_json(self.user_path)
+            users = self.users.all()
             
             results = []
             keyword_lower = keyword.lower()
@@ -262,13 +244,8 @@ class UserService:
             if status not in ["ACTIVE", "INACTIVE", "SUSPENDED"]:
                 return {"success": False, "message": "Trạng thái không hợp lệ"}
             
-            users = load_json(self.user_path)
-            
-            for i, user in enumerate(users):
-                if user.get("user_id") == user_id:
-                    users[i]["status"] = status
-                    save_json(self.user_path, users)
-                    return {"success": True, "message": f"Cập nhật trạng thái thành {status}"}
+            if self.users.update(user_id, {"status": status}):
+                return {"success": True, "message": f"Cập nhật trạng thái thành {status}"}
             
             return {"success": False, "message": "Không tìm thấy user"}
             
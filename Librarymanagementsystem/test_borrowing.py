@@ -0,0 +1,301 @@
+import threading
+from datetime import date, datetime
+
+import pytest
+
+import repositories
+from config import FINE_PER_DAY
+from repositories import derived
+from services.fine_service import FineService
+from utils.file_handler_fix import load_json
+from utils.file_lock import locked
+from utils.group_commit import atomic_write_text, group_commit
+
+
+def test_concurrent_borrows_do_not_oversell(seed, paths, borrow_service):
+    seed(
+        users=[{"user_id": i, "status": "ACTIVE"} for i in range(20)],
+        books=[{"book_id": "B1", "available_quantity": 5}],
+    )
+    service = borrow_service()
+
+    before = group_commit.stats()
+    results = []
+    threads = [
+        threading.Thread(target=lambda u=i: results.append(service.borrow_book(u, "B1")))
+        for i in range(20)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert sum(r["success"] for r in results) == 5
+    with locked(paths["books"], paths["borrows"]):
+        assert load_json(paths["books"])[0]["available_quantity"] == 0
+        assert len(load_json(paths["borrows"])) == 5
+    after = group_commit.stats()
+    assert after["syncs"] - before["syncs"] <= after["requests"] - before["requests"]
+
+
+def test_borrow_and_return_lock_files_in_path_order(monkeypatch, seed, borrow_service):
+    seed(
+        users=[{"user_id": 1, "status": "ACTIVE"}],
+        books=[{"book_id": "B1", "quantity": 2, "available_quantity": 2}],
+    )
+    service = borrow_service()
+    opened = []
+    for repo in (service.borrows, service.books):
+        original = repo.transaction
+        monkeypatch.setattr(repo, "transaction", lambda r=repo, tx=original: opened.append(r.name) or tx())
+
+    # books.json < borrows.json: cùng thứ tự với utils.file_lock.locked()
+    borrow_id = service.borrow_book(1, "B1")["borrow_id"]
+    assert opened[:2] == ["books", "borrow_orders"]
+    opened.clear()
+    assert service.return_book(borrow_id)["success"]
+    assert opened[:2] == ["books", "borrow_orders"]
+
+
+def test_batch_record_restores_both_files_after_crash_between_writes(monkeypatch, tmp_path, paths, seed, borrow_service):
+    seed(
+        users=[{"user_id": 1, "status": "ACTIVE"}],
+        books=[{"book_id": "B1", "quantity": 3, "available_quantity": 3}],
+        borrows=[],
+    )
+    service = borrow_service()
+    assert service.borrow_book(1, "B1")["success"]
+    assert list(tmp_path.glob("*.batch")) == []  # ghi xong cả 2 file -> bản ghi gộp bị xóa
+
+    with open(paths["books"], encoding="utf-8") as f:
+        books_before = f.read()
+    # Process bị tắt sau khi borrow_orders đã ghi nhưng books thì chưa
+    monkeypatch.setattr("repositories.base.discard_batch", lambda batch_path: None)
+    borrow_id = service.borrow_book(1, "B1")["borrow_id"]
+    atomic_write_text(paths["books"], books_before)
+    assert len(list(tmp_path.glob("*.batch"))) == 1
+
+    # Khởi động lại: áp lại bản ghi gộp trước khi đọc dữ liệu
+    monkeypatch.setattr(repositories, "_repositories", {})
+    monkeypatch.setattr(derived, "_shared", {})
+    restarted = borrow_service()
+    assert restarted.books.get("B1")["available_quantity"] == 1
+    assert restarted.borrows.get(borrow_id)["status"] == "BORROWED"
+    assert list(tmp_path.glob("*.batch")) == []
+
+
+def test_inventory_reservations_track_commits_and_external_writes(seed, borrow_service):
+    seed(
+        users=[{"user_id": i, "status": "ACTIVE"} for i in range(3)],
+        books=[{"book_id": "B1", "quantity": 2, "available_quantity": 2}],
+    )
+    service = borrow_service()
+    inventory = service.inventory
+
+    assert inventory.reserve("B1", 2) and not inventory.reserve("B1")
+    results = []
+    desk = threading.Thread(target=lambda: results.append(service.borrow_book(1, "B1")))
+    desk.start()
+    desk.join()
+    assert results == [{"success": False, "message": "Sách đã hết"}]  # bị chặn bởi giữ chỗ
+    inventory.release("B1")
+    assert inventory.available("B1") == 2 and inventory.reserved == {}
+
+    assert service.borrow_book(1, "B1")["success"]
+    assert inventory.available("B1") == 1 and inventory.reserved == {}
+    assert service.borrow_book(1, "B9")["message"] == "Sách không tồn tại"
+
+    # Process khác ghi thẳng vào file: số lượng mới được nạp lại trước khi giữ chỗ
+    seed(books=[{"book_id": "B1", "quantity": 2, "available_quantity": 0}])
+    assert service.borrow_book(2, "B1") == {"success": False, "message": "Sách đã hết"}
+    assert inventory.available("B1") == 0
+
+
+def test_batch_borrow_and_return_are_all_or_nothing_with_one_write(seed, borrow_service):
+    seed(
+        users=[{"user_id": 1, "status": "ACTIVE", "borrowing_limit": 4}],
+        books=[
+            {"book_id": "B1", "quantity": 2, "available_quantity": 2},
+            {"book_id": "B2", "quantity": 1, "available_quantity": 1},
+            {"book_id": "B3", "quantity": 1, "available_quantity": 0},
+        ],
+    )
+    service = borrow_service()
+    stock = lambda: {b["book_id"]: b["available_quantity"] for b in service.books.all()}
+
+    result = service.borrow_books(1, ["B1", "B2", "B3"])
+    assert result == {"success": False, "message": "Sách đã hết: B3"}
+    # Giới hạn mượn được kiểm tra trước số lượng còn lại
+    assert service.borrow_books(1, ["B1"] * 5)["message"] == "Đã đạt giới hạn mượn (4 sách)"
+    assert service.borrow_books(9, ["B3"])["message"] == "User không tồn tại"
+    assert not service.borrow_books(1, ["B1", "B1", "B2", "B1"])["success"]  # B1 chỉ còn 2
+    assert not service.borrow_books(1, ["B1", "B1", "B2", "B9"])["success"]
+    assert stock() == {"B1": 2, "B2": 1, "B3": 0} and service.borrows.count() == 0
+    assert service.inventory.reserved == {}
+
+    before = group_commit.stats()["requests"]
+    result = service.borrow_books(1, ["B1", "B2", "B1"])
+    assert result["success"] and len(result["borrow_ids"]) == 3
+    assert group_commit.stats()["requests"] - before == 2  # books + borrow_orders, mỗi file 1 lần
+    assert stock() == {"B1": 0, "B2": 0, "B3": 0}
+    assert service.borrow_books(1, ["B3"])["message"] == "Sách đã hết"
+
+    first, *rest = result["borrow_ids"]
+    assert service.return_books(rest + ["missing"])["message"] == "Không tìm thấy đơn mượn: missing"
+    assert service.return_book(first)["success"]
+    assert not service.return_books(rest + [first])["success"]  # first đã trả -> không trả gì
+    assert stock() == {"B1": 1, "B2": 0, "B3": 0}
+
+    before = group_commit.stats()["requests"]
+    assert service.return_books(rest)["success"]
+    assert group_commit.stats()["requests"] - before == 2
+    assert stock() == {"B1": 2, "B2": 1, "B3": 0}
+    assert service.inventory.available("B1") == 2
+
+
+def test_active_loan_index_follows_borrow_return_and_lost(seed, borrow_service):
+    seed(
+        users=[{"user_id": 1, "status": "ACTIVE", "borrowing_limit": 2}],
+        books=[{"book_id": "B1", "quantity": 5, "available_quantity": 5}],
+        borrows=[
+            {"borrow_id": f"old{i}", "user_id": 1, "book_id": "B1", "status": "RETURNED"}
+            for i in range(50)
+        ] + [{"borrow_id": "active", "user_id": 1, "book_id": "B1", "status": "BORROWED"}],
+    )
+    service = borrow_service()
+    loans = service.active_loans
+
+    assert loans.borrow_ids(1) == {"active"}  # dựng từ dữ liệu lúc khởi động
+    second = service.borrow_book(1, "B1")["borrow_id"]
+    assert service.borrow_book(1, "B1")["message"] == "Đã đạt giới hạn mượn (2 sách)"
+    assert [b["borrow_id"] for b in service.get_user_borrows(1, active_only=True)] == ["active", second]
+
+    assert service.report_lost("active")["success"]
+    assert loans.count(1) == 1 and service.books.get("B1")["quantity"] == 4
+    assert service.borrow_book(1, "B1")["success"]
+    assert service.return_books([second])["success"]
+    assert loans.count(1) == 1 and second not in loans.borrow_ids(1)
+
+
+def test_overdue_scanner_marks_only_newly_overdue_loans(seed, borrow_service):
+    seed(
+        users=[{"user_id": 1, "status": "ACTIVE"}],
+        books=[{"book_id": "B1", "quantity": 5, "available_quantity": 2}],
+        borrows=[
+            {"borrow_id": "D1", "user_id": 1, "book_id": "B1", "status": "BORROWED",
+             "due_date": "2024-01-05T00:00:00"},
+            {"borrow_id": "D2", "user_id": 1, "book_id": "B1", "status": "BORROWED",
+             "due_date": "2024-01-10T00:00:00"},
+            {"borrow_id": "D3", "user_id": 1, "book_id": "B1", "status": "RETURNED",
+             "due_date": "2024-01-01T00:00:00"},
+        ],
+    )
+    service = borrow_service()
+    events = []
+    service.subscribe_overdue(lambda borrows: events.append([b["borrow_id"] for b in borrows]))
+
+    assert [b["borrow_id"] for b in service.scan_overdue(datetime(2024, 1, 6))] == ["D1"]
+    assert service.scan_overdue(datetime(2024, 1, 6)) == []  # đã đánh dấu -> không lấy lại
+    assert service.borrows.get("D1")["status"] == "OVERDUE"
+
+    service.borrows.update("D2", {"due_date": "2024-01-20T00:00:00"})  # gia hạn
+    assert service.scan_overdue(datetime(2024, 1, 15)) == []
+    assert [b["borrow_id"] for b in service.scan_overdue(datetime(2024, 2, 1))] == ["D2"]
+    assert events == [["D1"], ["D2"]]
+
+    # Đơn quá hạn vẫn đang mượn: tính vào giới hạn, trả được
+    assert service.active_loans.count(1) == 2
+    assert [b["borrow_id"] for b in service.iter_overdue_borrows(datetime(2024, 2, 1))] == ["D1", "D2"]
+    assert service.return_books(["D1", "D2"])["success"]
+    assert service.active_loans.count(1) == 0
+
+
+def test_fine_accrual_is_idempotent_per_day_and_resumable(monkeypatch, paths, seed):
+    seed(
+        fines=[],
+        borrows=[
+            {"borrow_id": f"L{i}", "user_id": i % 3, "book_id": f"B{i}", "status": "BORROWED",
+             "due_date": f"2024-01-{10 + i:02d}T23:59:59"}
+            for i in range(5)
+        ] + [
+            {"borrow_id": "OLD", "user_id": 9, "books": ["X1", "X2"], "status": "OVERDUE",
+             "due_date": "2024-01-01T10:00:00"},
+            {"borrow_id": "DONE", "user_id": 9, "book_id": "X3", "status": "RETURNED",
+             "due_date": "2024-01-01T10:00:00"},
+            {"borrow_id": "LATER", "user_id": 9, "book_id": "X4", "status": "BORROWED",
+             "due_date": "2024-01-20T10:00:00"},
+        ],
+    )
+    service = FineService(paths["fines"], borrow_path=paths["borrows"])
+    fines = lambda: {f["fine_id"]: f["amount"] for f in service.fines.all()}
+
+    # Dừng sau batch đầu (ghi lỗi ở batch 2) -> lần sau tiếp tục từ batch 2
+    original_insert = service.fines.insert
+    calls = []
+
+    def failing_insert(record):
+        calls.append(record["fine_id"])
+        if len(calls) == 4:
+            raise OSError("disk full")
+        return original_insert(record)
+
+    with monkeypatch.context() as patch:
+        patch.setattr(service.fines, "insert", failing_insert)
+        with pytest.raises(OSError):
+            service.accrue_overdue_fines(date(2024, 1, 13), batch_size=3)
+    assert len(fines()) == 3
+
+    report = service.accrue_overdue_fines(date(2024, 1, 13), batch_size=3)
+    assert (report["details"], report["resumed_from"], report["accrued"]) == (5, 3, 2)
+    assert report["backend"] in ("array", "numpy") and report["details_per_sec"] >= 0
+    assert fines() == {
+        "OVERDUE-OLD-X1": 12 * FINE_PER_DAY, "OVERDUE-OLD-X2": 12 * FINE_PER_DAY,
+        "OVERDUE-L0-B0": 3 * FINE_PER_DAY, "OVERDUE-L1-B1": 2 * FINE_PER_DAY,
+        "OVERDUE-L2-B2": 1 * FINE_PER_DAY,
+    }
+
+    before = group_commit.stats()["requests"]
+    report = service.accrue_overdue_fines(date(2024, 1, 13))  # chạy lại cùng ngày: không đổi
+    assert report["accrued"] == 0 and group_commit.stats()["requests"] == before
+
+    service.fines.update("OVERDUE-L0-B0", {"status": "PAID"})
+    before = group_commit.stats()["requests"]
+    report = service.accrue_overdue_fines(date(2024, 1, 14))
+    assert (report["accrued"], report["skipped"], report["batches"]) == (5, 1, 1)
+    assert group_commit.stats()["requests"] - before == 1  # cả lô ghi 1 lần
+    assert fines()["OVERDUE-L0-B0"] == 3 * FINE_PER_DAY and fines()["OVERDUE-L3-B3"] == FINE_PER_DAY
+    assert fines()["OVERDUE-OLD-X1"] == 13 * FINE_PER_DAY
+
+
+def test_resumed_fine_accrual_rechecks_loans_before_checkpoint(monkeypatch, paths, seed):
+    seed(
+        fines=[],
+        borrows=[
+            {"borrow_id": f"L{i}", "user_id": 1, "book_id": f"B{i}", "status": "BORROWED",
+             "due_date": f"2024-01-{10 + i:02d}T00:00:00"}
+            for i in range(4)
+        ],
+    )
+    service = FineService(paths["fines"], borrow_path=paths["borrows"])
+    original_insert = service.fines.insert
+
+    def failing_insert(record):
+        if record["fine_id"] == "OVERDUE-L2-B2":
+            raise OSError("disk full")
+        return original_insert(record)
+
+    with monkeypatch.context() as patch:
+        patch.setattr(service.fines, "insert", failing_insert)
+        with pytest.raises(OSError):
+            service.accrue_overdue_fines(date(2024, 1, 20), batch_size=2)
+
+    # Đơn quá hạn xuất hiện sau khi checkpoint (L1) đã ghi, xếp trước checkpoint
+    service.borrows.insert({"borrow_id": "NEW", "user_id": 2, "book_id": "B9", "status": "BORROWED",
+                            "due_date": "2024-01-05T00:00:00"})
+    report = service.accrue_overdue_fines(date(2024, 1, 20), batch_size=2)
+    assert (report["details"], report["resumed_from"], report["late"], report["accrued"]) == (5, 3, 1, 3)
+    assert service.fines.get("OVERDUE-NEW-B9")["amount"] == 15 * FINE_PER_DAY
+    assert len(service.fines.all()) == 5
+
+    report = service.accrue_overdue_fines(date(2024, 1, 20))
+    assert (report["resumed_from"], report["late"], report["accrued"]) == (5, 0, 0)
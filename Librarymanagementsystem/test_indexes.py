@@ -0,0 +1,200 @@
+from datetime import datetime
+
+from utils.lru_cache import LRUCache
+
+
+def test_category_index_and_facets_follow_borrows_and_admin_edits(seed, book_service, borrow_service):
+    seed(
+        books=[
+            {"book_id": "B1", "title": "A", "category_id": 1, "quantity": 3, "available_quantity": 3},
+            {"book_id": "B2", "title": "B", "category_id": 2, "quantity": 2, "available_quantity": 2},
+            {"book_id": "B3", "title": "C", "category_id": 1, "quantity": 1, "available_quantity": 1},
+        ],
+        users=[{"user_id": 1, "status": "ACTIVE"}],
+        categories={"categories": [{"category_id": 1, "category_name": "Truyện"}]},
+    )
+    service = book_service()
+    borrows = borrow_service()
+
+    assert [b.book_id for b in service.view_books_by_category("1")] == ["B1", "B3"]
+    assert service.get_category_facets()["1"] == {"books": 2, "total": 4, "available": 4, "borrowed": 0}
+
+    result = borrows.borrow_book(1, "B1")
+    assert result["success"]
+    assert service.get_category_facets()["1"] == {"books": 2, "total": 4, "available": 3, "borrowed": 1}
+    assert service.get_categories()["categories"][0]["borrowed"] == 1
+
+    service.books.update("B2", {"category_id": 1})  # admin đổi thể loại
+    service.books.delete("B3")
+    assert [b.book_id for b in service.view_books_by_category(1)] == ["B1", "B2"]
+    assert service.get_category_facets() == {"1": {"books": 2, "total": 5, "available": 4, "borrowed": 1}}
+
+    borrows.return_book(result["borrow_id"])
+    assert service.get_category_facets()["1"]["borrowed"] == 0
+
+
+def test_query_books_uses_most_selective_index_first(seed, book_service):
+    seed(
+        books=[
+            {"book_id": f"B{i:02d}", "title": f"Sách {i}", "category_id": 1 if i % 4 == 0 else 0,
+             "publication_year": 1985 + i, "quantity": 1, "available_quantity": 0 if i == 6 else 1,
+             "author_id": 7 if i < 10 else 8}
+            for i in range(20)
+        ],
+        authors=[{"author_id": 7, "author_name": "Tô Hoài"}, {"author_id": 8, "author_name": "Nam Cao"}],
+    )
+    service = book_service()
+    filters = dict(category=0, author="to hoai", year_from=1990, year_to=2005, available=True)
+
+    assert [b.book_id for b in service.query_books(**filters)] == ["B05", "B07", "B09"]
+    explain = service.explain_query(**filters)
+    assert explain["strategy"] == "index"
+    assert [i["field"] for i in explain["indexes"]] == ["author_id", "category_id", "available"]
+    assert explain["indexes"][0]["estimated_rows"] == 10
+    assert explain["filters"] == ["publication_year"]
+    assert explain["rows_scanned"] == 10 and explain["rows_returned"] == 3
+
+    service.books.update("B06", {"available_quantity": 1})
+    assert [b.book_id for b in service.query_books(**filters)] == ["B05", "B06", "B07", "B09"]
+    assert service.explain_query(status="AVAILABLE", year_from=1990)["strategy"] == "index"
+    assert service.explain_query(author=None, category=None)["strategy"] == "full_scan"
+
+    # Khoảng năm hẹp -> RangeIndex làm driver, chỉ duyệt đúng k dòng
+    explain = service.explain_query(year_from=2001, year_to=2003, category=0)
+    assert explain["indexes"][0] == {"field": "publication_year", "type": "range", "estimated_rows": 3}
+    assert explain["rows_scanned"] == 3 and explain["rows_returned"] == 2
+    assert [b.book_id for b in service.query_books(year_from=2001, year_to=2003, category=0)] == ["B17", "B18"]
+
+
+def test_due_date_range_index_drives_overdue_lookup(seed, borrow_service):
+    seed(borrows=[
+        {"borrow_id": "O1", "status": "BORROWED", "due_date": "2026-03-05T10:00:00"},
+        {"borrow_id": "O2", "status": "RETURNED", "due_date": "2026-03-01T10:00:00"},
+        {"borrow_id": "O3", "status": "BORROWED", "due_date": "2026-03-02T10:00:00"},
+        {"borrow_id": "O4", "status": "BORROWED", "due_date": "không hợp lệ"},
+        {"borrow_id": "O5", "status": "BORROWED", "due_date": "2026-04-01T10:00:00"},
+    ])
+    service = borrow_service()
+    now = datetime(2026, 3, 10)
+
+    assert [b["borrow_id"] for b in service.iter_overdue_borrows(now)] == ["O3", "O1"]  # hạn sớm trước
+    assert service.due_index.due_between(datetime(2026, 3, 3), datetime(2026, 4, 1, 10), include_end=True) == ["O1", "O5"]
+
+    service.borrows.update("O3", {"status": "RETURNED"})
+    service.borrows.update("O5", {"due_date": "2026-03-09T00:00:00"})
+    service.borrows.insert({"borrow_id": "O6", "status": "BORROWED", "due_date": "2026-02-01T00:00:00"})
+    assert [b["borrow_id"] for b in service.iter_overdue_borrows(now)] == ["O6", "O1", "O5"]
+
+
+def test_bitmap_filters_follow_availability_and_persist(seed, book_service, borrow_service):
+    seed(
+        books=[
+            {"book_id": f"B{i}", "title": f"S{i}", "category_id": i % 3, "status": "AVAILABLE",
+             "publication_year": 1990 + i, "quantity": 1, "available_quantity": 1}
+            for i in range(9)
+        ],
+        users=[{"user_id": 1, "status": "ACTIVE"}],
+    )
+    service = book_service()
+    borrows = borrow_service()
+
+    assert service.count_books(category=[0, 1], available=True, year_from=1992) == 4  # B3 B4 B6 B7
+    assert borrows.borrow_book(1, "B3")["success"]   # available_quantity 1 -> 0
+    assert [b.book_id for b in service.filter_books(category=[0, 1], available=True, year_from=1992)] == ["B4", "B6", "B7"]
+    assert service.count_books(available=False) == 1
+
+    service.books.update("B6", {"status": "LOST"})
+    service.books.delete("B7")
+    service.books.insert({"book_id": "B9", "category_id": 1, "publication_year": 2000, "available_quantity": 2})
+    assert [b.book_id for b in service.filter_books(category=[0, 1], year_from=1992, exclude_status="LOST")] == ["B3", "B4", "B9"]
+    assert [b.book_id for b in service.filter_books(limit=2)] == ["B0", "B1"]
+    assert service.bitmap_index.ids[7] == "B9" and len(service.bitmap_index.ids) == 9  # dùng lại ô của B7
+
+    index = service.bitmap_index
+    assert index.save()
+    reloaded = type(index)(service.books, index.persist_path)
+    assert reloaded._synced is not None
+    assert reloaded.book_ids(reloaded.select({"category_id": ["1"]}, year_from=1992)) == ["B4", "B9"]
+
+    service.books.delete("B2")
+    service.books.delete("B0")
+    service.books.insert({"book_id": "B10", "category_id": 2})
+    assert service.count_books(category=[2]) == 3  # B5 B8 B10
+    assert service.bitmap_index.ids[:3] == ["B10", "B1", None] and len(service.bitmap_index.ids) == 9
+
+
+def test_book_cache_hits_and_precise_invalidation(seed, book_service, borrow_service, admin_service):
+    seed(
+        books=[
+            {"book_id": "B1", "title": "A", "quantity": 2, "available_quantity": 2},
+            {"book_id": "B2", "title": "B", "quantity": 1, "available_quantity": 1},
+        ],
+        users=[{"user_id": 1, "status": "ACTIVE"}],
+    )
+    service = book_service()
+    borrows = borrow_service()
+    admin = admin_service()
+
+    b1, b2 = service.get_book_by_id("B1"), service.get_book_by_id("B2")
+    assert service.get_book_by_id("B1").to_dict() == b1.to_dict()
+    assert service.view_book_details("B2") == b2.getDetails()
+    stats = service.cache_stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (2, 2, 2)
+
+    assert borrows.borrow_book(1, "B1")["success"]
+    assert service.get_book_by_id("B1").available_quantity == 1
+    misses = service.cache_stats()["misses"]
+    assert service.get_book_by_id("B2").to_dict() == b2.to_dict()
+    assert service.cache_stats()["misses"] == misses  # sách khác không bị xóa khỏi cache
+
+    admin.update_book("B2", {"title": "B (mới)"})
+    assert service.get_book_by_id("B2").title == "B (mới)"
+    admin.delete_book("B2")
+    assert service.get_book_by_id("B2") is None
+    assert service.cache_stats()["invalidations"] == 3
+
+
+def test_books_returned_from_cache_are_copies(seed, book_service):
+    seed(books=[{"book_id": "B1", "title": "Tắt đèn", "quantity": 2, "available_quantity": 2}])
+    service = book_service()
+
+    book = service.get_book_by_id("B1")
+    book.title = "Sửa tay"
+    book.decreaseAvailable()
+    found = service.search_books("tat den")[0]
+    found.status = "LOST"
+
+    cached = service.get_book_by_id("B1")
+    assert (cached.title, cached.available_quantity, cached.status) == ("Tắt đèn", 2, "AVAILABLE")
+    assert service.search_books("tat den")[0].status == "AVAILABLE"
+    assert service.cache_stats()["misses"] == 1  # vẫn đọc từ cache, không nạp lại
+
+
+def test_lru_cache_bounds_size_and_expires_entries():
+    now = [0.0]
+    cache = LRUCache(max_size=2, ttl=10, clock=lambda: now[0])
+    loads = []
+    load = lambda key: loads.append(key) or key.upper()
+
+    assert [cache.get_or_load(k, load) for k in ("a", "b", "a", "c")] == ["A", "B", "A", "C"]
+    assert loads == ["a", "b", "c"] and cache.stats()["evictions"] == 1  # "b" ít dùng nhất
+    assert cache.get("b") is None and cache.get("a") == "A"
+    now[0] = 11
+    assert cache.get("a") is None and cache.stats()["expirations"] == 1
+    assert cache.stats()["hit_rate"] == 2 / 7
+
+
+def test_search_results_hydrate_in_bulk_without_flooding_book_cache(monkeypatch, seed, book_service):
+    seed(books=[{"book_id": f"B{i}", "title": f"Truyện {i}"} for i in range(6)])
+    service = book_service()
+    service.get_book_by_id("B2")
+    gets = []
+    original_get = service.books.get
+    monkeypatch.setattr(service.books, "get", lambda key: gets.append(key) or original_get(key))
+
+    assert [b.book_id for b in service.search_books("truyen")] == [f"B{i}" for i in range(6)]
+    assert gets == [] and service.cache_stats()["size"] == 1  # chỉ B2 đã có sẵn
+
+    page, _ = service.search_books_page("truyen", limit=3)
+    assert [b.book_id for b in page] == ["B0", "B1", "B2"]
+    assert service.cache_stats()["size"] == 3  # trang kết quả được cache
@@ -0,0 +1,198 @@
+import pytest
+
+from services.search_index import StaleCursorError
+from utils.text_search import PREFIX_EXPANSION_LIMIT, InvertedIndex
+
+
+def test_book_service_reuses_author_join_until_data_changes(seed, book_service):
+    seed(
+        books=[{"book_id": 1, "title": "A"}, {"book_id": 2, "title": "B", "author_id": 9}],
+        authors=[{"author_id": 7, "author_name": "Nam Cao"}, {"author_id": 9, "author_name": "Tô Hoài"}],
+        book_author=[{"book_id": "1", "author_id": 7}],
+    )
+    service = book_service()
+
+    first, second = service.get_all_books()
+    assert first.author.getAuthorName() == "Nam Cao"
+    assert second.author.getAuthorName() == "Tô Hoài"
+    assert service.get_book_by_id(1).author is first.author  # Author dùng chung
+
+    service.authors.update(7, {"author_name": "Nam Cao (mới)"})
+    assert service.get_book_by_id(1).author.getAuthorName() == "Nam Cao (mới)"
+    seed(book_author=[{"book_id": "1", "author_id": 9}])
+    assert service.get_book_by_id(1).author.getAuthorName() == "Tô Hoài"
+
+
+def test_book_search_index_folds_diacritics_and_updates_incrementally(monkeypatch, paths, seed, book_service):
+    seed(
+        books=[
+            {"book_id": "B1", "title": "Dế Mèn phiêu lưu ký", "description": "Truyện thiếu nhi"},
+            {"book_id": "B2", "title": "Số đỏ", "description": "Tiểu thuyết trào phúng, có dế"},
+        ],
+        authors=[{"author_id": 9, "author_name": "Tô Hoài"}],
+        book_author=[{"book_id": "B1", "author_id": 9}],
+    )
+    service = book_service()
+
+    assert [b.book_id for b in service.search_books("de men")] == ["B1"]
+    assert [b.book_id for b in service.search_books("TO HOAI")] == ["B1"]
+    assert [b.book_id for b in service.search_books("dế")] == ["B1", "B2"]  # title nặng hơn mô tả
+    assert [b.book_id for b in service.search_books("phieu l")] == ["B1"]   # từ cuối là tiền tố
+
+    # Ghi qua repository -> chỉ mục cập nhật tăng dần, không dựng lại
+    index = service.search_index
+    rebuild_calls = []
+    original_rebuild = index.rebuild
+    monkeypatch.setattr(index, "rebuild", lambda records: rebuild_calls.append(1) or original_rebuild(records))
+    service.books.insert({"book_id": "B3", "title": "Đất rừng phương Nam"})
+    service.books.update("B2", {"title": "Số đỏ (tái bản)"})
+    service.books.delete("B1")
+    assert [b.book_id for b in service.search_books("dat rung")] == ["B3"]
+    assert [b.book_id for b in service.search_books("tai ban")] == ["B2"]
+    assert service.search_books("de men") == []
+    assert rebuild_calls == []
+
+    # Chỉ mục đã lưu được dùng lại khi dữ liệu nguồn chưa đổi
+    assert index.save()
+    reloaded = type(index)(service.books, service.authors, paths["book_author"],
+                           service._search_describer, index.persist_path)
+    assert reloaded.index.search("dat rung")[0][0] == "B3"
+    assert reloaded._synced is not None
+
+
+def test_fuzzy_search_tolerates_typos(seed, book_service):
+    seed(
+        books=[
+            {"book_id": "B1", "title": "Dế Mèn phiêu lưu ký"},
+            {"book_id": "B2", "title": "Những người khốn khổ", "author_id": 2},
+        ],
+        authors=[{"author_id": 2, "author_name": "Victor Hugo"}],
+    )
+    service = book_service()
+
+    assert service.search_books("phieu luuu ky") == []
+    assert [b.book_id for b in service.search_books("phieu luuu ky", fuzzy=True)] == ["B1"]
+    assert [b.book_id for b in service.search_books("victr hugo", fuzzy=True)] == ["B2"]
+    assert service.search_books("B3", fuzzy=True) == []  # mã sách không tìm gần đúng
+
+    # Trigram được cập nhật cùng chỉ mục
+    service.books.insert({"book_id": "B3", "title": "Tắt đèn"})
+    assert [b.book_id for b in service.search_books("tatt den", fuzzy=True)] == ["B3"]
+
+
+def test_search_and_listing_pages_follow_cursor(monkeypatch, seed, book_service):
+    seed(books=[
+        {"book_id": f"B{i:02d}", "title": f"Truyện ngắn tập {i}", "publication_year": 2000 + i % 3}
+        for i in range(25)
+    ])
+    service = book_service()
+    hydrated = []
+    original_hydrate = service._hydrate
+    monkeypatch.setattr(service, "_hydrate", lambda data, join: hydrated.append(1) or original_hydrate(data, join))
+
+    seen, cursor = [], None
+    while True:
+        page, cursor = service.search_books_page("truyen", limit=10, cursor=cursor)
+        seen += [b.book_id for b in page]
+        if cursor is None:
+            break
+    assert seen == [b.book_id for b in service.search_books("truyen")]
+    assert len(set(seen)) == 25 and len(hydrated) == 25  # search_books dùng lại Book đã cache từ 3 trang
+
+    page, cursor = service.get_books_page(limit=4, sort_by="publication_year")
+    assert [b.book_id for b in page] == ["B00", "B03", "B06", "B09"]
+    service.books.delete("B00")  # dữ liệu đổi giữa 2 trang: không lặp, không sót
+    page, cursor = service.get_books_page(limit=4, cursor=cursor, sort_by="publication_year")
+    assert [b.book_id for b in page] == ["B12", "B15", "B18", "B21"]
+
+    # Thứ tự dựng sẵn cập nhật tăng dần khi sách đổi
+    service.books.update("B03", {"publication_year": 2002})
+    service.books.insert({"book_id": "A00", "publication_year": 2000})
+    page, cursor = service.get_books_page(limit=3, sort_by="publication_year")
+    assert [b.book_id for b in page] == ["A00", "B06", "B09"]
+    assert service.get_books_page(limit=2, cursor=cursor, sort_by="publication_year")[0][0].book_id == "B12"
+    assert [b.book_id for b in service.get_books_page(limit=2)[0]] == ["A00", "B01"]
+
+
+def test_search_pages_keep_first_page_ranking_across_writes(seed, book_service):
+    seed(books=[{"book_id": f"B{i:02d}", "title": f"Truyện ngắn tập {i}"} for i in range(12)])
+    service = book_service()
+    ranking = [b.book_id for b in service.search_books("truyen")]
+
+    page, cursor = service.search_books_page("truyen", limit=5)
+    seen = [b.book_id for b in page]
+    # Ghi giữa 2 trang: điểm BM25 của mọi sách đổi, nhưng chuỗi trang giữ thứ hạng cũ
+    service.books.insert({"book_id": "B99", "title": "Truyện truyện truyện"})
+    service.books.delete(ranking[-1])
+    while cursor is not None:
+        page, cursor = service.search_books_page("truyen", limit=5, cursor=cursor)
+        seen += [b.book_id for b in page]
+    assert seen == ranking[:-1]
+    assert service.search_books("truyen")[0].book_id == "B99"
+
+    # Thứ hạng cũ không còn trong cache -> báo lỗi thay vì trả trang lệch
+    page, cursor = service.search_books_page("truyen", limit=5)
+    service.books.update("B00", {"title": "Tắt đèn"})
+    service.search_index.results.clear()
+    with pytest.raises(StaleCursorError):
+        service.search_books_page("truyen", limit=5, cursor=cursor)
+
+
+def test_autocomplete_ranks_by_popularity_and_follows_admin_changes(seed, book_service, admin_service):
+    seed(
+        books=[
+            {"book_id": 1, "title": "Tắt đèn", "quantity": 5, "available_quantity": 5, "author_id": 1},
+            {"book_id": 2, "title": "Tam quốc diễn nghĩa", "quantity": 5, "available_quantity": 1},
+        ],
+        authors=[{"author_id": 1, "author_name": "Ngô Tất Tố"}],
+        users=[],
+    )
+    service = book_service()
+    admin = admin_service()
+
+    assert service.suggest("ta") == ["Tam quốc diễn nghĩa", "Tắt đèn"]  # đang mượn 4 > 0
+    assert service.suggest("NGO T") == ["Ngô Tất Tố"]
+    assert service.suggest("") == []
+
+    admin.add_book({"title": "Tắt đèn", "quantity": 9, "available_quantity": 0})
+    assert service.suggest("tat") == ["Tắt đèn"]  # cùng tiêu đề -> 1 gợi ý
+    assert service.autocomplete.complete("tat") == [("Tắt đèn", 9)]
+    admin.delete_book(2)
+    assert service.suggest("ta") == ["Tắt đèn"]
+
+
+def test_search_results_cached_until_catalog_text_changes(seed, book_service, borrow_service, admin_service):
+    seed(
+        books=[
+            {"book_id": "B1", "title": "Dế Mèn phiêu lưu ký", "quantity": 2, "available_quantity": 2},
+            {"book_id": "B2", "title": "Tắt đèn", "quantity": 1, "available_quantity": 1},
+        ],
+        users=[{"user_id": 1, "status": "ACTIVE"}],
+    )
+    service = book_service()
+    borrows = borrow_service()
+    admin = admin_service()
+
+    assert [b.book_id for b in service.search_books("de men")] == ["B1"]
+    assert [b.book_id for b in service.search_books("  Dế   MÈN ")] == ["B1"]
+    assert service.query_cache_stats()["hits"] == 1
+
+    # Mượn sách chỉ đổi số lượng: vẫn dùng cache nhưng số lượng là mới
+    assert borrows.borrow_book(1, "B1")["success"]
+    assert service.search_books("de men")[0].available_quantity == 1
+    assert service.query_cache_stats()["hits"] == 2
+
+    admin.update_book("B2", {"title": "Dế Mèn ở Tắt đèn"})
+    assert {b.book_id for b in service.search_books("de men")} == {"B1", "B2"}
+    assert service.query_cache_stats()["hits"] == 2
+
+
+def test_short_prefix_keeps_most_frequent_expansions():
+    index = InvertedIndex({"title": 1})
+    index.build([(f"R{i}", {"title": f"ta{i:04d}"}) for i in range(PREFIX_EXPANSION_LIMIT + 200)] +
+                [(f"P{i}", {"title": "tazz"}) for i in range(3)] + [("T", {"title": "ta"})])
+
+    terms = index.expand_prefix("ta")
+    assert len(terms) == PREFIX_EXPANSION_LIMIT
+    assert terms[:2] == ["ta", "tazz"]  # "tazz" đứng cuối theo chữ cái nhưng nhiều tài liệu nhất
+    assert {"P0", "P1", "P2", "T"} <= {doc for doc, _ in index.search("ta")}
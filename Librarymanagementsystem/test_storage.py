@@ -0,0 +1,290 @@
+import json
+import os
+import pickle
+
+import pytest
+
+import repositories
+from models.book import Book
+from models.book_catalog import BookCatalog
+from repositories import get_repository, SqliteRepository
+from repositories.migrate import migrate_json_to_sqlite
+from services.user_service import UserService
+from utils.file_cache import file_cache
+from utils.file_handler_fix import load_json, save_json
+from utils.group_commit import atomic_write_text
+from utils.journal import get_journal
+from utils.snapshot import load_snapshot, save_snapshot
+from utils.storage import io_stats, read_many, write_many
+from utils.json_stream import iter_json_file, iter_records
+
+
+def test_journal_append_replay_and_compact(paths, seed):
+    path = paths["books"]
+    seed(books=[{"book_id": "B1", "available_quantity": 3}])
+
+    journal = get_journal(path)
+    journal.append("update", "book_id", "B1", {"available_quantity": 2})
+    journal.append("insert", "book_id", "B2", {"book_id": "B2", "available_quantity": 1})
+
+    # File gốc chưa bị ghi lại, nhưng load_json thấy thay đổi
+    with open(path, encoding="utf-8") as f:
+        assert json.load(f) == [{"book_id": "B1", "available_quantity": 3}]
+    assert load_json(path) == [
+        {"book_id": "B1", "available_quantity": 2},
+        {"book_id": "B2", "available_quantity": 1},
+    ]
+
+    journal.compact(background=False)
+    assert not journal.has_pending()
+    with open(path, encoding="utf-8") as f:
+        assert len(json.load(f)) == 2
+
+
+def test_save_json_discards_old_journal(paths, seed):
+    path = paths["borrows"]
+    seed(borrows=[])
+    get_journal(path).append("insert", "borrow_id", "X", {"borrow_id": "X"})
+
+    seed(borrows=[{"borrow_id": "Y"}])
+    assert not os.path.exists(path + ".journal")
+    assert load_json(path) == [{"borrow_id": "Y"}]
+
+
+def test_load_json_cache_hits_and_invalidation(paths, seed):
+    path = paths["users"]
+    seed(users=[{"user_id": 1}])
+
+    before = file_cache.stats()
+    first = load_json(path)
+    first[0]["user_id"] = 99  # sửa bản sao không làm hỏng cache
+    assert load_json(path) == [{"user_id": 1}]
+    stats = file_cache.stats()
+    assert stats["misses"] == before["misses"] + 1
+    assert stats["hits"] == before["hits"] + 1
+
+    seed(users=[{"user_id": 2}])
+    assert load_json(path) == [{"user_id": 2}]
+
+
+def test_same_size_rewrite_within_one_mtime_tick_is_detected(paths):
+    path = paths["books"]
+    atomic_write_text(path, '[{"available_quantity": 5}]')
+    assert load_json(path) == [{"available_quantity": 5}]
+    stat = os.stat(path)
+
+    # Process khác ghi lại cùng kích thước, mtime thô -> trùng mtime
+    atomic_write_text(path, '[{"available_quantity": 4}]')
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert os.stat(path).st_size == stat.st_size
+    assert load_json(path) == [{"available_quantity": 4}]
+
+
+@pytest.mark.parametrize("backend", ["json", "sqlite"])
+def test_borrow_and_return_on_both_backends(tmp_path, monkeypatch, paths, borrow_service, backend):
+    monkeypatch.setattr(repositories, "STORAGE_BACKEND", backend)
+    monkeypatch.setattr(repositories, "SQLITE_DB_FILE", str(tmp_path / "library.db"))
+
+    get_repository("users", paths["users"]).replace_all(
+        [{"user_id": 1, "username": "member", "status": "ACTIVE", "borrowing_limit": 1}]
+    )
+    get_repository("books", paths["books"]).replace_all(
+        [{"book_id": "B1", "available_quantity": 1}, {"book_id": "B2", "available_quantity": 1}]
+    )
+
+    service = borrow_service()
+    result = service.borrow_book(1, "B1")
+    assert result["success"]
+    assert not service.borrow_book(1, "B2")["success"]  # vượt giới hạn 1 cuốn
+    assert service.books.get("B1")["available_quantity"] == 0
+
+    assert service.return_book(result["borrow_id"])["success"]
+    assert service.books.get("B1")["available_quantity"] == 1
+    assert service.get_user_borrows(1)[0]["status"] == "RETURNED"
+
+
+def test_sqlite_writes_commit_and_roll_back_with_the_batch(tmp_path):
+    db_path = str(tmp_path / "library.db")
+    books = SqliteRepository("books", "book_id", ["status"], db_path)
+    borrows = SqliteRepository("borrow_orders", "borrow_id", ["user_id", "status"], db_path)
+    books.insert({"book_id": "B1", "status": "AVAILABLE"})
+    seen = []
+    books.subscribe(seen.extend)
+
+    with pytest.raises(RuntimeError):
+        with repositories.transactions(books, borrows):
+            books.insert({"book_id": "B2", "status": "AVAILABLE"})
+            books.delete("B1")
+            borrows.insert({"borrow_id": "O1", "user_id": 1, "status": "BORROWED"})
+            raise RuntimeError("lỗi giữa transaction")
+    assert [b["book_id"] for b in books.all()] == ["B1"] and borrows.all() == []
+    assert seen == []  # listener không nhận thay đổi đã ROLLBACK
+
+    assert books.delete("B1") and not books.delete("B1")
+    borrows.insert({"borrow_id": "O1"})
+    with pytest.raises(ValueError):
+        borrows.insert({"borrow_id": "O1"})
+    assert seen == [("delete", "B1", None)] and borrows.count() == 1
+
+
+def test_migrate_json_to_sqlite(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("data")
+    save_json("data/user.json", [{"user_id": 1, "username": "admin", "status": "ACTIVE"}])
+    save_json("data/categories.json", {"categories": []})
+
+    report = migrate_json_to_sqlite("data/library.db")
+    assert report["users"]["imported"] == 1
+
+    users = SqliteRepository("users", "user_id", ["username", "email", "status"], "data/library.db")
+    assert users.find_one(username="admin")["user_id"] == 1
+
+
+def test_stream_json_array_and_lines_with_journal(tmp_path):
+    records = [{"borrow_id": f"BO{i}", "due_date": "2024-01-01T00:00:00", "note": "x" * i}
+               for i in range(50)]
+    array_path = str(tmp_path / "array.json")
+    save_json(array_path, records)
+    # chunk nhỏ để bản ghi bị cắt ngang giữa các lần đọc
+    assert list(iter_json_file(array_path, chunk_size=7)) == records
+
+    lines_path = str(tmp_path / "lines.jsonl")
+    with open(lines_path, "w", encoding="utf-8") as f:
+        f.writelines(json.dumps(r) + "\n" for r in records)
+    assert list(iter_json_file(lines_path)) == records
+
+    journal = get_journal(array_path)
+    journal.append("update", "borrow_id", "BO1", {"status": "RETURNED"})
+    journal.append("delete", "borrow_id", "BO2")
+    journal.append("insert", "borrow_id", "BO99", {"borrow_id": "BO99"})
+    assert list(iter_records(array_path, chunk_size=7)) == load_json(array_path)
+
+
+def test_snapshot_used_only_while_sources_unchanged(tmp_path, paths, seed):
+    source = paths["books"]
+    snapshot = str(tmp_path / "library.snapshot")
+    seed(books=[{"book_id": "B1"}])
+
+    assert save_snapshot(snapshot, {"books": ["B1"]}, [source])
+    assert load_snapshot(snapshot, [source]) == {"books": ["B1"]}
+
+    seed(books=[{"book_id": "B1"}, {"book_id": "B2"}])
+    assert load_snapshot(snapshot, [source]) is None
+
+
+def test_read_many_write_many_are_instrumented(paths):
+    books, users = paths["books"], paths["users"]
+
+    with io_stats.measure("save") as m:
+        assert write_many({books: [{"book_id": "B1"}], users: [{"user_id": 1}]})
+    summary = m.summary()
+    assert summary["calls"] == 2
+    assert summary["bytes_written"] == os.path.getsize(books) + os.path.getsize(users)
+
+    with io_stats.measure("load") as m:
+        data = read_many([books, users])
+        read_many([books, users])
+    assert data == {books: [{"book_id": "B1"}], users: [{"user_id": 1}]}
+    assert m.summary()["bytes_read"] == os.path.getsize(books) + os.path.getsize(users)
+    assert [c["cache_hit"] for c in m.calls] == [False, False, True, True]
+
+
+def test_json_repository_indexes_follow_writes(paths):
+    users = get_repository("users", paths["users"])
+    users.replace_all([
+        {"user_id": 1, "username": "an", "email": "an@x.vn", "status": "ACTIVE"},
+        {"user_id": 2, "username": "binh", "email": "binh@x.vn", "status": "ACTIVE"},
+    ])
+    users.insert({"user_id": 3, "username": "chi", "email": "chi@x.vn", "status": "ACTIVE"})
+    users.update(1, {"username": "an2", "status": "SUSPENDED"})
+    users.delete(2)
+
+    assert users.find_one(username="an") is None
+    assert users.find_one(username="an2")["user_id"] == 1
+    assert users.get(2) is None and users.find_one(email="binh@x.vn") is None
+    assert [u["user_id"] for u in users.find(status="ACTIVE")] == [3]
+    assert users.count(status="SUSPENDED") == 1
+    with pytest.raises(ValueError):
+        users.insert({"user_id": 3, "username": "dup"})
+
+
+def test_rollback_restores_rows_while_earlier_write_is_in_flight(monkeypatch, paths):
+    books = get_repository("books", paths["books"])
+    books.replace_all([
+        {"book_id": "B1", "status": "AVAILABLE", "available_quantity": 2},
+        {"book_id": "B2", "status": "AVAILABLE", "available_quantity": 1},
+    ])
+    before = books.all()
+    # Lần ghi trước chưa xong: file trên đĩa cũ hơn RAM, không nạp lại được
+    monkeypatch.setattr(books, "_inflight", 1)
+
+    with pytest.raises(RuntimeError):
+        with books.transaction():
+            books.update("B1", {"available_quantity": 0})
+            books.delete("B2")
+            books.insert({"book_id": "B3", "status": "LOST"})
+            raise RuntimeError("lỗi giữa transaction")
+    assert books.all() == before
+    assert books.get("B3") is None and books.find_one(status="LOST") is None
+
+    with pytest.raises(RuntimeError):
+        with books.transaction():
+            books.replace_all([])
+            books.insert({"book_id": "B9"})
+            raise RuntimeError("lỗi giữa transaction")
+    assert books.all() == before
+    books.insert({"book_id": "B3"})
+    assert [b["book_id"] for b in books.all()] == ["B1", "B2", "B3"]
+
+
+def test_book_catalog_views_write_through_columns():
+    records = [
+        {"book_id": 1, "title": "A", "quantity": 2, "available_quantity": 1, "category_id": 3},
+        {"book_id": "BK2", "title": "B", "author": {"author_id": 7, "author_name": "X"}},
+    ]
+    catalog = BookCatalog.from_dicts(records)
+    assert catalog.to_dicts() == [Book.from_dict(r).to_dict() for r in records]
+
+    book = catalog.get(1)
+    book.decreaseAvailable()
+    assert catalog.get(1).available_quantity == 0 and catalog.get(1).status == "UNAVAILABLE"
+    assert catalog.get("BK2").author.getAuthorName() == "X"
+
+    restored = pickle.loads(pickle.dumps(catalog, protocol=5))
+    assert restored.to_dicts() == catalog.to_dicts()
+
+    # title/description nằm chung 1 buffer UTF-8: sửa nhiều lần -> buffer được dọn
+    titles = catalog.text["title"]
+    for i in range(20):
+        catalog.get("BK2").title = f"Tiêu đề {i}"
+    catalog.get(1).description = None
+    assert titles.garbage * 2 <= len(titles.buffer) < 3 * len("ATiêu đề 19".encode("utf-8"))
+    assert (catalog.get("BK2").title, catalog.get(1).description) == ("Tiêu đề 19", None)
+
+    catalog.append(Book.from_dict({"book_id": 3, "title": "C"}))
+    assert catalog.remove(book)
+    assert catalog.get(1) is None
+    assert [b.book_id for b in catalog] == ["BK2", 3]
+
+
+def test_journal_mode_is_fixed_when_repository_is_created(paths):
+    books = get_repository("books", paths["books"], use_journal=True)
+    assert books.use_journal
+    assert get_repository("books", paths["books"]) is books
+    assert get_repository("books", paths["books"], use_journal=True) is books
+    with pytest.raises(ValueError):
+        get_repository("books", paths["books"], use_journal=False)
+    assert books.use_journal
+
+
+def test_register_never_reuses_user_ids_after_deletion(paths, seed):
+    seed(users=[])
+    service = UserService(paths["users"])
+    register = lambda name: service.register(
+        {"username": name, "email": f"{name}@x.vn", "password": "12345678"}
+    )["user_id"]
+
+    assert [register("anh"), register("binh"), register("chi")] == [1, 2, 3]
+    service.users.delete(1)
+    assert register("dung") == 4  # count()+1 sẽ ra 3 -> trùng "chi"
+    assert service.users.get(3)["username"] == "chi"
@@ -1,6 +1,16 @@
 import tkinter as tk
 from tkinter import ttk
 
+from services.book_service import BookService
+
+# Cùng file sách mà AdminService thêm/sửa/xóa (dữ liệu đi kèm app)
+BOOK_FILE = "data/book.json"
+
+SUGGESTION_LIMIT = 8
+SUGGEST_MIN_CHARS = 2    # gõ ít hơn thì không gợi ý (tiền tố quá ngắn khớp quá nhiều)
+SUGGEST_DELAY_MS = 200   # chỉ gợi ý khi ngừng gõ chừng này (không gọi mỗi phím)
+PAGE_SIZE = 50
+
 
 class BookUI(tk.Frame):
     def __init__(self, parent, app):
@@ -17,6 +27,24 @@ class BookUI(tk.Frame):
 
         tk.Label(self, text="QUẢN LÝ SÁCH", font=("Arial", 22, "bold")).pack(pady=10)
 
+        # ===== Ô TÌM KIẾM + GỢI Ý KHI GÕ =====
+        self.book_service = None
+        self._suggest_job = None
+        frame_search = tk.Frame(self)
+        frame_search.pack(fill="x", padx=20)
+
+        self.search_var = tk.StringVar()
+        self.search_entry = tk.Entry(frame_search, textvariable=self.search_var, width=60)
+        self.search_entry.pack(side="left", padx=(0, 5))
+        self.search_entry.bind("<KeyRelease>", self.on_search_typed)
+        self.search_entry.bind("<Return>", lambda e: self.search())
+        self.search_entry.bind("<Down>", self.focus_suggestions)
+        tk.Button(frame_search, text="Tìm", width=10, command=self.search).pack(side="left")
+
+        self.suggestions = tk.Listbox(self, height=SUGGESTION_LIMIT)
+        self.suggestions.bind("<<ListboxSelect>>", self.on_suggestion_selected)
+        self.suggestions.bind("<Return>", self.on_suggestion_selected)
+
         # ===== DANH SÁCH SÁCH (DEMO - 5 CUỐN VIỆT NAM) =====
         self.demo_books = [
             ("VN001", "Dế Mèn Phiêu Lưu Ký", "Tô Hoài", 10),
@@ -52,6 +80,67 @@ class BookUI(tk.Frame):
         # ===== NÚT REFRESH =====
         tk.Button(self, text="Refresh danh sách (Demo)", width=25, command=self.load_demo_books).pack(pady=10)
 
+    def get_book_service(self):
+        if self.book_service is None:
+            self.book_service = BookService(book_path=BOOK_FILE)
+        return self.book_service
+
+    # ===== Tìm kiếm =====
+    def on_search_typed(self, event):
+        if event.keysym in ("Return", "Down", "Up", "Escape"):
+            if event.keysym == "Escape":
+                self.hide_suggestions()
+            return
+        self.cancel_suggest()
+        if len(self.search_var.get().strip()) < SUGGEST_MIN_CHARS:
+            self.hide_suggestions()
+            return
+        self._suggest_job = self.after(SUGGEST_DELAY_MS, self.show_suggestions)
+
+    def cancel_suggest(self):
+        if self._suggest_job is not None:
+            self.after_cancel(self._suggest_job)
+            self._suggest_job = None
+
+    def show_suggestions(self):
+        self._suggest_job = None
+        suggestions = self.get_book_service().suggest(self.search_var.get(), SUGGESTION_LIMIT)
+        if not suggestions:
+            self.hide_suggestions()
+            return
+        self.suggestions.delete(0, tk.END)
+        for text in suggestions:
+            self.suggestions.insert(tk.END, text)
+        self.suggestions.place(
+            in_=self.search_entry, x=0, rely=1.0, relwidth=1.0
+        )
+        self.suggestions.lift()
+
+    def focus_suggestions(self, event=None):
+        if self.suggestions.winfo_ismapped():
+            self.suggestions.focus_set()
+            self.suggestions.selection_set(0)
+
+    def on_suggestion_selected(self, event=None):
+        selection = self.suggestions.curselection()
+        if selection:
+            self.search_var.set(self.suggestions.get(selection[0]))
+            self.search()
+
+    def hide_suggestions(self):
+        self.suggestions.place_forget()
+
+    def search(self):
+        self.cancel_suggest()
+        self.hide_suggestions()
+        books, _ = self.get_book_service().search_books_page(self.search_var.get(), limit=PAGE_SIZE)
+
+        for i in self.tree.get_children():
+            self.tree.delete(i)
+        for book in books:
+            author = book.author.getAuthorName() if book.author else ""
+            self.tree.insert("", tk.END, values=(book.book_id, book.title, author, book.available_quantity))
+
     def load_demo_books(self):
         # Xóa dữ liệu cũ trong bảng
         for i in self.tree.get_children():
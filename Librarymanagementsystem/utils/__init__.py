@@ -6,5 +6,6 @@ from .helpers import (
     get_current_datetime, 
     get_current_date, 
     format_currency, 
-    parse_date_str
+    parse_date_str,
+    to_epoch
 )
\ No newline at end of file
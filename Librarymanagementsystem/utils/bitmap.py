@@ -0,0 +1,189 @@
+"""
+bitmap.py
+Tập số nguyên không âm (số thứ tự dòng) dạng bitmap chia khối kiểu roaring:
+số x nằm ở khối x >> 16, bit thứ x & 0xFFFF của khối đó.
+
+- Trong RAM mỗi khối là 1 số int Python dùng như dãy bit: AND/OR/ANDNOT
+  giữa 2 khối là phép toán trên int (chạy trong C), khối rỗng không lưu
+- Thêm/xóa 1 phần tử chỉ tạo lại đúng 1 khối (tối đa 8 KB)
+- Ghi xuống đĩa (to_bytes): khối ít phần tử (<= 4096) lưu dạng mảng
+  uint16 đã sắp xếp, khối dày lưu nguyên 8 KB bit như roaring
+"""
+
+import struct
+import sys
+from array import array
+
+CHUNK_BITS = 16
+CHUNK_SIZE = 1 << CHUNK_BITS
+LOW_MASK = CHUNK_SIZE - 1
+ARRAY_CONTAINER_MAX = 4096          # > 4096 phần tử -> khối bitmap 8 KB rẻ hơn
+BITMAP_CONTAINER_BYTES = CHUNK_SIZE // 8
+
+_HEADER = struct.Struct("<4sI")     # magic, số khối
+_CHUNK = struct.Struct("<IBI")      # khóa khối, loại (0 = mảng, 1 = bitmap), số phần tử
+_MAGIC = b"RBM1"
+
+# Vị trí các bit 1 trong 1 byte (duyệt bitmap theo byte thay vì theo bit)
+_BYTE_BITS = [tuple(i for i in range(8) if b >> i & 1) for b in range(256)]
+
+
+class Bitmap:
+    __slots__ = ("chunks",)
+
+    def __init__(self, values=()):
+        self.chunks = {}  # khóa khối -> int (bit i = phần tử (khóa << 16) | i)
+        if values:
+            self.update(values)
+
+    @classmethod
+    def _from_chunks(cls, chunks: dict) -> "Bitmap":
+        bitmap = cls()
+        bitmap.chunks = {k: v for k, v in chunks.items() if v}
+        return bitmap
+
+    @classmethod
+    def full(cls, size: int) -> "Bitmap":
+        """Tập {0, 1, ..., size - 1}"""
+        chunks = {}
+        for key in range((size + CHUNK_SIZE - 1) >> CHUNK_BITS):
+            count = min(CHUNK_SIZE, size - (key << CHUNK_BITS))
+            chunks[key] = (1 << count) - 1
+        return cls._from_chunks(chunks)
+
+    # ===== Cập nhật =====
+
+    def add(self, x: int) -> None:
+        key = x >> CHUNK_BITS
+        self.chunks[key] = self.chunks.get(key, 0) | (1 << (x & LOW_MASK))
+
+    def discard(self, x: int) -> None:
+        key = x >> CHUNK_BITS
+        chunk = self.chunks.get(key)
+        if chunk is None:
+            return
+        chunk &= ~(1 << (x & LOW_MASK))
+        if chunk:
+            self.chunks[key] = chunk
+        else:
+            del self.chunks[key]
+
+    def update(self, values) -> None:
+        """Thêm nhiều phần tử: gom theo khối, dựng mỗi khối 1 lần"""
+        grouped = {}
+        for x in values:
+            grouped.setdefault(x >> CHUNK_BITS, bytearray(BITMAP_CONTAINER_BYTES))
+            low = x & LOW_MASK
+            grouped[x >> CHUNK_BITS][low >> 3] |= 1 << (low & 7)
+        for key, bits in grouped.items():
+            self.chunks[key] = self.chunks.get(key, 0) | int.from_bytes(bits, "little")
+
+    # ===== Truy vấn =====
+
+    def __contains__(self, x: int) -> bool:
+        return bool(self.chunks.get(x >> CHUNK_BITS, 0) >> (x & LOW_MASK) & 1)
+
+    def __len__(self) -> int:
+        return sum(chunk.bit_count() for chunk in self.chunks.values())
+
+    def __bool__(self) -> bool:
+        return bool(self.chunks)
+
+    def __iter__(self):
+        """Các phần tử tăng dần"""
+        for key in sorted(self.chunks):
+            base = key << CHUNK_BITS
+            data = self.chunks[key].to_bytes(BITMAP_CONTAINER_BYTES, "little")
+            for i, byte in enumerate(data):
+                if byte:
+                    offset = base + (i << 3)
+                    for bit in _BYTE_BITS[byte]:
+                        yield offset + bit
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Bitmap) and self.chunks == other.chunks
+
+    def __repr__(self) -> str:
+        return f"Bitmap({len(self)} phần tử)"
+
+    def copy(self) -> "Bitmap":
+        return Bitmap._from_chunks(self.chunks)
+
+    # ===== Phép toán tập hợp =====
+
+    def __and__(self, other: "Bitmap") -> "Bitmap":
+        small, large = sorted((self.chunks, other.chunks), key=len)
+        return Bitmap._from_chunks({k: v & large[k] for k, v in small.items() if k in large})
+
+    def __or__(self, other: "Bitmap") -> "Bitmap":
+        chunks = dict(self.chunks)
+        for key, chunk in other.chunks.items():
+            chunks[key] = chunks.get(key, 0) | chunk
+        return Bitmap._from_chunks(chunks)
+
+    def __sub__(self, other: "Bitmap") -> "Bitmap":
+        """self AND NOT other"""
+        return Bitmap._from_chunks({
+            k: v & ~other.chunks[k] if k in other.chunks else v
+            for k, v in self.chunks.items()
+        })
+
+    def invert(self, universe: "Bitmap") -> "Bitmap":
+        """NOT trong phạm vi universe (tập tất cả phần tử hợp lệ)"""
+        return universe - self
+
+    @staticmethod
+    def union(bitmaps) -> "Bitmap":
+        chunks = {}
+        for bitmap in bitmaps:
+            for key, chunk in bitmap.chunks.items():
+                chunks[key] = chunks.get(key, 0) | chunk
+        return Bitmap._from_chunks(chunks)
+
+    # ===== Ghi / đọc =====
+
+    def to_bytes(self) -> bytes:
+        parts = [_HEADER.pack(_MAGIC, len(self.chunks))]
+        for key in sorted(self.chunks):
+            chunk = self.chunks[key]
+            count = chunk.bit_count()
+            if count <= ARRAY_CONTAINER_MAX:
+                base = key << CHUNK_BITS
+                lows = array("H", (x - base for x in Bitmap._from_chunks({key: chunk})))
+                if sys.byteorder != "little":
+                    lows.byteswap()
+                parts.append(_CHUNK.pack(key, 0, count))
+                parts.append(lows.tobytes())
+            else:
+                parts.append(_CHUNK.pack(key, 1, count))
+                parts.append(chunk.to_bytes(BITMAP_CONTAINER_BYTES, "little"))
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data) -> "Bitmap":
+        data = memoryview(data)
+        magic, n_chunks = _HEADER.unpack_from(data, 0)
+        if magic != _MAGIC:
+            raise ValueError("Dữ liệu bitmap không hợp lệ")
+        pos = _HEADER.size
+        chunks = {}
+        for _ in range(n_chunks):
+            key, kind, count = _CHUNK.unpack_from(data, pos)
+            pos += _CHUNK.size
+            if kind == 0:
+                lows = array("H")
+                lows.frombytes(data[pos:pos + 2 * count])
+                if sys.byteorder != "little":
+                    lows.byteswap()
+                pos += 2 * count
+                bits = bytearray(BITMAP_CONTAINER_BYTES)
+                for low in lows:
+                    bits[low >> 3] |= 1 << (low & 7)
+                chunks[key] = int.from_bytes(bits, "little")
+            else:
+                chunks[key] = int.from_bytes(data[pos:pos + BITMAP_CONTAINER_BYTES], "little")
+                pos += BITMAP_CONTAINER_BYTES
+        return cls._from_chunks(chunks)
+
+    def __reduce__(self):
+        return Bitmap.from_bytes, (self.to_bytes(),)
@@ -0,0 +1,130 @@
+"""
+file_cache.py
+Cache dùng chung (trong process) cho dữ liệu JSON đã parse.
+
+- Khóa: đường dẫn file + chữ ký (mtime, size) của file gốc và journal
+- Nếu file không đổi -> trả lại dữ liệu đã parse, không đọc/parse lại
+- Loại bỏ theo LRU khi tổng dung lượng vượt giới hạn (tính theo byte file)
+- utils/storage.write_json gọi invalidate() sau khi ghi
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+from config import FILE_CACHE_MAX_BYTES
+from utils.journal import JOURNAL_SUFFIX, COMPACTING_SUFFIX
+
+
+def file_signature(file_path: str):
+    """
+    Chữ ký của file: (mtime_ns, size, inode) của file gốc, journal và journal
+    đang compact. inode đổi mỗi lần ghi nguyên tử (os.replace), nên file bị ghi
+    lại cùng kích thước trong cùng 1 tick mtime (filesystem có mtime thô) vẫn
+    được nhận ra. File không tồn tại -> None ở vị trí tương ứng.
+    """
+    signature = []
+    for path in (file_path, file_path + JOURNAL_SUFFIX, file_path + COMPACTING_SUFFIX):
+        try:
+            st = os.stat(path)
+            signature.append((st.st_mtime_ns, st.st_size, st.st_ino))
+        except OSError:
+            signature.append(None)
+    return tuple(signature)
+
+
+def _signature_bytes(signature) -> int:
+    return sum(part[1] for part in signature if part is not None)
+
+
+def copy_records(data):
+    """
+    Sao chép nông từng bản ghi để bên gọi sửa dict mà không làm hỏng cache.
+    Rẻ hơn nhiều so với parse lại JSON hay deepcopy.
+    """
+    if isinstance(data, list):
+        return [dict(item) if isinstance(item, dict) else item for item in data]
+    if isinstance(data, dict):
+        return dict(data)
+    return data
+
+
+class ParsedFileCache:
+    """
+    LRU cache theo dung lượng cho dữ liệu JSON đã parse.
+    """
+
+    def __init__(self, max_bytes: int = FILE_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # abspath -> (signature, data, size)
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, file_path: str, loader):
+        """
+        Trả về bản sao dữ liệu của file_path.
+        loader(file_path) chỉ được gọi khi cache chưa có hoặc file đã đổi.
+        """
+        key = os.path.abspath(file_path)
+        signature = file_signature(file_path)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == signature:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return copy_records(entry[1])
+            self.misses += 1
+
+        data = loader(file_path)
+        self._store(key, signature, data)
+        return copy_records(data)
+
+    def _store(self, key, signature, data) -> None:
+        size = _signature_bytes(signature)
+        with self._lock:
+            self._discard(key)
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (signature, data, size)
+            self.total_bytes += size
+            while self.total_bytes > self.max_bytes and self._entries:
+                oldest = next(iter(self._entries))
+                self._discard(oldest)
+                self.evictions += 1
+
+    def _discard(self, key) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.total_bytes -= entry[2]
+
+    def invalidate(self, file_path: str) -> None:
+        """Xóa 1 file khỏi cache (gọi sau khi ghi file)"""
+        with self._lock:
+            self._discard(os.path.abspath(file_path))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+    def stats(self) -> dict:
+        """Số liệu để kiểm tra cache có hoạt động hay không"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+# Cache dùng chung cho toàn bộ process
+file_cache = ParsedFileCache()
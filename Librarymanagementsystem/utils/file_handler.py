@@ -1,25 +1,15 @@
-import json
-import os
+from utils import storage
 
 class FileHandler:
+    """Giữ giao diện cũ cho controller; toàn bộ I/O nằm ở utils/storage.py"""
+
     @staticmethod
     def read_json(file_path):
         """
         Đọc file JSON và trả về dữ liệu (List/Dict).
         Nếu file không tồn tại hoặc lỗi, trả về danh sách rỗng [].
         """
-        if not os.path.exists(file_path):
-            return []
-        
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read().strip()
-                if not content: 
-                    return []
-                return json.loads(content)
-        except (json.JSONDecodeError, IOError) as e:
-            print(f"[Error] Lỗi đọc file {file_path}: {e}")
-            return []
+        return storage.read_json(file_path)
 
     @staticmethod
     def write_json(file_path, data):
@@ -27,14 +17,17 @@ class FileHandler:
         Ghi dữ liệu xuống file JSON.
         Tự động tạo thư mục nếu chưa có.
         """
-        try:
-            directory = os.path.dirname(file_path)
-            if directory and not os.path.exists(directory):
-                os.makedirs(directory)
+        return storage.write_json(file_path, data)
+
+    @staticmethod
+    def read_many(file_paths):
+        return storage.read_many(file_paths)
+
+    @staticmethod
+    def write_many(items):
+        return storage.write_many(items)
+
 
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=4, ensure_ascii=False)
-            return True
-        except IOError as e:
-            print(f"[Error] Lỗi ghi file {file_path}: {e}")
-            return False
\ No newline at end of file
+# Cho code cũ import dạng `from utils.file_handler import read_json, write_json`
+read_json = storage.read_json
+write_json = storage.write_json
@@ -1,25 +1,6 @@
 # utils/file_handler_fix.py
-import json
-import os
+# Giữ tên hàm cũ cho code đang dùng; toàn bộ I/O nằm ở utils/storage.py
+from utils.storage import read_json, write_json, read_many, write_many
 
-def load_json(file_path):
-    """Đọc file JSON"""
-    if not os.path.exists(file_path):
-        return []
-    
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read().strip()
-            return json.loads(content) if content else []
-    except:
-        return []
-
-def save_json(file_path, data):
-    """Ghi file JSON"""
-    try:
-        os.makedirs(os.path.dirname(file_path), exist_ok=True)
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=4, ensure_ascii=False)
-        return True
-    except:
-        return False
\ No newline at end of file
+load_json = read_json
+save_json = write_json
@@ -0,0 +1,117 @@
+"""
+file_lock.py
+Khóa file dùng chung giữa các thread và giữa các process
+(vd: app Tkinter và script admin chạy cùng lúc trên cùng thư mục data/).
+
+- Giữa các thread: threading.RLock theo từng file
+- Giữa các process: fcntl.flock (advisory) trên file `<file>.lock`
+  Không có fcntl (Windows) -> chỉ khóa trong process.
+
+Khóa liên process được đếm tham chiếu: ngoài thread đang đọc-sửa-ghi,
+các lần ghi đang chờ trong group commit cũng giữ khóa, nên process khác
+chỉ lấy được khóa khi dữ liệu đã nằm trên đĩa.
+"""
+
+import os
+import threading
+from contextlib import ExitStack, contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from config import FILE_LOCK_ENABLED
+
+_locks = {}
+_locks_lock = threading.Lock()
+
+
+class FileLock:
+    """
+    Dùng với `with`: loại trừ giữa các thread (reentrant trong cùng thread)
+    và giữ khóa liên process trong suốt khối with.
+    """
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.lock_path = file_path + ".lock"
+        self._mutex = threading.RLock()
+        self._local = threading.local()
+        self._refs_lock = threading.Lock()
+        self._refs = 0
+        self._fd = None
+
+    # ===== Khóa liên process (đếm tham chiếu) =====
+
+    def retain(self) -> None:
+        """Giữ khóa liên process; chặn tới khi process khác nhả khóa"""
+        with self._refs_lock:
+            if self._refs == 0 and FILE_LOCK_ENABLED and fcntl is not None:
+                directory = os.path.dirname(self.lock_path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+                except BaseException:
+                    os.close(fd)
+                    raise
+                self._fd = fd
+            self._refs += 1
+
+    def release(self) -> None:
+        with self._refs_lock:
+            self._refs -= 1
+            if self._refs == 0 and self._fd is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+                os.close(self._fd)
+                self._fd = None
+
+    # ===== Context manager =====
+
+    def __enter__(self):
+        self._mutex.acquire()
+        depth = getattr(self._local, "depth", 0)
+        if depth == 0:
+            try:
+                self.retain()
+            except BaseException:
+                self._mutex.release()
+                raise
+        self._local.depth = depth + 1
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._local.depth -= 1
+        if self._local.depth == 0:
+            self.release()
+        self._mutex.release()
+        return False
+
+
+def get_file_lock(file_path: str) -> FileLock:
+    """Lấy khóa dùng chung (trong process) cho 1 file"""
+    key = os.path.abspath(file_path)
+    with _locks_lock:
+        lock = _locks.get(key)
+        if lock is None:
+            lock = _locks[key] = FileLock(key)
+        return lock
+
+
+@contextmanager
+def locked(*file_paths):
+    """
+    Khóa nhiều file cho 1 chu trình đọc-sửa-ghi, theo thứ tự cố định
+    (sắp xếp theo đường dẫn) để 2 process không chờ nhau vòng tròn.
+
+        with locked(BOOKS_FILE):
+            books = read_json(BOOKS_FILE)
+            ...
+            write_json(BOOKS_FILE, books)
+    """
+    with ExitStack() as stack:
+        for path in sorted({os.path.abspath(p) for p in file_paths}):
+            stack.enter_context(get_file_lock(path))
+        yield
@@ -0,0 +1,192 @@
+"""
+group_commit.py
+Ghi file an toàn + gom nhiều lần ghi vào 1 lần fsync (group commit).
+
+- Ghi nguyên tử: ghi file tạm cùng thư mục, fsync, rồi os.replace()
+  -> người đọc không bao giờ thấy file ghi dở.
+- 1 thread ghi nền nhận yêu cầu từ mọi desk/thread. Các yêu cầu ghi cùng
+  1 file đến gần nhau được gộp: chỉ ghi bản mới nhất và fsync 1 lần,
+  tất cả bên gọi cùng được báo hoàn tất.
+- Yêu cầu không kèm nội dung = chỉ fsync (dùng cho journal ghi nối).
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+
+from config import GROUP_COMMIT_WINDOW
+from utils.file_cache import file_cache, file_signature
+from utils.file_lock import get_file_lock, locked
+from utils.journal import get_journal
+
+
+def atomic_write_text(file_path: str, text: str) -> None:
+    atomic_write_bytes(file_path, text.encode("utf-8"))
+
+
+def atomic_write_bytes(file_path: str, data: bytes) -> None:
+    """Ghi file tạm -> fsync -> đổi tên đè lên file cũ"""
+    directory = os.path.dirname(file_path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(
+        dir=directory, prefix=os.path.basename(file_path) + ".", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def fsync_file(file_path: str) -> None:
+    if os.path.exists(file_path):
+        with open(file_path, "rb") as f:
+            os.fsync(f.fileno())
+
+
+class CommitTicket:
+    """Biên nhận của 1 yêu cầu ghi; wait() trả về khi dữ liệu đã fsync"""
+
+    def __init__(self):
+        self._done = threading.Event()
+        self.error = None
+        self.signature = None
+
+    def wait(self, timeout: float = None) -> bool:
+        if not self._done.wait(timeout):
+            raise TimeoutError("Hết thời gian chờ ghi file")
+        if self.error is not None:
+            raise self.error
+        return True
+
+    def _finish(self, error, signature) -> None:
+        self.error = error
+        self.signature = signature
+        self._done.set()
+
+
+class _Job:
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.text = None        # None = chỉ fsync
+        self.tickets = []
+        self.callbacks = []
+
+
+class GroupCommitWriter:
+    def __init__(self, window: float = GROUP_COMMIT_WINDOW):
+        self.window = window
+        self._jobs = {}  # abspath -> _Job
+        self._cond = threading.Condition()
+        self._thread = None
+
+        # Số liệu: requests / batches / syncs càng chênh nhau càng gom được nhiều
+        self.requests = 0
+        self.batches = 0
+        self.syncs = 0
+
+    def submit(self, file_path: str, text: str = None, on_done=None) -> CommitTicket:
+        """
+        Gửi yêu cầu ghi (text) hoặc chỉ fsync (text=None).
+        on_done(error, signature) được gọi trong thread ghi sau khi xong.
+        """
+        ticket = CommitTicket()
+        with self._cond:
+            key = os.path.abspath(file_path)
+            job = self._jobs.get(key)
+            if job is None:
+                job = self._jobs[key] = _Job(file_path)
+            if text is not None:
+                job.text = text  # nội dung là ảnh chụp đầy đủ -> bản mới nhất thắng
+            job.tickets.append(ticket)
+            if on_done is not None:
+                job.callbacks.append(on_done)
+            self.requests += 1
+
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return ticket
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {"requests": self.requests, "batches": self.batches, "syncs": self.syncs}
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._jobs:
+                    self._cond.wait()
+            if self.window:
+                time.sleep(self.window)  # chờ thêm để gom các lần ghi đến sát nhau
+            with self._cond:
+                jobs = list(self._jobs.values())
+                self._jobs = {}
+                self.batches += 1
+            for job in jobs:
+                self._commit(job)
+
+    def _commit(self, job: _Job) -> None:
+        error = None
+        signature = None
+        try:
+            if job.text is not None:
+                journal = get_journal(job.file_path)
+                with journal.lock:
+                    atomic_write_text(job.file_path, job.text)
+                    # File đã chứa đầy đủ dữ liệu -> journal cũ không còn giá trị
+                    journal.discard()
+            else:
+                fsync_file(job.file_path)
+            signature = file_signature(job.file_path)
+        except Exception as e:
+            error = e
+        finally:
+            file_cache.invalidate(job.file_path)
+
+        with self._cond:
+            self.syncs += 1
+        for callback in job.callbacks:
+            try:
+                callback(error, signature)
+            except Exception as e:
+                print(f"[Error] Group commit callback {job.file_path}: {e}")
+        for ticket in job.tickets:
+            ticket._finish(error, signature)
+
+
+# Thread ghi dùng chung cho toàn bộ process
+group_commit = GroupCommitWriter()
+
+
+def commit_json(file_path: str, data) -> None:
+    """
+    Ghi file JSON: ghi nguyên tử, fsync theo nhóm, giữ khóa file tới khi xong.
+    Lỗi -> raise.
+    """
+    commit_many({file_path: json.dumps(data, indent=4, ensure_ascii=False)})
+
+
+def commit_many(texts: dict) -> None:
+    """
+    Ghi nhiều file cùng lúc ({đường dẫn: nội dung}): khóa theo thứ tự cố định,
+    gửi tất cả vào group commit rồi chờ 1 lần. Lỗi ở file nào -> raise.
+    """
+    tickets = []
+    with locked(*texts):
+        for file_path, text in texts.items():
+            lock = get_file_lock(file_path)
+            lock.retain()  # nhả khi thread ghi xong
+            tickets.append(group_commit.submit(
+                file_path, text, on_done=lambda error, sig, lock=lock: lock.release()
+            ))
+    for ticket in tickets:
+        ticket.wait()
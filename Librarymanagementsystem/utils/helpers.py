@@ -46,3 +46,21 @@ def format_currency(amount: int) -> str:
     Ví dụ: 1500000 -> "1,500,000"
     """
     return f"{amount:,}"
+
+
+def to_epoch(value) -> int:
+    """
+    Chuyển datetime / chuỗi ISO thành số giây epoch (dùng làm khóa so sánh).
+    Không hợp lệ -> None.
+    Ví dụ: "2026-01-23T14:20:30" -> 1769152830 (theo múi giờ máy)
+    """
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    if isinstance(value, date) and not isinstance(value, datetime):
+        value = datetime(value.year, value.month, value.day)
+    if not isinstance(value, datetime):
+        return None
+    return int(value.timestamp())
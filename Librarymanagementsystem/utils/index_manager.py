@@ -0,0 +1,98 @@
+"""
+index_manager.py
+Chỉ mục băm (dict) cho các trường tra cứu: book_id, user_id, username,
+email, borrow_id, author_id, ...
+
+Mỗi trường có 1 dict: giá trị -> {handle: item}
+- handle: định danh ổn định của phần tử (số thứ tự dòng, hoặc chính object)
+- item: bản ghi dict hoặc object model
+Tra cứu theo giá trị là O(1); thêm/xóa/sửa chỉ cập nhật đúng các bucket
+liên quan, không dựng lại toàn bộ chỉ mục.
+"""
+
+import json
+
+
+def dict_getter(item, field):
+    return item.get(field) if isinstance(item, dict) else None
+
+
+def attr_getter(item, field):
+    return getattr(item, field, None)
+
+
+def index_value(value):
+    """Giá trị dùng làm khóa dict (list/dict -> chuỗi JSON)"""
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        return json.dumps(value, sort_keys=True, ensure_ascii=False)
+
+
+class IndexManager:
+    def __init__(self, fields, getter=dict_getter):
+        self.fields = list(dict.fromkeys(fields))
+        self.getter = getter
+        self._indexes = {field: {} for field in self.fields}
+
+    def __contains__(self, field) -> bool:
+        return field in self._indexes
+
+    # ===== Dựng / cập nhật =====
+
+    def clear(self) -> None:
+        for index in self._indexes.values():
+            index.clear()
+
+    def build(self, items) -> None:
+        """Dựng lại từ đầu; items: các cặp (handle, item)"""
+        self.clear()
+        for handle, item in items:
+            self.add(handle, item)
+
+    def values_of(self, item) -> dict:
+        """Giá trị hiện tại của các trường có chỉ mục (lưu lại trước khi sửa item)"""
+        return {field: self.getter(item, field) for field in self.fields}
+
+    def add(self, handle, item) -> None:
+        for field, index in self._indexes.items():
+            value = index_value(self.getter(item, field))
+            bucket = index.get(value)
+            if bucket is None:
+                bucket = index[value] = {}
+            bucket[handle] = item
+
+    def remove(self, handle, item, values: dict = None) -> None:
+        values = values if values is not None else self.values_of(item)
+        for field, index in self._indexes.items():
+            self._discard(index, index_value(values[field]), handle)
+
+    def update(self, handle, item, old_values: dict) -> None:
+        """Gọi sau khi đã sửa item; chỉ chuyển bucket ở các trường bị đổi"""
+        for field, index in self._indexes.items():
+            old = index_value(old_values[field])
+            new = index_value(self.getter(item, field))
+            if old == new:
+                continue
+            self._discard(index, old, handle)
+            index.setdefault(new, {})[handle] = item
+
+    @staticmethod
+    def _discard(index: dict, value, handle) -> None:
+        bucket = index.get(value)
+        if bucket is not None:
+            bucket.pop(handle, None)
+            if not bucket:
+                del index[value]
+
+    # ===== Tra cứu =====
+
+    def lookup(self, field: str, value) -> dict:
+        """{handle: item} có field == value (không được sửa dict trả về)"""
+        return self._indexes[field].get(index_value(value), {})
+
+    def get(self, field: str, value):
+        """Phần tử đầu tiên có field == value, không có -> None"""
+        bucket = self.lookup(field, value)
+        return next(iter(bucket.values()), None)
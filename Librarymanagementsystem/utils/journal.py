@@ -0,0 +1,380 @@
+"""
+journal.py
+Nhật ký ghi trước (write-ahead journal) cho các file JSON dạng danh sách.
+
+Mỗi thay đổi (insert / update / delete) được ghi nối thành 1 dòng JSON vào
+file `<file>.journal` thay vì ghi lại toàn bộ file gốc. Khi đọc, file gốc
+(snapshot) được áp lại các dòng trong journal. Khi journal đủ dài, một luồng
+nền sẽ gộp (compact) journal vào snapshot.
+
+Các thao tác đều idempotent (insert = upsert theo khóa, update ghi đè giá trị
+tuyệt đối) nên áp lại một dòng nhiều lần vẫn cho cùng kết quả. Nhờ vậy quá
+trình compact có thể bị ngắt giữa chừng mà không mất dữ liệu.
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+
+from config import JOURNAL_COMPACT_THRESHOLD, JOURNAL_FSYNC
+from utils.file_lock import get_file_lock, locked
+
+JOURNAL_SUFFIX = ".journal"
+COMPACTING_SUFFIX = ".journal.compacting"
+BATCH_SUFFIX = ".batch"
+
+_journals = {}
+_journals_lock = threading.Lock()
+
+
+def get_journal(file_path: str) -> "Journal":
+    """
+    Lấy journal dùng chung (trong process) cho 1 file dữ liệu.
+    """
+    key = os.path.abspath(file_path)
+    with _journals_lock:
+        journal = _journals.get(key)
+        if journal is None:
+            journal = Journal(file_path)
+            _journals[key] = journal
+        return journal
+
+
+def apply_entries(data: list, entries) -> list:
+    """
+    Áp danh sách entry của journal lên dữ liệu dạng list[dict].
+    Trả về list mới (không giữ các bản ghi đã bị xóa).
+    """
+    positions = {}  # key_field -> {key: vị trí trong data}
+    deleted = set()
+
+    def index_for(key_field):
+        if key_field not in positions:
+            positions[key_field] = {
+                r.get(key_field): i for i, r in enumerate(data) if isinstance(r, dict)
+            }
+        return positions[key_field]
+
+    for entry in entries:
+        op = entry.get("op")
+        key_field = entry.get("key_field")
+        key = entry.get("key")
+        index = index_for(key_field)
+        pos = index.get(key)
+
+        if op == "insert":
+            if pos is None or pos in deleted:
+                data.append(dict(entry.get("data", {})))
+                index[key] = len(data) - 1
+            else:
+                data[pos] = dict(entry.get("data", {}))
+        elif op == "update":
+            if pos is not None and pos not in deleted:
+                data[pos].update(entry.get("data", {}))
+        elif op == "delete":
+            if pos is not None:
+                deleted.add(pos)
+                del index[key]
+
+    if deleted:
+        data = [r for i, r in enumerate(data) if i not in deleted]
+    return data
+
+
+def iter_replay(records, entries):
+    """
+    Phiên bản streaming của apply_entries: áp journal lên từng bản ghi
+    khi duyệt qua, không cần giữ toàn bộ dữ liệu trong bộ nhớ.
+    Chỉ giữ các entry của journal (vốn bị giới hạn bởi ngưỡng compact).
+    """
+    by_key = {}  # (key_field, key) -> [entry, ...]
+    for entry in entries:
+        by_key.setdefault((entry.get("key_field"), entry.get("key")), []).append(entry)
+    key_fields = {key_field for key_field, _ in by_key}
+
+    def apply(record, ops):
+        for entry in ops:
+            op = entry.get("op")
+            if op == "insert":
+                record = dict(entry.get("data", {}))
+            elif op == "update" and record is not None:
+                record.update(entry.get("data", {}))
+            elif op == "delete":
+                record = None
+        return record
+
+    seen = set()
+    for record in records:
+        for key_field in key_fields:
+            group = (key_field, record.get(key_field) if isinstance(record, dict) else None)
+            if group in by_key and group not in seen:
+                seen.add(group)
+                record = apply(record, by_key[group])
+                if record is None:
+                    break
+        if record is not None:
+            yield record
+
+    # Bản ghi mới chỉ có trong journal
+    for group, ops in by_key.items():
+        if group not in seen:
+            record = apply(None, ops)
+            if record is not None:
+                yield record
+
+
+def read_entries(journal_path: str) -> list:
+    """
+    Đọc các entry trong 1 file journal.
+    Dòng cuối bị ghi dở (process chết giữa chừng) sẽ được bỏ qua.
+    """
+    entries = []
+    if not os.path.exists(journal_path):
+        return entries
+
+    with open(journal_path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entries.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return entries
+
+
+def _stat(path: str):
+    try:
+        st = os.stat(path)
+        return st.st_mtime_ns, st.st_size
+    except OSError:
+        return None
+
+
+def replay_pending(file_path: str, data):
+    """
+    Áp các journal còn tồn đọng (nếu có) lên dữ liệu vừa đọc từ file gốc.
+    """
+    journal = get_journal(file_path)
+    if not isinstance(data, list) or not journal.has_pending():
+        return data
+    return journal.replay(data)
+
+
+class Journal:
+    """
+    Journal cho 1 file dữ liệu.
+
+    - append(): ghi nối 1 thay đổi (O(kích thước bản ghi))
+    - replay(): áp journal lên snapshot khi đọc
+    - compact(): gộp journal vào snapshot (chạy nền)
+    - discard(): bỏ journal sau khi file gốc được ghi lại toàn bộ
+    """
+
+    def __init__(self, file_path: str, compact_threshold: int = JOURNAL_COMPACT_THRESHOLD):
+        self.file_path = file_path
+        self.journal_path = file_path + JOURNAL_SUFFIX
+        self.compacting_path = file_path + COMPACTING_SUFFIX
+        self.compact_threshold = compact_threshold
+
+        # Khóa dùng chung cho mọi thao tác ghi lên file này trong process
+        self.lock = threading.RLock()
+        # Tăng mỗi khi file gốc bị ghi đè toàn bộ, để compact cũ tự hủy
+        self.generation = 0
+        self.pending = len(read_entries(self.journal_path))
+        self._compactor = None
+
+    # ===== Ghi =====
+
+    def append(self, op: str, key_field: str, key, data: dict = None, sync: bool = True) -> None:
+        """
+        Ghi nối 1 thay đổi vào journal.
+        op: "insert" | "update" | "delete"
+        sync=False: chưa fsync, bên gọi tự gọi sync() sau khi ghi đủ các thay đổi
+        """
+        entry = {"op": op, "key_field": key_field, "key": key, "data": data or {}}
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+
+        with self.lock:
+            directory = os.path.dirname(self.journal_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.journal_path, "a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+            self.pending += 1
+
+        if sync:
+            ticket = self.sync()
+            if ticket is not None:
+                ticket.wait()
+
+        if self.pending >= self.compact_threshold:
+            self.compact(background=True)
+
+    def sync(self):
+        """
+        Yêu cầu fsync journal qua group commit: nhiều thread ghi nối cùng lúc
+        chỉ tốn 1 lần fsync. Trả về CommitTicket (None nếu tắt JOURNAL_FSYNC).
+        """
+        if not JOURNAL_FSYNC:
+            return None
+        from utils.group_commit import group_commit
+        return group_commit.submit(self.journal_path)
+
+    def discard(self) -> None:
+        """
+        Bỏ toàn bộ journal. Gọi (khi đang giữ self.lock) ngay sau khi
+        file gốc được ghi lại đầy đủ, nếu không journal cũ sẽ bị áp lại.
+        """
+        with self.lock:
+            self.generation += 1
+            for path in (self.journal_path, self.compacting_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            self.pending = 0
+
+    # ===== Đọc =====
+
+    def has_pending(self) -> bool:
+        return os.path.exists(self.journal_path) or os.path.exists(self.compacting_path)
+
+    def replay(self, data: list) -> list:
+        """
+        Áp journal đang compact (nếu có) rồi tới journal hiện tại.
+        """
+        entries = read_entries(self.compacting_path) + read_entries(self.journal_path)
+        return apply_entries(data, entries)
+
+    # ===== Compact =====
+
+    def recover(self) -> None:
+        """
+        Gọi lúc khởi động: hoàn tất lần compact bị ngắt giữa chừng (nếu có).
+        """
+        if os.path.exists(self.compacting_path):
+            self.compact(background=False)
+
+    def compact(self, background: bool = True) -> None:
+        """
+        Gộp journal vào file gốc.
+        Luồng ghi chỉ bị chặn trong lúc đổi tên file, không phải lúc ghi snapshot.
+        """
+        with self.lock:
+            if self._compactor is not None and self._compactor.is_alive():
+                return
+            if background:
+                self._compactor = threading.Thread(target=self._compact, daemon=True)
+                self._compactor.start()
+                return
+        self._compact()
+
+    def _compact(self) -> None:
+        file_lock = get_file_lock(self.file_path)
+
+        # 1. Tách journal hiện tại ra để các lần append mới ghi vào file mới
+        with file_lock, self.lock:
+            if os.path.exists(self.journal_path):
+                if os.path.exists(self.compacting_path):
+                    # Lần compact trước chưa xong: nối phần mới vào phần cũ
+                    with open(self.journal_path, "r", encoding="utf-8") as src, \
+                            open(self.compacting_path, "a", encoding="utf-8") as dst:
+                        dst.write(src.read())
+                    os.remove(self.journal_path)
+                else:
+                    os.replace(self.journal_path, self.compacting_path)
+                self.pending = 0
+                with open(self.compacting_path, "rb") as f:
+                    os.fsync(f.fileno())
+            elif not os.path.exists(self.compacting_path):
+                return
+            generation = self.generation
+            base_stat = _stat(self.file_path)
+
+        # 2. Dựng snapshot mới ngoài khóa
+        data = []
+        if os.path.exists(self.file_path):
+            with open(self.file_path, "r", encoding="utf-8") as f:
+                content = f.read().strip()
+                data = json.loads(content) if content else []
+        data = apply_entries(data, read_entries(self.compacting_path))
+
+        tmp_path = self.file_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=4, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+
+        # 3. Thay file gốc (nguyên tử) nếu trong lúc đó không ai (kể cả
+        #    process khác) ghi đè toàn bộ file
+        with file_lock, self.lock:
+            if generation != self.generation or _stat(self.file_path) != base_stat:
+                os.remove(tmp_path)
+                return
+            os.replace(tmp_path, self.file_path)
+            if os.path.exists(self.compacting_path):
+                os.remove(self.compacting_path)
+
+
+# ===== Bản ghi gộp cho transaction nhiều file =====
+
+def write_batch(directory: str, files: dict) -> str:
+    """
+    Ghi (fsync) 1 bản ghi gộp mọi thay đổi của 1 transaction nhiều file:
+    {đường dẫn file: [entry journal, ...]}. Gọi TRƯỚC khi ghi các file;
+    khi mọi file đã xuống đĩa thì xóa bằng discard_batch().
+    Tên file bắt đầu bằng thời điểm ghi -> recover_batches áp đúng thứ tự.
+    """
+    directory = directory or "."
+    os.makedirs(directory, exist_ok=True)
+    batch_path = os.path.join(directory, f"{time.time_ns():020d}-{uuid.uuid4().hex[:8]}{BATCH_SUFFIX}")
+    tmp_path = batch_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"files": files}, f, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, batch_path)  # không bao giờ thấy bản ghi dở
+    return batch_path
+
+
+def discard_batch(batch_path: str) -> None:
+    if os.path.exists(batch_path):
+        os.remove(batch_path)
+
+
+def recover_batches(directory: str) -> int:
+    """
+    Gọi lúc khởi động: bản ghi gộp còn sót nghĩa là process bị tắt giữa lúc
+    ghi các file của 1 transaction (có thể file này đã ghi, file kia chưa).
+    Ghi nối lại toàn bộ thay đổi vào journal của từng file (idempotent:
+    insert = upsert bản ghi đầy đủ) rồi xóa bản ghi -> mọi file đều có đủ
+    thay đổi của lô. Trả về số bản ghi đã áp lại.
+    """
+    directory = directory or "."
+    try:
+        names = sorted(n for n in os.listdir(directory) if n.endswith(BATCH_SUFFIX))
+    except OSError:
+        return 0
+
+    for name in names:
+        batch_path = os.path.join(directory, name)
+        try:
+            with open(batch_path, encoding="utf-8") as f:
+                files = json.load(f)["files"]
+        except (OSError, ValueError, KeyError) as e:
+            print(f"[Warning] Bỏ qua bản ghi gộp hỏng {batch_path}: {e}")
+            continue
+        with locked(*files):
+            for file_path, entries in files.items():
+                journal = get_journal(file_path)
+                for entry in entries:
+                    journal.append(entry["op"], entry["key_field"], entry["key"],
+                                   entry.get("data"), sync=False)
+                ticket = journal.sync()
+                if ticket is not None:
+                    ticket.wait()
+            discard_batch(batch_path)
+    return len(names)
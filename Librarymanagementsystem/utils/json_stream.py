@@ -0,0 +1,117 @@
+"""
+json_stream.py
+Đọc file dữ liệu lớn theo kiểu streaming: trả về từng bản ghi một,
+bộ nhớ dùng gần như cố định (không phụ thuộc kích thước file).
+
+Hỗ trợ:
+- file JSON dạng mảng: [ {...}, {...}, ... ]
+- file JSON Lines: mỗi dòng 1 object
+Các thay đổi còn nằm trong journal được áp lên từng bản ghi khi đọc.
+"""
+
+import json
+import os
+import re
+
+from utils.journal import get_journal, iter_replay, read_entries
+
+CHUNK_SIZE = 64 * 1024
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\r\n"
+_SEPARATOR = re.compile(r"[ \t\r\n,]*")
+
+
+def _first_char(f) -> str:
+    while True:
+        ch = f.read(1)
+        if not ch or ch not in _WHITESPACE:
+            return ch
+
+
+def _iter_array(f, chunk_size: int):
+    """Giải mã lần lượt các phần tử của mảng JSON (đã đọc qua dấu '[')"""
+    buf = ""
+    pos = 0
+    eof = False
+
+    while True:
+        # Bỏ khoảng trắng và dấu phẩy giữa các phần tử
+        while True:
+            pos = _SEPARATOR.match(buf, pos).end()
+            if pos < len(buf) or eof:
+                break
+            buf, pos = f.read(chunk_size), 0
+            eof = not buf
+
+        if pos >= len(buf):
+            raise ValueError("Mảng JSON không được đóng bằng ']'")
+        if buf[pos] == "]":
+            return
+
+        try:
+            value, end = _decoder.raw_decode(buf, pos)
+            # Số ở cuối buffer có thể chưa đọc hết -> đọc thêm rồi giải mã lại
+            complete = end < len(buf) or eof
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            complete = False
+
+        if not complete:
+            more = f.read(chunk_size)
+            eof = not more
+            buf, pos = buf[pos:] + more, 0
+            continue
+
+        yield value
+        pos = end
+
+
+def _iter_lines(f):
+    for line in f:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def iter_json_file(file_path: str, chunk_size: int = CHUNK_SIZE):
+    """
+    Trả về từng bản ghi trong file (mảng JSON hoặc JSON Lines).
+    File không tồn tại hoặc rỗng -> không có bản ghi nào.
+    """
+    if not os.path.exists(file_path):
+        return
+
+    with open(file_path, "r", encoding="utf-8") as f:
+        ch = _first_char(f)
+        if not ch:
+            return
+        if ch == "[":
+            yield from _iter_array(f, chunk_size)
+            return
+
+        # Không phải mảng: JSON Lines, hoặc 1 object JSON nhiều dòng
+        first_line = ch + f.readline()
+        try:
+            first = json.loads(first_line)
+        except json.JSONDecodeError:
+            # Object nhiều dòng (vd {"books": [...]}) -> không stream được, đọc cả file
+            from repositories.schema import unwrap_records
+            f.seek(0)
+            yield from unwrap_records(json.load(f))
+            return
+        yield first
+        yield from _iter_lines(f)
+
+
+def iter_records(file_path: str, chunk_size: int = CHUNK_SIZE):
+    """
+    Giống iter_json_file nhưng áp thêm các thay đổi còn trong journal.
+    """
+    journal = get_journal(file_path)
+    records = iter_json_file(file_path, chunk_size)
+    if not journal.has_pending():
+        return records
+    entries = read_entries(journal.compacting_path) + read_entries(journal.journal_path)
+    return iter_replay(records, entries)
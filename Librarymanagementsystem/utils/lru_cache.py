@@ -0,0 +1,122 @@
+"""
+lru_cache.py
+Cache đọc xuyên (read-through) có giới hạn số phần tử (LRU) và thời gian
+sống (TTL) cho object đã dựng sẵn (ví dụ Book đã hydrate).
+
+- get_or_load(key, loader): có trong cache và chưa hết hạn -> trả về ngay,
+  ngược lại gọi loader(key) rồi lưu lại
+- put(key, value, generation): lưu giá trị dựng từ dữ liệu đọc theo lô
+- invalidate(key) / clear(): bên ghi dữ liệu gọi để xóa đúng phần tử đã đổi
+- Phần tử bị xóa trong lúc đang load sẽ không được lưu (tránh lưu dữ liệu cũ)
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class LRUCache:
+    def __init__(self, max_size: int, ttl: float = None, clock=time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()  # key -> (hết hạn lúc, value)
+        self._lock = threading.Lock()
+        self._generation = 0           # tăng mỗi lần invalidate / clear
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        with self._lock:
+            value = self._lookup(key)
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self.hits += 1
+            return value
+
+    def _lookup(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return _MISSING
+        expires, value = entry
+        if expires is not None and self.clock() >= expires:
+            del self._entries[key]
+            self.expirations += 1
+            return _MISSING
+        self._entries.move_to_end(key)
+        return value
+
+    def get_or_load(self, key, loader):
+        """loader(key) -> value; value None không được lưu vào cache"""
+        with self._lock:
+            value = self._lookup(key)
+            if value is not _MISSING:
+                self.hits += 1
+                return value
+            self.misses += 1
+            generation = self._generation
+
+        value = loader(key)
+        if value is not None:
+            with self._lock:
+                if generation == self._generation:
+                    self._store(key, value)
+        return value
+
+    @property
+    def generation(self) -> int:
+        """Lấy trước khi đọc dữ liệu nguồn, truyền vào put() (giống get_or_load)"""
+        return self._generation
+
+    def put(self, key, value, generation: int = None) -> None:
+        """generation khác hiện tại (đã có invalidate/clear từ lúc đọc) -> không lưu"""
+        with self._lock:
+            if generation is None or generation == self._generation:
+                self._store(key, value)
+
+    def _store(self, key, value) -> None:
+        if self.max_size <= 0:
+            return
+        expires = self.clock() + self.ttl if self.ttl else None
+        self._entries[key] = (expires, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key) -> None:
+        with self._lock:
+            self._generation += 1
+            if self._entries.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Số liệu để theo dõi hiệu quả cache"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+            }
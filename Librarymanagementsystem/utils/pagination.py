@@ -0,0 +1,43 @@
+"""
+pagination.py
+Phân trang theo con trỏ (keyset): mỗi trang chọn K phần tử đầu bằng heap
+giới hạn (heapq.nsmallest), không sắp xếp cả danh sách.
+
+Con trỏ là khóa sắp xếp của phần tử cuối trang trước; trang sau chỉ lấy
+phần tử có khóa lớn hơn. Khóa phải duy nhất (thêm id để phân xử).
+Thêm/xóa dữ liệu giữa 2 lần gọi không làm lặp hay sót chỉ khi khóa của mỗi
+phần tử không đổi theo phần còn lại của dữ liệu (ví dụ trường của chính
+bản ghi). Khóa tính trên cả tập (điểm BM25) không thỏa điều này: xem
+BookSearchIndex.search_page, con trỏ ở đó gắn với phiên bản chỉ mục.
+"""
+
+import heapq
+
+from utils.text_search import fold
+
+
+def sort_value(value):
+    """Khóa so sánh được cho dữ liệu lẫn kiểu: số < chuỗi (bỏ dấu) < None"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return (0, value, "")
+    if value is None:
+        return (2, 0, "")
+    return (1, 0, fold(value))
+
+
+def top_k(items, limit: int, key, after=None):
+    """
+    Chọn tối đa `limit` phần tử nhỏ nhất theo key, sau con trỏ `after`.
+    limit=None -> lấy hết (sắp xếp toàn bộ).
+    Trả về (page, next_cursor); next_cursor = None khi đã hết dữ liệu.
+    """
+    if after is not None:
+        items = (item for item in items if key(item) > after)
+    if limit is None:
+        return sorted(items, key=key), None
+    if limit <= 0:
+        raise ValueError("limit phải > 0")
+    ranked = heapq.nsmallest(limit + 1, items, key=key)
+    page = ranked[:limit]
+    next_cursor = key(page[-1]) if len(ranked) > limit else None
+    return page, next_cursor
@@ -0,0 +1,137 @@
+"""
+query_engine.py
+Truy vấn nhiều điều kiện (AND) trên IndexManager + RangeIndex.
+
+- Điều kiện bằng / thuộc tập giá trị trên trường có chỉ mục băm, và điều
+  kiện khoảng trên trường có RangeIndex: ước lượng số dòng (kích thước
+  bucket / đếm bằng bisect), chọn chỉ mục chọn lọc nhất làm nguồn dòng
+  (driver); các chỉ mục băm còn lại chỉ giao (kiểm tra handle có trong
+  bucket)
+- Điều kiện còn lại (khoảng không phải driver, trường không có chỉ mục,
+  hàm test tùy ý): lọc từng dòng lấy ra từ driver
+- Không có điều kiện dùng được chỉ mục -> duyệt toàn bộ (scan)
+explain() cho biết chỉ mục nào được dùng, theo thứ tự nào và số dòng đã duyệt.
+"""
+
+
+class Predicate:
+    """
+    field     : tên trường
+    values    : tập giá trị chấp nhận (điều kiện bằng / IN) -> chỉ mục băm
+    low, high : khoảng giá trị [low, high] (None = không giới hạn) -> RangeIndex
+    test      : hàm(giá trị) -> bool cho điều kiện khác
+    """
+
+    def __init__(self, field: str, values=None, low=None, high=None, test=None,
+                 label: str = None):
+        self.field = field
+        self.values = list(values) if values is not None else None
+        self.low = low
+        self.high = high
+        self.test = test
+        self.label = label or field
+
+    @property
+    def is_range(self) -> bool:
+        return self.low is not None or self.high is not None
+
+    def matches(self, value) -> bool:
+        if self.values is not None and value not in self.values:
+            return False
+        if self.is_range:
+            if value is None:
+                return False
+            if self.low is not None and value < self.low:
+                return False
+            if self.high is not None and value > self.high:
+                return False
+        return self.test is None or self.test(value)
+
+
+class QueryEngine:
+    def __init__(self, index, scan, ranges: dict = None, get_item=None):
+        """
+        index   : IndexManager (handle -> item)
+        scan()  : duyệt mọi (handle, item)
+        ranges  : {tên trường: RangeIndex}
+        get_item: handle -> item (cho các dòng lấy từ RangeIndex)
+        """
+        self.index = index
+        self.scan = scan
+        self.ranges = ranges or {}
+        self.get_item = get_item
+
+    def _postings(self, predicate) -> list:
+        return [self.index.lookup(predicate.field, v) for v in predicate.values]
+
+    def _access(self, p):
+        """("hash" | "range", số dòng ước lượng) nếu p dùng được chỉ mục, ngược lại None"""
+        if p.test is not None:
+            return None
+        if p.values is not None and not p.is_range and p.field in self.index:
+            return "hash", sum(len(b) for b in self._postings(p))
+        if p.values is None and p.is_range and p.field in self.ranges and self.get_item:
+            return "range", self.ranges[p.field].count(p.low, p.high)
+        return None
+
+    def plan(self, predicates) -> dict:
+        """
+        driver: chỉ mục có ít dòng nhất; intersect: các chỉ mục băm còn lại;
+        residual: các điều kiện kiểm tra từng dòng
+        """
+        candidates, residual = [], []
+        for p in predicates:
+            access = self._access(p)
+            if access is None:
+                residual.append(p)
+            else:
+                candidates.append((access[1], access[0], p))
+        candidates.sort(key=lambda c: c[0])
+
+        driver = candidates[0] if candidates else None
+        intersect = []
+        for c in candidates[1:]:
+            if c[1] == "hash":
+                intersect.append(c)
+            else:
+                residual.append(c[2])  # khoảng không phải driver: lọc từng dòng rẻ hơn
+        return {"driver": driver, "intersect": intersect, "residual": residual}
+
+    def _driver_rows(self, driver) -> list:
+        _, kind, p = driver
+        if kind == "range":
+            return [(h, self.get_item(h)) for h in self.ranges[p.field].range(p.low, p.high)]
+        rows = []
+        for bucket in self._postings(p):
+            rows.extend(bucket.items())
+        return rows
+
+    def execute(self, predicates):
+        """Trả về ([(handle, item), ...], explain)"""
+        plan = self.plan(list(predicates))
+        driver, intersect, residual = plan["driver"], plan["intersect"], plan["residual"]
+        used = ([driver] if driver else []) + intersect
+        explain = {
+            "strategy": "index" if driver else "full_scan",
+            "indexes": [{"field": p.label, "type": kind, "estimated_rows": n}
+                        for n, kind, p in used],
+            "filters": [p.label for p in residual],
+            "rows_scanned": 0,
+            "rows_returned": 0,
+        }
+
+        rows = self._driver_rows(driver) if driver else self.scan()
+        others = [self._postings(p) for _, _, p in intersect]
+
+        results = []
+        scanned = 0
+        for handle, item in rows:
+            scanned += 1
+            if any(not any(handle in b for b in buckets) for buckets in others):
+                continue
+            if all(p.matches(self.index.getter(item, p.field)) for p in residual):
+                results.append((handle, item))
+
+        explain["rows_scanned"] = scanned
+        explain["rows_returned"] = len(results)
+        return results, explain
@@ -0,0 +1,83 @@
+"""
+range_index.py
+Chỉ mục khoảng: giá trị số nguyên (năm xuất bản, thời điểm epoch, ...)
+nằm trong mảng đã sắp xếp, handle tương ứng nằm trong list song song.
+Tra khoảng [low, high] bằng bisect: O(log N + k) với k = số kết quả.
+"""
+
+from array import array
+from bisect import bisect_left, bisect_right
+
+
+class RangeIndex:
+    def __init__(self):
+        self.values = array("q")   # giá trị đã sắp xếp
+        self.handles = []          # handle ở cùng vị trí với values
+        self._value_of = {}        # handle -> giá trị (để xóa/sửa)
+
+    def __len__(self) -> int:
+        return len(self.handles)
+
+    def __contains__(self, handle) -> bool:
+        return handle in self._value_of
+
+    # ===== Dựng / cập nhật =====
+
+    def build(self, pairs) -> None:
+        """Dựng lại từ [(handle, giá trị), ...]; sắp xếp 1 lần"""
+        ordered = sorted(((int(v), h) for h, v in pairs if v is not None),
+                         key=lambda pair: pair[0])
+        self.values = array("q", (v for v, _ in ordered))
+        self.handles = [h for _, h in ordered]
+        self._value_of = {h: v for v, h in ordered}
+
+    def add(self, handle, value) -> None:
+        """Thêm hoặc đổi giá trị của handle (value None -> bỏ khỏi chỉ mục)"""
+        self.remove(handle)
+        if value is None:
+            return
+        value = int(value)
+        i = bisect_right(self.values, value)
+        self.values.insert(i, value)
+        self.handles.insert(i, handle)
+        self._value_of[handle] = value
+
+    def remove(self, handle) -> None:
+        value = self._value_of.pop(handle, None)
+        if value is None:
+            return
+        i = bisect_left(self.values, value)
+        while self.handles[i] != handle:  # các handle cùng giá trị nằm liền nhau
+            i += 1
+        del self.values[i]
+        del self.handles[i]
+
+    def clear(self) -> None:
+        self.values = array("q")
+        self.handles = []
+        self._value_of = {}
+
+    # ===== Tra cứu =====
+
+    def _bounds(self, low=None, high=None, include_high: bool = True):
+        lo = bisect_left(self.values, low) if low is not None else 0
+        if high is None:
+            hi = len(self.values)
+        elif include_high:
+            hi = bisect_right(self.values, high)
+        else:
+            hi = bisect_left(self.values, high)
+        return lo, max(lo, hi)
+
+    def count(self, low=None, high=None, include_high: bool = True) -> int:
+        """Số handle có low <= giá trị <= high (O(log N))"""
+        lo, hi = self._bounds(low, high, include_high)
+        return hi - lo
+
+    def range(self, low=None, high=None, include_high: bool = True) -> list:
+        """Các handle có low <= giá trị <= high (hoặc < high), tăng dần theo giá trị"""
+        lo, hi = self._bounds(low, high, include_high)
+        return self.handles[lo:hi]
+
+    def value_of(self, handle):
+        return self._value_of.get(handle)
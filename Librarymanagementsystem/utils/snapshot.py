@@ -0,0 +1,75 @@
+"""
+snapshot.py
+Snapshot nhị phân (pickle protocol 5) của dữ liệu đã dựng thành object.
+
+File snapshot gồm 2 phần pickle nối tiếp:
+1. header: phiên bản + chữ ký (mtime, size) của các file JSON nguồn
+2. payload: dữ liệu (list object User/Book/...)
+
+Chỉ dùng snapshot khi chữ ký các file nguồn khớp với header, tức là
+không ai sửa file JSON sau khi snapshot được ghi. Ngược lại -> None,
+bên gọi đọc lại JSON như bình thường.
+"""
+
+import gc
+import io
+import os
+import pickle
+
+from utils.file_cache import file_signature
+from utils.group_commit import atomic_write_bytes
+
+SNAPSHOT_VERSION = 1
+PICKLE_PROTOCOL = 5
+
+
+def _sources_signature(source_files) -> dict:
+    return {os.path.abspath(p): file_signature(p) for p in source_files}
+
+
+def save_snapshot(snapshot_path: str, payload, source_files) -> bool:
+    """
+    Ghi snapshot (ghi nguyên tử). Gọi SAU khi đã ghi xong các file nguồn.
+    Trả về True/False, lỗi chỉ in ra (snapshot chỉ là bản tăng tốc).
+    """
+    header = {
+        "version": SNAPSHOT_VERSION,
+        "sources": _sources_signature(source_files),
+    }
+    try:
+        buffer = io.BytesIO()
+        pickle.dump(header, buffer, protocol=PICKLE_PROTOCOL)
+        pickle.dump(payload, buffer, protocol=PICKLE_PROTOCOL)
+        atomic_write_bytes(snapshot_path, buffer.getvalue())
+        return True
+    except (OSError, pickle.PicklingError, TypeError, AttributeError) as e:
+        print(f"[Error] Lỗi ghi snapshot {snapshot_path}: {e}")
+        return False
+
+
+def load_snapshot(snapshot_path: str, source_files):
+    """
+    Đọc payload nếu snapshot còn khớp với các file nguồn, ngược lại None.
+    """
+    if not os.path.exists(snapshot_path):
+        return None
+    try:
+        with open(snapshot_path, "rb") as f:
+            header = pickle.load(f)
+            if not isinstance(header, dict) or header.get("version") != SNAPSHOT_VERSION:
+                return None
+            if header.get("sources") != _sources_signature(source_files):
+                return None
+            # Tạo hàng trăm nghìn object liên tiếp làm GC chạy liên tục mà
+            # không thu hồi được gì -> tắt GC trong lúc unpickle
+            gc_enabled = gc.isenabled()
+            gc.disable()
+            try:
+                return pickle.load(f)
+            finally:
+                if gc_enabled:
+                    gc.enable()
+    except Exception as e:
+        # File hỏng / class đã đổi tên... -> coi như không có snapshot
+        print(f"[Warning] Bỏ qua snapshot {snapshot_path}: {e}")
+        return None
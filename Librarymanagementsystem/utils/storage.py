@@ -0,0 +1,174 @@
+"""
+storage.py
+Lớp I/O JSON duy nhất cho controller, service và repository.
+
+- read_json / write_json: đọc (qua cache + journal) và ghi (nguyên tử, group commit)
+- read_many / write_many: đọc/ghi nhiều collection trong 1 lần gọi;
+  write_many khóa tất cả file rồi chờ fsync 1 lần cho cả nhóm
+- io_stats: ghi lại từng lần gọi (byte đọc/ghi, thời gian parse/serialize)
+
+    with io_stats.measure("borrow_book") as m:
+        ...
+    print(m.summary())
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from utils.file_cache import file_cache
+from utils.group_commit import commit_many
+from utils.journal import replay_pending
+
+
+class IOStats:
+    """Số liệu I/O theo từng lần gọi và cộng dồn theo loại thao tác"""
+
+    def __init__(self, history: int = 1000):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.calls = deque(maxlen=history)  # các lần gọi gần nhất
+        self.totals = {}                    # op -> số liệu cộng dồn
+
+    def record(self, op: str, file_path: str, **metrics) -> dict:
+        """
+        Ghi lại 1 lần gọi. metrics: bytes_read, bytes_written, parse_ms,
+        serialize_ms, total_ms, cache_hit
+        """
+        entry = {"op": op, "file": file_path, **metrics}
+        with self._lock:
+            self.calls.append(entry)
+            total = self.totals.setdefault(op, {"calls": 0})
+            total["calls"] += 1
+            for name, value in metrics.items():
+                if isinstance(value, (int, float)):
+                    total[name] = total.get(name, 0) + value
+        for measurement in getattr(self._local, "active", ()):
+            measurement.calls.append(entry)
+        return entry
+
+    @contextmanager
+    def measure(self, name: str):
+        """Gom các lần gọi I/O trong khối with (cùng thread) cho 1 thao tác"""
+        measurement = Measurement(name)
+        active = getattr(self._local, "active", None)
+        if active is None:
+            active = self._local.active = []
+        active.append(measurement)
+        try:
+            yield measurement
+        finally:
+            active.remove(measurement)
+
+    def summary(self) -> dict:
+        with self._lock:
+            return {op: dict(total) for op, total in self.totals.items()}
+
+    def reset(self) -> None:
+        with self._lock:
+            self.calls.clear()
+            self.totals = {}
+
+
+class Measurement:
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = []
+
+    def summary(self) -> dict:
+        result = {"operation": self.name, "calls": len(self.calls)}
+        for name in ("bytes_read", "bytes_written", "parse_ms", "serialize_ms", "total_ms"):
+            result[name] = sum(c.get(name, 0) for c in self.calls)
+        return result
+
+
+# Số liệu dùng chung cho toàn bộ process
+io_stats = IOStats()
+
+
+# ===== Đọc =====
+
+def _load_file(file_path: str, metrics: dict):
+    """Đọc + parse file JSON (kèm các thay đổi còn nằm trong journal)"""
+    metrics["cache_hit"] = False
+    if not os.path.exists(file_path):
+        return replay_pending(file_path, [])
+
+    try:
+        with open(file_path, "rb") as f:
+            raw = f.read()
+        metrics["bytes_read"] = len(raw)
+        start = time.perf_counter()
+        content = raw.decode("utf-8").strip()
+        data = json.loads(content) if content else []
+        data = replay_pending(file_path, data)
+        metrics["parse_ms"] = (time.perf_counter() - start) * 1000
+        return data
+    except (ValueError, OSError) as e:
+        print(f"[Error] Lỗi đọc file {file_path}: {e}")
+        return []
+
+
+def read_json(file_path: str):
+    """
+    Đọc file JSON và trả về dữ liệu (list/dict).
+    File không tồn tại hoặc lỗi -> [].
+    Kết quả parse được cache lại cho tới khi file thay đổi.
+    """
+    metrics = {"bytes_read": 0, "parse_ms": 0.0, "cache_hit": True}
+    start = time.perf_counter()
+    data = file_cache.get(file_path, lambda path: _load_file(path, metrics))
+    metrics["total_ms"] = (time.perf_counter() - start) * 1000
+    io_stats.record("read", file_path, **metrics)
+    return data
+
+
+def read_many(file_paths) -> dict:
+    """Đọc nhiều file trong 1 lần gọi -> {đường dẫn: dữ liệu}"""
+    return {path: read_json(path) for path in file_paths}
+
+
+# ===== Ghi =====
+
+def _serialize(data):
+    start = time.perf_counter()
+    text = json.dumps(data, indent=4, ensure_ascii=False)
+    serialize_ms = (time.perf_counter() - start) * 1000
+    return text, {"bytes_written": len(text.encode("utf-8")), "serialize_ms": serialize_ms}
+
+
+def write_many(items: dict) -> bool:
+    """
+    Ghi nhiều file ({đường dẫn: dữ liệu}) trong 1 lần: khóa tất cả file,
+    ghi nguyên tử và chờ fsync 1 lần cho cả nhóm.
+    Trả về True/False, lỗi được in ra.
+    """
+    start = time.perf_counter()
+    texts = {}
+    metrics = {}
+    try:
+        for file_path, data in items.items():
+            texts[file_path], metrics[file_path] = _serialize(data)
+        commit_many(texts)
+        return True
+    except (OSError, TypeError, ValueError) as e:
+        print(f"[Error] Lỗi ghi file {', '.join(items)}: {e}")
+        return False
+    finally:
+        for file_path in items:
+            file_cache.invalidate(file_path)
+        # Thời gian chờ ghi là của cả nhóm -> chia đều cho từng file
+        total_ms = (time.perf_counter() - start) * 1000 / max(len(items), 1)
+        for file_path, file_metrics in metrics.items():
+            io_stats.record("write", file_path, total_ms=total_ms, **file_metrics)
+
+
+def write_json(file_path: str, data) -> bool:
+    """
+    Ghi dữ liệu xuống file JSON, tự tạo thư mục nếu chưa có.
+    Ghi nguyên tử (file tạm + đổi tên), có khóa file và fsync.
+    """
+    return write_many({file_path: data})
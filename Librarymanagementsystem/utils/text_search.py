@@ -0,0 +1,390 @@
+"""
+text_search.py
+Chỉ mục ngược (inverted index) cho tìm kiếm toàn văn, xếp hạng BM25.
+
+- fold(): chuẩn hóa Unicode + bỏ dấu tiếng Việt ("Dế Mèn" -> "de men")
+- InvertedIndex: term -> {doc: tần suất}, thêm/xóa/sửa từng tài liệu
+  (không dựng lại cả chỉ mục), tìm kiếm chỉ duyệt các posting liên quan
+  nên thời gian phụ thuộc số kết quả chứ không phụ thuộc số tài liệu.
+- TrigramIndex: tìm term gần đúng (gõ sai chính tả) theo độ tương đồng
+  trigram, không tính edit distance với từng term.
+- PrefixIndex: gợi ý khi gõ (autocomplete) trên mảng cụm từ đã sắp xếp.
+"""
+
+import heapq
+import math
+import re
+import unicodedata
+from bisect import bisect_left, insort
+
+_COMBINING = re.compile("[\u0300-\u036f]")  # dấu kết hợp sau khi tách NFD
+_TOKEN = re.compile(r"\w+")
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+PREFIX_EXPANSION_LIMIT = 1000  # số term tối đa khi mở rộng tiền tố của từ cuối (giữ term phổ biến)
+FUZZY_THRESHOLD = 0.4          # độ tương đồng trigram tối thiểu (Jaccard, 0..1)
+
+
+def fold(text) -> str:
+    """Chữ thường, bỏ dấu: "Đất Rừng Phương Nam" -> "dat rung phuong nam" """
+    text = unicodedata.normalize("NFD", str(text))
+    text = _COMBINING.sub("", text)
+    return text.replace("đ", "d").replace("Đ", "D").casefold()
+
+
+def tokenize(text) -> list:
+    if text is None:
+        return []
+    return _TOKEN.findall(fold(text))
+
+
+def trigrams(term: str) -> set:
+    """Trigram có đệm 2 đầu: "meo" -> {"  m", " me", "meo", "eo "}"""
+    padded = f"  {term} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def relevance_key(hit):
+    """Khóa xếp hạng (doc, điểm): điểm giảm dần, bằng điểm thì theo doc"""
+    doc, score = hit
+    return (-score, str(doc))
+
+
+class TrigramIndex:
+    """
+    trigram -> tập term chứa nó. similar() chỉ xét term có đủ trigram chung:
+    - lọc độ dài: Jaccard >= t thì số trigram của 2 term chênh nhau tối đa
+      theo tỉ lệ t
+    - lọc tiền tố: cần >= m trigram chung thì term phải chứa ít nhất 1 trong
+      (|Q| - m + 1) trigram hiếm nhất của query -> chỉ duyệt posting của các
+      trigram đó, bỏ qua các trigram phổ biến
+    """
+
+    def __init__(self, terms=()):
+        self.postings = {}
+        for term in terms:
+            self.add(term)
+
+    @staticmethod
+    def accepts(term: str) -> bool:
+        """Chỉ term chữ cái: mã sách/số gõ sai thì tìm gần đúng không có ý nghĩa"""
+        return term.isalpha()
+
+    def add(self, term: str) -> None:
+        if not self.accepts(term):
+            return
+        for gram in trigrams(term):
+            self.postings.setdefault(gram, set()).add(term)
+
+    def remove(self, term: str) -> None:
+        if not self.accepts(term):
+            return
+        for gram in trigrams(term):
+            posting = self.postings.get(gram)
+            if posting is not None:
+                posting.discard(term)
+                if not posting:
+                    del self.postings[gram]
+
+    def similar(self, term: str, threshold: float = FUZZY_THRESHOLD) -> list:
+        """[(term, độ tương đồng), ...] với độ tương đồng >= threshold"""
+        if not self.accepts(term):
+            return []
+        query = trigrams(term)
+        size = len(query)
+        # |A ∩ B| / |A ∪ B| >= t  =>  |A ∩ B| >= t * |A|
+        need = max(1, math.ceil(threshold * size - 1e-9))
+        min_size, max_size = threshold * size, size / threshold
+
+        grams = sorted(query, key=lambda g: len(self.postings.get(g, ())))
+        candidates = set()
+        for gram in grams[:size - need + 1]:
+            candidates.update(self.postings.get(gram, ()))
+
+        matches = []
+        for candidate in candidates:
+            # số trigram của term = len + 1 (trừ khi lặp trigram) -> lọc nhanh theo độ dài
+            if not min_size <= len(candidate) + 1 <= max_size:
+                continue
+            other = trigrams(candidate)
+            common = len(query & other)
+            if common < need:
+                continue
+            score = common / (size + len(other) - common)
+            if score >= threshold:
+                matches.append((candidate, score))
+        return matches
+
+
+class PrefixIndex:
+    """
+    Gợi ý theo tiền tố: các cụm từ (đã bỏ dấu) nằm trong 1 list đã sắp xếp,
+    tìm khoảng khớp tiền tố bằng bisect rồi chọn N cụm phổ biến nhất.
+    Mỗi cụm từ có thể đến từ nhiều tài liệu (cùng tiêu đề / cùng tác giả),
+    độ phổ biến = tổng trọng số của các tài liệu đó.
+    """
+
+    def __init__(self):
+        self.keys = []        # cụm từ đã chuẩn hóa, sắp xếp
+        self.entries = {}     # cụm từ -> [văn bản hiển thị, {doc: trọng số}]
+        self.doc_keys = {}    # doc -> [cụm từ] (để xóa/sửa tài liệu)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    @staticmethod
+    def normalize(text) -> str:
+        return " ".join(tokenize(text))
+
+    def set(self, doc, texts, weight: float = 0) -> None:
+        """Thay các cụm từ của doc bằng texts (tiêu đề, tên tác giả, ...)"""
+        self.remove(doc)
+        keys = []
+        for text in texts:
+            key = self.normalize(text)
+            if not key or key in keys:
+                continue
+            entry = self.entries.get(key)
+            if entry is None:
+                entry = self.entries[key] = [str(text).strip(), {}]
+                insort(self.keys, key)
+            entry[1][doc] = weight
+            keys.append(key)
+        if keys:
+            self.doc_keys[doc] = keys
+
+    def remove(self, doc) -> None:
+        for key in self.doc_keys.pop(doc, ()):
+            docs = self.entries[key][1]
+            docs.pop(doc, None)
+            if not docs:
+                del self.entries[key]
+                del self.keys[bisect_left(self.keys, key)]
+
+    def clear(self) -> None:
+        self.keys = []
+        self.entries = {}
+        self.doc_keys = {}
+
+    def complete(self, prefix: str, limit: int = 10) -> list:
+        """
+        [(văn bản, độ phổ biến), ...] của các cụm bắt đầu bằng prefix,
+        phổ biến nhất trước (bằng nhau: nhiều tài liệu hơn, rồi theo chữ cái)
+        """
+        key = self.normalize(prefix)
+        if not key:
+            return []
+        lo = bisect_left(self.keys, key)
+        hi = bisect_left(self.keys, key + "\U0010ffff", lo)
+
+        def rank(k):
+            docs = self.entries[k][1]
+            return (-sum(docs.values()), -len(docs), k)
+
+        best = heapq.nsmallest(limit, self.keys[lo:hi], key=rank)
+        return [(self.entries[k][0], sum(self.entries[k][1].values())) for k in best]
+
+
+class InvertedIndex:
+    """
+    fields: {tên trường: trọng số}; trọng số nhân vào tần suất của term
+    trong trường đó (ví dụ title nặng hơn description).
+    """
+
+    def __init__(self, fields: dict):
+        self.fields = dict(fields)
+        self.postings = {}     # term -> {doc: tf}
+        self.doc_terms = {}    # doc -> {term: tf} (để xóa/sửa tài liệu)
+        self.doc_len = {}      # doc -> tổng tf
+        self.total_len = 0.0
+        self.vocab = []        # các term đã sắp xếp (tìm theo tiền tố)
+        self.trigrams = None   # TrigramIndex trên vocab, dựng khi tìm fuzzy lần đầu
+        self.version = 0       # tăng mỗi khi nội dung chỉ mục đổi (kết quả tìm kiếm có thể khác)
+
+    def __len__(self) -> int:
+        return len(self.doc_terms)
+
+    def __contains__(self, doc) -> bool:
+        return doc in self.doc_terms
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.__dict__.setdefault("trigrams", None)  # chỉ mục lưu từ bản cũ
+        self.__dict__.setdefault("version", 0)
+
+    # ===== Cập nhật =====
+
+    def add(self, doc, values: dict) -> None:
+        """
+        Thêm hoặc thay tài liệu doc; values: {tên trường: văn bản}.
+        Nội dung tìm kiếm không đổi (ví dụ chỉ sửa số lượng) -> không làm gì.
+        """
+        self._add(doc, values, sort_vocab=True)
+
+    def build(self, items) -> None:
+        """Dựng lại toàn bộ từ [(doc, values), ...]; vocab chỉ sắp xếp 1 lần"""
+        self.clear()
+        for doc, values in items:
+            self._add(doc, values, sort_vocab=False)
+        self.vocab = sorted(self.postings)
+        self.trigrams = None
+        self.version += 1
+
+    def _add(self, doc, values: dict, sort_vocab: bool) -> None:
+        terms = {}
+        for field, weight in self.fields.items():
+            for term in tokenize(values.get(field)):
+                terms[term] = terms.get(term, 0) + weight
+        if self.doc_terms.get(doc) == terms:
+            return
+        self.version += 1
+        if doc in self.doc_terms:
+            self.remove(doc)
+        if not terms:
+            return
+        for term, tf in terms.items():
+            posting = self.postings.get(term)
+            if posting is None:
+                posting = self.postings[term] = {}
+                if sort_vocab:
+                    insort(self.vocab, term)
+                    if self.trigrams is not None:
+                        self.trigrams.add(term)
+            posting[doc] = tf
+        length = sum(terms.values())
+        self.doc_terms[doc] = terms
+        self.doc_len[doc] = length
+        self.total_len += length
+
+    def remove(self, doc) -> None:
+        terms = self.doc_terms.pop(doc, None)
+        if terms is None:
+            return
+        self.version += 1
+        self.total_len -= self.doc_len.pop(doc)
+        for term in terms:
+            posting = self.postings[term]
+            del posting[doc]
+            if not posting:
+                del self.postings[term]
+                del self.vocab[bisect_left(self.vocab, term)]
+                if self.trigrams is not None:
+                    self.trigrams.remove(term)
+
+    def clear(self) -> None:
+        self.postings = {}
+        self.doc_terms = {}
+        self.doc_len = {}
+        self.total_len = 0.0
+        self.vocab = []
+        self.trigrams = None
+        self.version += 1
+
+    # ===== Tìm kiếm =====
+
+    def expand_prefix(self, prefix: str) -> list:
+        """
+        Các term bắt đầu bằng prefix. Tiền tố ngắn khớp quá
+        PREFIX_EXPANSION_LIMIT term thì giữ chính prefix (nếu là 1 term) và
+        các term có nhiều tài liệu nhất, không cắt theo thứ tự chữ cái.
+        """
+        start = bisect_left(self.vocab, prefix)
+        end = bisect_left(self.vocab, prefix + "\U0010ffff", start)
+        terms = self.vocab[start:end]
+        if len(terms) > PREFIX_EXPANSION_LIMIT:
+            terms = heapq.nsmallest(
+                PREFIX_EXPANSION_LIMIT, terms,
+                key=lambda term: (term != prefix, -len(self.postings[term]), term),
+            )
+        return terms
+
+    def similar_terms(self, token: str, threshold: float = FUZZY_THRESHOLD) -> list:
+        if self.trigrams is None:
+            self.trigrams = TrigramIndex(self.vocab)
+        return self.trigrams.similar(token, threshold)
+
+    def search(self, query: str, limit: int = None, prefix: bool = True,
+               fuzzy: bool = False) -> list:
+        """
+        Tài liệu chứa TẤT CẢ từ trong query, xếp theo điểm BM25 giảm dần.
+        prefix=True: từ cuối được hiểu là tiền tố ("harr" khớp "harry").
+        fuzzy=True: mỗi từ khớp thêm các term gần giống (gõ sai chính tả),
+        điểm nhân với độ tương đồng nên khớp đúng vẫn xếp trước.
+        Trả về [(doc, điểm), ...]
+        """
+        scores = self.scores(query, prefix=prefix, fuzzy=fuzzy)
+        if limit is not None:
+            return heapq.nsmallest(limit, scores.items(), key=relevance_key)
+        return sorted(scores.items(), key=relevance_key)
+
+    def scores(self, query: str, prefix: bool = True, fuzzy: bool = False) -> dict:
+        """{doc: điểm BM25} của các tài liệu khớp (chưa xếp hạng)"""
+        tokens = tokenize(query)
+        if not tokens or not self.doc_terms:
+            return {}
+
+        groups = []  # mỗi từ trong query -> {term khớp: hệ số}
+        for i, token in enumerate(tokens):
+            weights = {}
+            if prefix and i == len(tokens) - 1:
+                weights = dict.fromkeys(self.expand_prefix(token), 1.0)
+            elif token in self.postings:
+                weights[token] = 1.0
+            if fuzzy:
+                for term, similarity in self.similar_terms(token):
+                    if similarity > weights.get(term, 0.0):
+                        weights[term] = similarity
+            if not weights:
+                return {}
+            groups.append(weights)
+
+        n_docs = len(self.doc_terms)
+        avg_len = self.total_len / n_docs
+
+        def idf(term):
+            df = len(self.postings[term])
+            return math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+
+        def bm25(factor, doc, tf):
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_len[doc] / avg_len)
+            return factor * tf * (BM25_K1 + 1) / (tf + norm)
+
+        def group_scores(weights, candidates=None):
+            scores = {}
+            if candidates is not None:
+                # Ít tài liệu còn lại mà nhóm có nhiều term (tiền tố ngắn, fuzzy)
+                # -> duyệt term của từng tài liệu thay vì từng posting
+                posting_cost = sum(min(len(self.postings[t]), len(candidates)) for t in weights)
+                doc_cost = sum(len(self.doc_terms[doc]) for doc in candidates)
+                if doc_cost < posting_cost:
+                    for doc in candidates:
+                        for term, tf in self.doc_terms[doc].items():
+                            weight = weights.get(term)
+                            if weight:
+                                score = bm25(weight * idf(term), doc, tf)
+                                if score > scores.get(doc, 0.0):
+                                    scores[doc] = score
+                    return scores
+            for term, weight in weights.items():
+                posting = self.postings[term]
+                factor = weight * idf(term)
+                if candidates is None or len(candidates) >= len(posting):
+                    items = posting.items()
+                else:  # chỉ chấm điểm các tài liệu còn lại sau khi giao
+                    items = ((doc, posting[doc]) for doc in candidates if doc in posting)
+                for doc, tf in items:
+                    score = bm25(factor, doc, tf)
+                    if score > scores.get(doc, 0.0):
+                        scores[doc] = score
+            return scores
+
+        # Bắt đầu từ nhóm ít tài liệu nhất rồi giao dần
+        groups.sort(key=lambda weights: sum(len(self.postings[t]) for t in weights))
+        totals = group_scores(groups[0])
+        for weights in groups[1:]:
+            scores = group_scores(weights, totals)
+            totals = {doc: s + scores[doc] for doc, s in totals.items() if doc in scores}
+            if not totals:
+                return {}
+        return totals